@@ -2,6 +2,7 @@
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from rotas.rotas import register_routes
+import multiprocessing
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,6 +14,18 @@ CORS(app)
 # Registra todas as rotas
 register_routes(app)
 
+# Pré-carrega os modelos Whisper em segundo plano (WHISPER_PRECARREGAR=true).
+# No servidor de desenvolvimento, só o processo filho do reloader carrega. Os
+# workers da transcrição paralela (spawn) reexecutam este arquivo, herdando
+# WERKZEUG_RUN_MAIN, e já carregam o próprio modelo: neles nada é pré-carregado.
+if os.environ.get("WHISPER_PRECARREGAR", "").lower() in ("1", "true", "sim") \
+        and multiprocessing.parent_process() is None:
+    if __name__ != '__main__' or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from utils.modelos_whisper import registro_modelos
+        registro_modelos.precarregar_em_segundo_plano(
+            todas_instancias=os.environ.get("WHISPER_PRECARREGAR_TODAS", "").lower() in ("1", "true", "sim")
+        )
+
 # Rota para servir arquivos estáticos (áudios e shorts)
 @app.route('/uploads/<path:filename>')
 def uploads(filename):
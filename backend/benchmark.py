@@ -0,0 +1,498 @@
+"""
+Benchmark das etapas do Criador de Shorts com dados sintéticos
+
+Gera uma transcrição sintética (culto com música, avisos, leitura e
+pregação, com tempo por palavra) e, se houver ffmpeg, um vídeo de teste com
+tom e ruído modulado no ritmo da fala. Cada etapa é medida sem servidor, sem
+YouTube e sem GPU:
+
+- persistencia: gravação, leitura fria e quente e listagem da biblioteca
+- blocos: pré-filtro e divisão da transcrição em blocos por tokens
+- alinhamento: índice da transcrição e resolução dos tempos das citações
+- ranking: pontuação e remoção de cortes repetidos
+- legendas: eventos, arquivo ASS e filtro de cada short
+- analise: análise completa com o provedor replay (requer Flask)
+- render: vídeo sintético, corte por stream copy e render por perfil (requer ffmpeg)
+
+Uso:
+    python benchmark.py --minutos 120 --repeticoes 3 --saida resultado.json
+    python benchmark.py --etapas blocos,alinhamento
+
+O resultado em JSON (mediana, mínimo e máximo de cada medição) pode ser
+comparado entre commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ETAPAS = ('persistencia', 'blocos', 'alinhamento', 'ranking', 'legendas', 'analise', 'render')
+
+# Tokens aproximados do prompt da análise (sem a transcrição)
+TOKENS_PROMPT = 700
+
+VOCABULARIO = {
+    'pregacao': ('deus jesus você te coração medo ansiedade vida amor graça fé cura família pai '
+                 'chorar verdade promessa deserto vitória o a de que não é um para com seu').split(),
+    'avisos': 'aviso oferta pix conta domingo evento reunião horário inscrição cantina o a de para no'.split(),
+    'leitura': 'capítulo versículo disse então e os filhos de israel o povo foi terra ao rei'.split(),
+}
+
+# Roteiro do culto: (tipo, fração da duração)
+ROTEIRO = (('musica', 0.1), ('avisos', 0.05), ('leitura', 0.1), ('pregacao', 0.7), ('musica', 0.05))
+
+
+# ------------------------------
+# DADOS SINTÉTICOS
+# ------------------------------
+def gerar_transcricao(minutos, semente):
+    """
+    Transcrição sintética no formato do Whisper
+
+    Returns:
+        Tupla (segmentos, palavras em listas paralelas, posições dos segmentos de pregação)
+    """
+    rng = random.Random(semente)
+    segmentos = []
+    palavras = {'inicio': [], 'fim': [], 'texto': []}
+    pregacao = []
+    tempo = 0.0
+    for tipo, fracao in ROTEIRO:
+        fim_trecho = tempo + minutos * 60 * fracao
+        while tempo < fim_trecho:
+            if tipo == 'musica':
+                tokens = rng.choice(['♪ Santo santo santo ♪', '[Música]', 'Aleluia aleluia']).split()
+                ritmo, pausa = 1.0, rng.uniform(0.5, 3.0)
+            else:
+                quantidade = rng.randint(8, 20) if tipo == 'pregacao' else rng.randint(6, 12)
+                tokens = [rng.choice(VOCABULARIO[tipo]) for _ in range(quantidade)]
+                tokens[0] = tokens[0].capitalize()
+                tokens[-1] += rng.choice(['.', '.', '!', '?', ','])
+                ritmo, pausa = rng.uniform(2.2, 3.2), 0.1
+
+            inicio = tempo
+            for token in tokens:
+                duracao = len(token) / (ritmo * 5) + 0.05
+                palavras['inicio'].append(round(tempo, 2))
+                palavras['fim'].append(round(tempo + duracao, 2))
+                palavras['texto'].append(token)
+                tempo += duracao
+            if tipo == 'pregacao':
+                pregacao.append(len(segmentos))
+            segmentos.append({'inicio': round(inicio, 2), 'fim': round(tempo, 2), 'texto': ' '.join(tokens)})
+            tempo += pausa
+    return segmentos, palavras, pregacao
+
+
+def gerar_citacoes(segmentos, pregacao, quantidade, semente):
+    """Sugestões como as da IA: metade literal, metade com uma palavra trocada e sem acentos"""
+    rng = random.Random(semente)
+    sugestoes = []
+    for numero in range(quantidade):
+        posicao = rng.choice(pregacao[:-30] or pregacao)
+        palavras_inicio = segmentos[posicao]['texto'].split()[:5]
+        palavras_fim = segmentos[min(posicao + rng.randint(12, 25), len(segmentos) - 1)]['texto'].split()[-5:]
+        if numero % 2:
+            palavras_inicio[rng.randrange(len(palavras_inicio))] = 'porém'
+            palavras_fim = [p.replace('ç', 'c').replace('ã', 'a').replace('é', 'e') for p in palavras_fim]
+        sugestoes.append({
+            'titulo': f"Corte {numero}",
+            'citacao_inicio': ' '.join(palavras_inicio),
+            'citacao_fim': ' '.join(palavras_fim),
+            'score': rng.randint(30, 95),
+        })
+    return sugestoes
+
+
+def video_sintetico(dados, minutos):
+    return {
+        'info_video': {'titulo': 'Culto sintético', 'duracao_segundos': round(minutos * 60, 2)},
+        'transcricao': {'segmentos': dados['segmentos'], 'palavras': dados['palavras']},
+    }
+
+
+# ------------------------------
+# MEDIÇÃO
+# ------------------------------
+def medir(funcao, repeticoes):
+    """Executa `funcao` várias vezes e resume os tempos; devolve também o último resultado"""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        'mediana_s': round(statistics.median(tempos), 6),
+        'minimo_s': round(min(tempos), 6),
+        'maximo_s': round(max(tempos), 6),
+        'repeticoes': repeticoes,
+    }, resultado
+
+
+def _commit_atual():
+    try:
+        resultado = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                   capture_output=True, text=True, timeout=10)
+        return resultado.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ------------------------------
+# ETAPAS
+# ------------------------------
+def etapa_persistencia(dados, args, pasta):
+    from utils.persistencia import Persistencia
+
+    def criar(diretorio):
+        if args.persistencia == 'sqlite':
+            from utils.persistencia_sqlite import PersistenciaSQLite
+            return PersistenciaSQLite(caminho_banco=os.path.join(diretorio, 'videos.db'))
+        return Persistencia(base_dir=diretorio, apenas_base_dir=True)
+
+    ids = [f"bench{i:06d}" for i in range(args.videos)]
+    diretorios = []
+
+    def gravar():
+        diretorio = tempfile.mkdtemp(prefix='persistencia_', dir=pasta)
+        diretorios.append(diretorio)
+        banco = criar(diretorio)
+        for video_id in ids:
+            banco.salvar_video(f"https://www.youtube.com/watch?v={video_id}", video_sintetico(dados, args.minutos))
+        # As leituras abrem o diretório em outra instância: o índice precisa estar no disco
+        # (o SQLite grava cada alteração na hora)
+        if hasattr(banco, 'sincronizar_indice'):
+            banco.sincronizar_indice()
+        return diretorio
+
+    resultado = {}
+    resultado['gravacao'], diretorio = medir(gravar, args.repeticoes)
+
+    def ler_frio():
+        banco = criar(diretorio)
+        return [banco.obter_video_por_id(video_id) for video_id in ids]
+
+    banco_quente = criar(diretorio)
+    for video_id in ids:
+        banco_quente.obter_video_por_id(video_id)
+
+    resultado['leitura_fria'], _ = medir(ler_frio, args.repeticoes)
+    resultado['leitura_quente'], _ = medir(
+        lambda: [banco_quente.obter_video_por_id(video_id) for video_id in ids], args.repeticoes
+    )
+    resultado['listagem'], listagem = medir(
+        lambda: banco_quente.listar_resumos(pagina=1, por_pagina=20, ordenar='titulo'), args.repeticoes
+    )
+    if listagem.get('total') != len(ids):
+        raise RuntimeError(f"Listagem com {listagem.get('total')} de {len(ids)} vídeos gravados")
+    resultado['videos'] = len(ids)
+    resultado['backend'] = args.persistencia
+    resultado['listados'] = listagem.get('total')
+    return resultado
+
+
+def etapa_blocos(dados, args, pasta):
+    from utils.blocos_analise import montar_blocos, orcamento_tokens
+    from utils.prefiltro_analise import selecionar_segmentos
+
+    orcamento = orcamento_tokens(args.contexto, TOKENS_PROMPT)
+    resultado = {}
+    resultado['prefiltro'], (selecionados, resumo) = medir(
+        lambda: selecionar_segmentos(dados['segmentos'], args.fracao_prefiltro), args.repeticoes
+    )
+    resultado['blocos_completos'], completos = medir(
+        lambda: montar_blocos(dados['segmentos'], orcamento), args.repeticoes
+    )
+    resultado['blocos_filtrados'], filtrados = medir(
+        lambda: montar_blocos(selecionados, orcamento), args.repeticoes
+    )
+    resultado['orcamento_tokens'] = orcamento
+    resultado['total_blocos'] = len(completos)
+    resultado['total_blocos_prefiltro'] = len(filtrados)
+    resultado['tokens_mantidos'] = resumo['tokens_mantidos']
+    resultado['tokens_total'] = resumo['tokens_total']
+    return resultado
+
+
+def _resolver_citacoes(indice, sugestoes):
+    from utils.alinhamento import alinhar_citacao
+
+    resolvidas = []
+    for sug in sugestoes:
+        inicio = alinhar_citacao(indice, sug['citacao_inicio'])
+        if not inicio:
+            continue
+        inicio_sec = indice.segmentos[inicio['segmento_inicio']]['inicio']
+        fim = alinhar_citacao(indice, sug['citacao_fim'], a_partir_de=inicio_sec)
+        if fim:
+            resolvidas.append((sug, inicio_sec, indice.segmentos[fim['segmento_fim']]['fim'],
+                               min(inicio['confianca'], fim['confianca'])))
+    return resolvidas
+
+
+def etapa_alinhamento(dados, args, pasta):
+    from utils.indice_transcricao import IndiceTranscricao
+
+    resultado = {}
+    resultado['indice'], indice = medir(lambda: IndiceTranscricao(dados['segmentos']), args.repeticoes)
+    resultado['citacoes'], resolvidas = medir(
+        lambda: _resolver_citacoes(indice, dados['sugestoes']), args.repeticoes
+    )
+    resultado['total_citacoes'] = len(dados['sugestoes'])
+    resultado['localizadas'] = len(resolvidas)
+    return resultado
+
+
+def etapa_ranking(dados, args, pasta):
+    from utils.indice_transcricao import IndiceTranscricao
+    from utils.ranking_sugestoes import encaixe_duracao, forca_gancho, ranquear, score_ia
+
+    indice = IndiceTranscricao(dados['segmentos'])
+    resolvidas = _resolver_citacoes(indice, dados['sugestoes'])
+
+    def ranquear_todas():
+        candidatos = [{
+            'sugestao': sug,
+            'inicio': inicio,
+            'fim': max(fim, inicio + 50),
+            'score_ia': score_ia(sug),
+            'gancho': forca_gancho(sug['citacao_inicio'], indice.inicia_frase(indice.posicao_no_tempo(inicio))),
+            'duracao': encaixe_duracao(max(fim - inicio, 50)),
+            'alinhamento': confianca,
+        } for sug, inicio, fim, confianca in resolvidas]
+        return ranquear(candidatos, max(5, int(args.minutos * 60 / 300)))
+
+    resultado = {}
+    resultado['ranking'], melhores = medir(ranquear_todas, args.repeticoes)
+    resultado['candidatos'] = len(resolvidas)
+    resultado['selecionados'] = len(melhores)
+    return resultado
+
+
+def _cortes(dados, quantidade):
+    """Intervalos de shorts espalhados pela pregação"""
+    segmentos = dados['segmentos']
+    passo = max(1, len(dados['pregacao']) // (quantidade + 1))
+    cortes = []
+    for posicao in dados['pregacao'][passo::passo][:quantidade]:
+        inicio = segmentos[posicao]['inicio']
+        cortes.append((inicio, inicio + 60.0))
+    return cortes
+
+
+def etapa_legendas(dados, args, pasta):
+    from utils.legendas import eventos_karaoke, eventos_legenda, filtro_ass, gerar_ass
+    from utils.perfis_render import filtro_vertical, obter_perfil_render
+
+    perfil = obter_perfil_render('final')
+    cortes = _cortes(dados, args.shorts)
+
+    def montar_filtros():
+        filtros = []
+        for numero, (inicio, fim) in enumerate(cortes):
+            caminho_ass = os.path.join(pasta, f"legendas_{numero}.ass")
+            eventos = eventos_legenda(dados['segmentos'], inicio, fim, fim - inicio)
+            karaoke = eventos_karaoke(dados['palavras'], inicio, fim, fim - inicio)
+            gerar_ass(eventos, fim - inicio, caminho_ass, karaoke=karaoke)
+            filtros.append(filtro_vertical(perfil) + "," + filtro_ass(caminho_ass))
+        return filtros
+
+    resultado = {}
+    resultado['filtros'], filtros = medir(montar_filtros, args.repeticoes)
+    resultado['shorts'] = len(filtros)
+    return resultado
+
+
+def etapa_analise(dados, args, pasta):
+    import importlib.util
+
+    try:
+        import flask  # noqa: F401 - rotas.analise registra um Blueprint
+    except ImportError:
+        return {'ignorada': 'Flask não instalado'}
+
+    from utils.persistencia import persistencia
+
+    spec = importlib.util.spec_from_file_location('analise_benchmark', os.path.join(BASE_DIR, 'rotas', 'analise.py'))
+    analise = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(analise)
+
+    video_id = persistencia.salvar_video("https://www.youtube.com/watch?v=benchanalis",
+                                         video_sintetico(dados, args.minutos))
+
+    def analisar(prefiltro):
+        resposta, status = analise.executar_analise(
+            video_id=video_id, reprocessar=True, usar_cache_llm=False, prefiltro=prefiltro
+        )
+        return resposta
+
+    resultado = {'provedor': analise._provedor_llm.nome}
+    resultado['completa'], resposta = medir(lambda: analisar(False), args.repeticoes)
+    resultado['blocos'] = resposta.get('plano_blocos', {}).get('total_blocos')
+    resultado['com_prefiltro'], resposta = medir(lambda: analisar(True), args.repeticoes)
+    resultado['blocos_prefiltro'] = resposta.get('plano_blocos', {}).get('total_blocos')
+    resultado['sugestoes'] = len(resposta.get('sugestoes', []))
+    return resultado
+
+
+def _ffmpeg(comando):
+    resultado = subprocess.run(comando, capture_output=True, text=True, timeout=1800)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"ffmpeg falhou: {resultado.stderr[-500:]}")
+
+
+def etapa_render(dados, args, pasta):
+    if not shutil.which('ffmpeg'):
+        return {'ignorada': 'ffmpeg não encontrado'}
+
+    from utils.legendas import eventos_legenda, filtro_ass, gerar_ass
+    from utils.perfis_render import filtro_vertical, obter_perfil_render, opcoes_encoder
+
+    duracao = args.duracao_video
+    fonte = os.path.join(pasta, 'fonte.mp4')
+    # Barras de teste com tom e ruído rosa modulados em ~4 Hz (ritmo de sílabas)
+    comando_fonte = [
+        "ffmpeg", "-nostdin",
+        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={duracao}",
+        "-f", "lavfi", "-i", f"sine=frequency=220:duration={duracao}",
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.3:duration={duracao}",
+        "-filter_complex", "[1:a][2:a]amix=inputs=2,tremolo=f=4:d=0.8[a]",
+        "-map", "0:v", "-map", "[a]",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "60", "-c:a", "aac", "-shortest",
+        "-y", fonte
+    ]
+    resultado = {}
+    resultado['midia_sintetica'], _ = medir(lambda: _ffmpeg(comando_fonte), 1)
+
+    # Short de até 60 s a partir de 10 s (ou de 1/6 do vídeo, se ele for curto)
+    inicio = min(10.0, duracao / 6)
+    fim = min(inicio + 60.0, duracao)
+    caminho_ass = os.path.join(pasta, 'render.ass')
+    gerar_ass(eventos_legenda(dados['segmentos'], inicio, fim, fim - inicio), fim - inicio, caminho_ass)
+
+    saida_copia = os.path.join(pasta, 'preview_copia.mp4')
+    resultado['preview_copia'], _ = medir(lambda: _ffmpeg([
+        "ffmpeg", "-nostdin", "-ss", str(inicio), "-i", fonte, "-t", str(fim - inicio),
+        "-c", "copy", "-avoid_negative_ts", "make_zero", "-y", saida_copia
+    ]), args.repeticoes)
+
+    threads = os.cpu_count() or 1
+    for nome in args.perfis.split(','):
+        perfil = obter_perfil_render(nome)
+        saida = os.path.join(pasta, f"short_{nome}.mp4")
+        comando = [
+            "ffmpeg", "-nostdin", "-ss", str(inicio), "-t", str(fim - inicio), "-i", fonte,
+            "-vf", filtro_vertical(perfil) + "," + filtro_ass(caminho_ass),
+            *opcoes_encoder(perfil, threads),
+            "-y", saida
+        ]
+        resultado[f"perfil_{nome}"], _ = medir(lambda: _ffmpeg(comando), args.repeticoes)
+    resultado['duracao_short_s'] = fim - inicio
+    return resultado
+
+
+def executar(args):
+    pasta = tempfile.mkdtemp(prefix='benchmark_shorts_')
+    # Tudo que as etapas gravam fica na pasta temporária; a análise usa o provedor replay
+    os.environ['DADOS_DIR'] = os.path.join(pasta, 'dados')
+    os.environ['LLM_CACHE_DIR'] = os.path.join(pasta, 'cache_llm')
+    os.environ['LLM_PROVEDOR'] = 'replay'
+    os.environ.setdefault('LLM_REPLAY_LATENCIA', str(args.latencia))
+    os.environ.setdefault('LLM_REPLAY_TOKENS_SEGUNDO', '0')
+    sys.path.insert(0, BASE_DIR)
+
+    try:
+        inicio = time.perf_counter()
+        segmentos, palavras, pregacao = gerar_transcricao(args.minutos, args.semente)
+        dados = {
+            'segmentos': segmentos,
+            'palavras': palavras,
+            'pregacao': pregacao,
+            'sugestoes': gerar_citacoes(segmentos, pregacao, args.citacoes, args.semente),
+        }
+        print(f"[BENCHMARK] Transcrição sintética: {len(segmentos)} segmentos, {len(palavras['texto'])} "
+              f"palavras em {time.perf_counter() - inicio:.2f}s", file=sys.stderr)
+
+        funcoes = {
+            'persistencia': etapa_persistencia,
+            'blocos': etapa_blocos,
+            'alinhamento': etapa_alinhamento,
+            'ranking': etapa_ranking,
+            'legendas': etapa_legendas,
+            'analise': etapa_analise,
+            'render': etapa_render,
+        }
+        etapas = {}
+        for nome in args.etapas.split(','):
+            print(f"[BENCHMARK] Etapa {nome}...", file=sys.stderr)
+            etapas[nome] = funcoes[nome](dados, args, pasta)
+
+        return {
+            'commit': _commit_atual(),
+            'data': datetime.now().isoformat(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'cpus': os.cpu_count(),
+            },
+            'parametros': {
+                'minutos': args.minutos,
+                'semente': args.semente,
+                'repeticoes': args.repeticoes,
+                'videos': args.videos,
+                'citacoes': args.citacoes,
+                'shorts': args.shorts,
+                'contexto': args.contexto,
+                'fracao_prefiltro': args.fracao_prefiltro,
+            },
+            'transcricao': {'segmentos': len(segmentos), 'palavras': len(palavras['texto'])},
+            'etapas': etapas,
+        }
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do Criador de Shorts com dados sintéticos")
+    parser.add_argument('--etapas', default=','.join(ETAPAS), help=f"Etapas separadas por vírgula ({', '.join(ETAPAS)})")
+    parser.add_argument('--minutos', type=float, default=120, help="Duração da transcrição sintética")
+    parser.add_argument('--semente', type=int, default=42, help="Semente dos dados sintéticos")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Repetições de cada medição")
+    parser.add_argument('--videos', type=int, default=50, help="Vídeos gravados na etapa de persistência")
+    parser.add_argument('--persistencia', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--citacoes', type=int, default=60, help="Sugestões sintéticas a alinhar")
+    parser.add_argument('--shorts', type=int, default=20, help="Shorts na etapa de legendas")
+    parser.add_argument('--contexto', type=int, default=8192, help="Janela de contexto (tokens) dos blocos")
+    parser.add_argument('--fracao-prefiltro', type=float, default=0.4)
+    parser.add_argument('--latencia', type=float, default=0.0, help="Latência do provedor replay (s)")
+    parser.add_argument('--duracao-video', type=float, default=90, help="Duração do vídeo sintético (s)")
+    parser.add_argument('--perfis', default='preview,final', help="Perfis renderizados")
+    parser.add_argument('--saida', help="Arquivo JSON do resultado (padrão: stdout)")
+    args = parser.parse_args()
+
+    if args.duracao_video <= 0:
+        parser.error("--duracao-video precisa ser maior que zero")
+
+    desconhecidas = set(args.etapas.split(',')) - set(ETAPAS)
+    if desconhecidas:
+        parser.error(f"Etapas desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    resultado = json.dumps(executar(args), ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(resultado + "\n")
+        print(f"[BENCHMARK] Resultado salvo em {args.saida}", file=sys.stderr)
+    else:
+        print(resultado)
@@ -1,16 +1,16 @@
 """
-Rotas de Análise - Utiliza Ollama com estratégia de Chunking (Janela Deslizante)
+Rotas de Análise - Utiliza o LLM (Ollama por padrão) com estratégia de Chunking (Janela Deslizante)
 Focado em cortes virais evangélicos de alta retenção.
 """
 
 print("[DEBUG] >>> Carregando módulo analise.py OTIMIZADO <<<")
 
 from flask import Blueprint, request, jsonify
-import ollama
 import os
 import sys
-import json
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MIN_SHORT_DURATION = 50  # Aumentado para garantir conteúdo
@@ -18,9 +18,46 @@ MAX_SHORT_DURATION = 120 # Foco em 60-90s (Sweet spot do YouTube/TikTok)
 
 sys.path.insert(0, BASE_DIR)
 from utils.persistencia import persistencia
+from utils.escalonador import escalonador
+from utils.cache_llm import cache_llm, chave_llm
+from utils.indice_transcricao import IndiceTranscricao
+from utils.alinhamento import alinhar_citacao
+from utils.blocos_analise import estimar_tokens, montar_blocos, orcamento_tokens, plano_blocos
+from utils.prefiltro_analise import selecionar_segmentos
+from utils.resposta_llm import LeitorSugestoes, extrair_sugestoes, formato_resposta
+from utils.provedores_llm import MODELO_PADRAO, criar_provedor_llm
+from utils.ranking_sugestoes import encaixe_duracao, forca_gancho, ranquear, score_ia
 
 analise_bp = Blueprint('analise', __name__)
 
+# Blocos enviados ao modelo ao mesmo tempo por análise (o total entre análises
+# simultâneas é limitado pelos slots 'analise' do escalonador)
+ANALISE_PARALELA_MAX = max(1, int(os.environ.get('ANALISE_PARALELA_MAX', 4)))
+# Prazo total de cada chamada ao modelo (também o timeout de leitura entre
+# trechos do stream) e tentativas por bloco
+ANALISE_TIMEOUT_BLOCO = float(os.environ.get('ANALISE_TIMEOUT_BLOCO', 300))
+ANALISE_TENTATIVAS = max(1, int(os.environ.get('ANALISE_TENTATIVAS', 3)))
+# Contexto máximo por chamada (num_ctx): o Ollama reserva memória para o
+# contexto inteiro, então modelos de 128k usam no máximo este valor
+ANALISE_NUM_CTX = int(os.environ.get('ANALISE_NUM_CTX', 8192))
+# Fração do orçamento de cada bloco repetida no início do seguinte
+ANALISE_SOBREPOSICAO = float(os.environ.get('ANALISE_SOBREPOSICAO', 0.1))
+# Pré-filtro local: fração dos tokens da transcrição enviada à IA (1 desliga)
+# e teto opcional de chamadas por análise (0 = sem teto)
+ANALISE_PREFILTRO_FRACAO = float(os.environ.get('ANALISE_PREFILTRO_FRACAO', 0.4))
+ANALISE_MAX_BLOCOS = int(os.environ.get('ANALISE_MAX_BLOCOS', 0))
+# Transcrições que cabem nesse número de blocos vão inteiras
+ANALISE_PREFILTRO_MIN_BLOCOS = 3
+
+SISTEMA_ANALISE = 'Você é um especialista em viralização de vídeos cristãos. Retorne APENAS JSON válido.'
+OPCOES_ANALISE = {'temperature': 0.7} # Criatividade controlada
+# Saída estruturada: 'esquema' (esquema JSON das sugestões), 'json' ou vazio (texto livre)
+FORMATO_ANALISE = formato_resposta(os.environ.get('ANALISE_FORMATO', 'esquema'))
+
+# Provedor do modelo (LLM_PROVEDOR: ollama, openai ou replay), com timeout de
+# conexão e de leitura; o prazo total da chamada é controlado em _ler_resposta
+_provedor_llm = criar_provedor_llm(timeout=ANALISE_TIMEOUT_BLOCO)
+
 # Prompt focado na engenharia reversa de vídeos virais do meio Gospel
 PROMPT_ANALISE_GOSPEL = """
 Você é um editor sênior de canais cristãos virais (ex: Douglas Gonçalves, Deive Leonardo). Sua especialidade é identificar momentos de "kairós" (tempo oportuno) em pregações.
@@ -51,38 +88,382 @@ Transcrição do TRECHO:
 {transcricao_trecho}
 """
 
-def encontrar_timestamps_por_texto(transcricao_completa_objs, texto_inicio, texto_fim):
+def encontrar_timestamps_por_texto(transcricao_completa_objs, texto_inicio, texto_fim, indice=None):
     """
     Tenta localizar os segundos exatos buscando o texto dentro dos segmentos do Whisper.
     Isso corrige a alucinação de tempo da IA.
+
+    A busca usa o índice de texto da transcrição (palavras normalizadas, sem
+    acentos nem pontuação); passe `indice` para reaproveitá-lo entre sugestões.
+    Citações parafraseadas ou que atravessam segmentos são alinhadas de forma
+    aproximada (utils/alinhamento.py).
+
+    Returns:
+        Tupla (inicio, fim, confiança); inicio/fim são None se a citação não
+        for encontrada e a confiança é a menor das duas citações
     """
+    if indice is None:
+        indice = IndiceTranscricao(transcricao_completa_objs)
     inicio_sec = None
     fim_sec = None
+    confianca = 0.0
+
+    # Busca Início
+    achado = alinhar_citacao(indice, texto_inicio)
+    if achado:
+        inicio_sec = indice.segmentos[achado['segmento_inicio']]['inicio']
+        confianca = achado['confianca']
+
+    # Busca Fim: melhor alinhamento a partir do segmento do início
+    achado = alinhar_citacao(indice, texto_fim, a_partir_de=inicio_sec or 0)
+    if achado:
+        fim_sec = indice.segmentos[achado['segmento_fim']]['fim']
+        confianca = min(confianca, achado['confianca'])
+
+    return inicio_sec, fim_sec, confianca
+
+def _intervalo_corte(inicio_real, fim_real, duracao_video):
+    """
+    Aplica a folga de áudio e os limites de duração a um corte localizado
+
+    Returns:
+        Tupla (inicio, fim, duracao) em segundos
+    """
+    # Padding de segurança (Áudio Breathing Room)
+    inicio_real = max(0, float(inicio_real) - 1.5)
+    fim_real = min(duracao_video, float(fim_real) + 1.5)
     
-    # Normalização simples para busca
-    texto_inicio_norm = texto_inicio.lower().replace("...", "").strip()
-    texto_fim_norm = texto_fim.lower().replace("...", "").strip()
+    # Validação de Duração
+    duracao = fim_real - inicio_real
     
-    # Busca Início
-    for seg in transcricao_completa_objs:
-        if texto_inicio_norm in seg['texto'].lower():
-            inicio_sec = seg['inicio']
-            break
-            
-    # Busca Fim (começando a busca de onde achou o início ou do começo)
-    start_search_index = 0
-    if inicio_sec:
-        # Otimização: buscar fim apenas após o início
-        pass 
-
-    for seg in transcricao_completa_objs:
-        if seg['inicio'] >= (inicio_sec if inicio_sec else 0):
-            if texto_fim_norm in seg['texto'].lower():
-                fim_sec = seg['fim']
-                # Se achou, paramos. Queremos o primeiro match após o início
-                break
+    # Se for muito curto, tentamos expandir para a próxima frase (contexto)
+    if duracao < MIN_SHORT_DURATION:
+        # Garante que não passou do final do vídeo
+        fim_real = min(duracao_video, fim_real + (MIN_SHORT_DURATION - duracao))
+        duracao = fim_real - inicio_real
+    
+    # Se for muito longo, cortamos
+    if duracao > MAX_SHORT_DURATION:
+        fim_real = inicio_real + MAX_SHORT_DURATION
+        duracao = MAX_SHORT_DURATION
+    return inicio_real, fim_real, duracao
+
+# Janela de contexto por modelo (só respostas do provedor ficam guardadas)
+_contextos_modelo = {}
+
+def _contexto_modelo(modelo_ollama):
+    """Janela de contexto do modelo informada pelo provedor (ANALISE_NUM_CTX se não souber)"""
+    if modelo_ollama in _contextos_modelo:
+        return _contextos_modelo[modelo_ollama]
+    try:
+        contexto = _provedor_llm.contexto(modelo_ollama)
+        if contexto:
+            _contextos_modelo[modelo_ollama] = contexto
+            return contexto
+    except Exception as e:
+        print(f"[AVISO] Contexto do modelo {modelo_ollama} indisponível: {str(e)}")
+    return ANALISE_NUM_CTX
+
+def planejar_blocos(segmentos_transcricao, modelo_ollama, prefiltro=True):
+    """
+    Divide a transcrição em blocos pelo orçamento de tokens do modelo
+
+    Com o pré-filtro, transcrições longas mandam à IA só as janelas mais
+    promissoras (até ANALISE_PREFILTRO_FRACAO dos tokens e ANALISE_MAX_BLOCOS
+    blocos).
+
+    Args:
+        segmentos_transcricao: Segmentos em ordem cronológica
+        modelo_ollama: Modelo que vai analisar os blocos
+        prefiltro: Aplica o pré-filtro local
+
+    Returns:
+        Tupla (blocos, plano, opções da chamada com o num_ctx usado)
+    """
+    contexto = min(ANALISE_NUM_CTX, _contexto_modelo(modelo_ollama))
+    orcamento = orcamento_tokens(contexto, estimar_tokens(SISTEMA_ANALISE + PROMPT_ANALISE_GOSPEL))
+
+    resumo_prefiltro = None
+    tokens_transcricao = sum(estimar_tokens(seg['texto']) + 1 for seg in segmentos_transcricao)
+    if prefiltro and tokens_transcricao > ANALISE_PREFILTRO_MIN_BLOCOS * orcamento:
+        # Cada bloco repete parte do anterior: o teto de chamadas desconta a sobreposição
+        max_tokens = int(ANALISE_MAX_BLOCOS * orcamento * (1 - ANALISE_SOBREPOSICAO)) or None
+        segmentos_transcricao, resumo_prefiltro = selecionar_segmentos(
+            segmentos_transcricao, ANALISE_PREFILTRO_FRACAO, max_tokens
+        )
+
+    blocos = montar_blocos(segmentos_transcricao, orcamento, ANALISE_SOBREPOSICAO)
+    plano = dict(plano_blocos(blocos, contexto, orcamento), modelo=modelo_ollama,
+                 provedor=_provedor_llm.nome, prefiltro=resumo_prefiltro)
+    return blocos, plano, dict(OPCOES_ANALISE, num_ctx=contexto)
+
+def _marcar_bloco(sugestoes_bloco, bloco):
+    # Adiciona offset temporal aproximado se a IA não devolver timestamp (fallback)
+    for s in sugestoes_bloco:
+        s['_bloco_inicio'] = bloco['inicio']
+    return sugestoes_bloco
+
+def _ler_resposta(modelo_ollama, prompt, opcoes):
+    """
+    Faz a chamada em streaming, lendo as sugestões conforme chegam
+
+    O timeout do cliente vale para cada leitura do stream, então um modelo
+    que continua gerando devagar nunca o atingiria: a chamada é encerrada
+    quando passa de ANALISE_TIMEOUT_BLOCO segundos no total.
+
+    Returns:
+        Tupla (leitor com o que chegou, exceção se o stream falhou ou None)
+    """
+    leitor = LeitorSugestoes()
+    try:
+        with escalonador.reservar('analise'):
+            limite = time.monotonic() + ANALISE_TIMEOUT_BLOCO
+            partes = _provedor_llm.conversar(
+                modelo_ollama,
+                [
+                    {'role': 'system', 'content': SISTEMA_ANALISE},
+                    {'role': 'user', 'content': prompt}
+                ],
+                formato=FORMATO_ANALISE,
+                opcoes=opcoes
+            )
+            try:
+                for parte in partes:
+                    leitor.alimentar(parte)
+                    if time.monotonic() > limite:
+                        raise TimeoutError(f"Resposta excedeu {ANALISE_TIMEOUT_BLOCO:g}s")
+            finally:
+                # Encerra o stream (e a conexão) se a leitura parou antes do fim
+                partes.close()
+    except Exception as e:
+        return leitor, e
+    return leitor, None
+
+def _analisar_bloco(bloco, modelo_ollama, opcoes, usar_cache=True):
+    """
+    Envia um bloco ao modelo, com timeout e novas tentativas em caso de falha
+
+    A resposta de cada bloco fica no cache do LLM, chaveada por modelo,
+    opções, formato, prompts e texto do bloco: um bloco que não mudou não é
+    reenviado. Uma resposta truncada aproveita as sugestões já completas;
+    só blocos sem nada aproveitável são repetidos.
+
+    Args:
+        bloco: Bloco de planejar_blocos
+        modelo_ollama: Modelo no provedor configurado
+        opcoes: Opções da chamada (com o num_ctx do plano)
+        usar_cache: Reaproveita a resposta do cache do LLM
+
+    Returns:
+        Lista de sugestões do bloco (vazia se todas as tentativas falharem)
+    """
+    prompt = PROMPT_ANALISE_GOSPEL.replace("{transcricao_trecho}", bloco['texto'])
+    # Respostas de outros provedores não se misturam com as do Ollama no cache
+    modelo_chave = modelo_ollama if _provedor_llm.nome == 'ollama' else f"{_provedor_llm.nome}:{modelo_ollama}"
+    chave = chave_llm(modelo_chave, dict(opcoes, format=FORMATO_ANALISE), SISTEMA_ANALISE,
+                      PROMPT_ANALISE_GOSPEL, bloco['texto'])
+
+    if usar_cache:
+        conteudo = cache_llm.obter(chave)
+        if conteudo is not None:
+            try:
+                sugestoes_bloco = extrair_sugestoes(conteudo)
+                print(f"   -> {len(sugestoes_bloco)} sugestões do cache no bloco {int(bloco['inicio'])}s.")
+                return _marcar_bloco(sugestoes_bloco, bloco)
+            except ValueError:
+                pass
+
+    for tentativa in range(1, ANALISE_TENTATIVAS + 1):
+        leitor, erro = _ler_resposta(modelo_ollama, prompt, opcoes)
+
+        if leitor.sugestoes or (erro is None and leitor.completo):
+            if erro is None:
+                # Só respostas recebidas inteiras entram no cache (truncadas pelo modelo incluídas)
+                cache_llm.guardar(chave, leitor.texto, {'modelo': modelo_ollama, 'bloco_inicio': bloco['inicio']})
+            if leitor.truncado:
+                print(f"   [AVISO] Resposta incompleta no bloco {int(bloco['inicio'])}s "
+                      f"({str(erro) if erro else 'JSON cortado'}): sugestões completas aproveitadas")
+            print(f"   -> {len(leitor.sugestoes)} sugestões encontradas no bloco {int(bloco['inicio'])}s.")
+            return _marcar_bloco(list(leitor.sugestoes), bloco)
+
+        motivo = str(erro) if erro else 'resposta sem JSON aproveitável'
+        print(f"[ERRO] Falha ao processar bloco {bloco['inicio']} "
+              f"(tentativa {tentativa}/{ANALISE_TENTATIVAS}): {motivo}")
+        if tentativa < ANALISE_TENTATIVAS:
+            time.sleep(2 ** tentativa)
+    return []
+
+def _analisar_blocos(blocos, modelo_ollama, opcoes, progresso=None, usar_cache=True):
+    """
+    Analisa os blocos em paralelo (até ANALISE_PARALELA_MAX por vez)
+
+    Returns:
+        Sugestões de todos os blocos, na ordem dos blocos
+    """
+    if not blocos:
+        return []
+
+    resultados = [None] * len(blocos)
+    concluidos = 0
+    with ThreadPoolExecutor(max_workers=min(ANALISE_PARALELA_MAX, len(blocos)),
+                            thread_name_prefix='analise') as pool:
+        futuros = {
+            pool.submit(_analisar_bloco, bloco, modelo_ollama, opcoes, usar_cache): indice
+            for indice, bloco in enumerate(blocos)
+        }
+        for futuro in as_completed(futuros):
+            resultados[futuros[futuro]] = futuro.result()
+            concluidos += 1
+            if progresso:
+                progresso(concluidos / len(blocos))
+
+    return [sugestao for sugestoes_bloco in resultados for sugestao in sugestoes_bloco]
+
+def executar_analise(video_id=None, url=None, reprocessar=False, progresso=None, usar_cache_llm=True,
+                     prefiltro=True):
+    """
+    Gera (ou recupera do cache) as sugestões de cortes de um vídeo
+
+    Args:
+        video_id: ID do vídeo
+        url: URL do vídeo (tem prioridade sobre o ID)
+        reprocessar: Ignora a análise salva e refaz do zero (blocos inalterados
+            vêm do cache do LLM)
+        progresso: Callback opcional chamado com a fração (0 a 1) já analisada
+        usar_cache_llm: Reaproveita respostas do cache do LLM (False força novas chamadas)
+        prefiltro: Envia à IA só as janelas mais promissoras (False envia a transcrição inteira)
+
+    Returns:
+        Tupla (resposta, status_http)
+    """
+    # Recuperação dos dados
+    if url:
+        video_salvo = persistencia.obter_video(url)
+        video_id = video_salvo.get('video_id') if video_salvo else None
+    else:
+        video_salvo = persistencia.obter_video_por_id(video_id)
+
+    if not video_salvo:
+        return {'success': False, 'error': 'Vídeo não encontrado'}, 404
+
+    # Se já existe e não é reprocessamento, retorna cache
+    if not reprocessar and 'analise' in video_salvo and video_salvo['analise'].get('sugestoes'):
+        return {
+            'success': True,
+            'sugestoes': video_salvo['analise']['sugestoes'],
+            'video_id': video_id,
+            'cache': True
+        }, 200
+
+    # Precisamos dos segmentos detalhados (com timestamp) e não só do texto corrido
+    segmentos_transcricao = video_salvo.get('transcricao', {}).get('segmentos', [])
+    if not segmentos_transcricao:
+        return {'success': False, 'error': 'Segmentos da transcrição não encontrados. Refaça a transcrição.'}, 400
+
+    # ==================================================================
+    # ESTRATÉGIA DE CHUNKING (ORÇAMENTO DE TOKENS DO MODELO)
+    # ==================================================================
+    
+    duracao_total = video_salvo.get('info_video', {}).get('duracao_segundos', 0)
+    
+    # Índice construído uma vez: segmentos ordenados e citações por n-gramas
+    indice = IndiceTranscricao(segmentos_transcricao)
+
+    print(f"[ANALISE] Iniciando análise por blocos. Duração total: {duracao_total}s")
+    
+    modelo_ollama = MODELO_PADRAO
     
-    return inicio_sec, fim_sec
+    # Segmentos inteiros até o orçamento de tokens, com sobreposição alinhada em frases
+    blocos, plano, opcoes = planejar_blocos(indice.segmentos, modelo_ollama, prefiltro)
+
+    # Os blocos são independentes: vão ao modelo em paralelo e voltam na ordem original
+    print(f"[ANALISE] {len(blocos)} blocos de até {plano['orcamento_tokens']} tokens "
+          f"(contexto {plano['contexto_tokens']}), até {ANALISE_PARALELA_MAX} em paralelo")
+    todas_sugestoes_brutas = _analisar_blocos(blocos, modelo_ollama, opcoes, progresso, usar_cache_llm)
+
+    # ==================================================================
+    # POS-PROCESSAMENTO: TEMPOS DE TODAS AS SUGESTÕES, DEPOIS O RANKING
+    # ==================================================================
+    print("[ANALISE] Refinando tempos e validando cortes...")
+    
+    duracao_video = float(duracao_total or indice.segmentos[-1]['fim'])
+    candidatos = []
+
+    for sug in todas_sugestoes_brutas:
+        # Tenta achar o timestamp exato pelo texto citado pela IA
+        txt_ini = sug.get('citacao_inicio', '')
+        txt_fim = sug.get('citacao_fim', '')
+        
+        inicio_real, fim_real, confianca = encontrar_timestamps_por_texto(segmentos_transcricao, txt_ini, txt_fim, indice)
+        
+        # Verifica se tanto o início quanto o fim foram encontrados
+        if inicio_real is None or fim_real is None:
+            print(f"   [SKIP] Sugestão ignorada (texto não encontrado na transcrição): {sug.get('titulo')}")
+            continue
+
+        inicia_frase = indice.inicia_frase(indice.posicao_no_tempo(inicio_real))
+        inicio_real, fim_real, duracao = _intervalo_corte(inicio_real, fim_real, duracao_video)
+
+        candidatos.append({
+            'sugestao': sug,
+            'inicio': inicio_real,
+            'fim': fim_real,
+            'score_ia': score_ia(sug),
+            'gancho': forca_gancho(txt_ini, inicia_frase),
+            'duracao': encaixe_duracao(duracao),
+            'alinhamento': confianca,
+        })
+
+    # Limita a quantidade total baseada na duração do vídeo
+    max_shorts = max(5, int(duracao_total / 300))
+    # Pontuação determinística e remoção de cortes repetidos entre blocos
+    melhores = ranquear(candidatos, max_shorts)
+    print(f"[ANALISE] {len(todas_sugestoes_brutas)} sugestões, {len(candidatos)} localizadas, "
+          f"{len(melhores)} selecionadas")
+
+    sugestoes_finais = []
+    for corte in melhores:
+        sug = corte['sugestao']
+        sugestoes_finais.append({
+            'titulo': sug.get('titulo', 'Short Viral'),
+            'inicio_segundos': round(corte['inicio'], 2),
+            'fim_segundos': round(corte['fim'], 2),
+            'duracao_segundos': round(corte['fim'] - corte['inicio'], 2),
+            'descricao': sug.get('resumo', ''),
+            'potencial_viral': sug.get('gatilho_viral', 'Impacto Emocional'),
+            'hook': sug.get('citacao_inicio', ''),
+            'confianca_alinhamento': corte['alinhamento'],
+            'pontuacao': corte['pontuacao'],
+            'ocorrencias': corte['ocorrencias'],
+            'tags': ["#gospel", "#pregação", "#fé", "#motivação", "#shorts"]
+        })
+
+    # Ordena cronologicamente para facilitar a edição
+    sugestoes_finais.sort(key=lambda x: x['inicio_segundos'])
+
+    if not sugestoes_finais:
+         return {
+            'success': False,
+            'error': 'A IA analisou os blocos mas não conseguiu extrair cortes com qualidade suficiente.'
+        }, 500
+
+    analise_data = {
+        'sugestoes': sugestoes_finais,
+        'total_sugestoes': len(sugestoes_finais),
+        'modelo_ia': modelo_ollama,
+        'provedor_ia': _provedor_llm.nome,
+        'metodo': 'chunking_tokens_ranking',
+        'plano_blocos': plano
+    }
+    persistencia.atualizar_etapa(video_id, 'analise', analise_data)
+
+    return {
+        'success': True,
+        'sugestoes': sugestoes_finais,
+        'video_id': video_id,
+        'plano_blocos': plano,
+        'cache': False
+    }, 200
 
 @analise_bp.route('/analise/sugestoes', methods=['POST'])
 def gerar_sugestoes():
@@ -99,187 +480,50 @@ def gerar_sugestoes():
         data = request.json
         video_id = data.get('video_id')
         url = data.get('url')
-        transcricao_texto = data.get('transcricao_texto') # Texto corrido
         reprocessar = bool(data.get('reprocessar'))
 
-        # Recuperação dos dados
-        if url:
-            video_salvo = persistencia.obter_video(url)
-            video_id = video_salvo.get('video_id') if video_salvo else None
-        else:
-            video_salvo = persistencia.obter_video_por_id(video_id)
+        resposta, status = executar_analise(
+            video_id=video_id,
+            url=url,
+            reprocessar=reprocessar,
+            usar_cache_llm=data.get('cache_llm', True) is not False,
+            prefiltro=data.get('prefiltro', True) is not False
+        )
+        return jsonify(resposta), status
 
-        if not video_salvo:
-            return jsonify({'success': False, 'error': 'Vídeo não encontrado'}), 404
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        # Se já existe e não é reprocessamento, retorna cache
-        if not reprocessar and 'analise' in video_salvo and video_salvo['analise'].get('sugestoes'):
-            return jsonify({
-                'success': True,
-                'sugestoes': video_salvo['analise']['sugestoes'],
-                'video_id': video_id,
-                'cache': True
-            })
-
-        # Precisamos dos segmentos detalhados (com timestamp) e não só do texto corrido
-        segmentos_transcricao = video_salvo.get('transcricao', {}).get('segmentos', [])
-        if not segmentos_transcricao:
-            return jsonify({'success': False, 'error': 'Segmentos da transcrição não encontrados. Refaça a transcrição.'}), 400
-
-        # ==================================================================
-        # ESTRATÉGIA DE CHUNKING (JANELA DESLIZANTE)
-        # ==================================================================
-        
-        duracao_total = video_salvo.get('info_video', {}).get('duracao_segundos', 0)
-        
-        # Configuração dos blocos
-        TAMANHO_BLOCO_MINUTOS = 10 # Analisa de 10 em 10 minutos
-        OVERLAP_MINUTOS = 1        # Volta 1 minuto para não perder contexto
-        
-        tamanho_bloco_sec = TAMANHO_BLOCO_MINUTOS * 60
-        overlap_sec = OVERLAP_MINUTOS * 60
-        
-        cursor = 0
-        todas_sugestoes_brutas = []
-        
-        print(f"[ANALISE] Iniciando análise por blocos. Duração total: {duracao_total}s")
-        
-        modelo_ollama = os.environ.get('OLLAMA_MODEL', 'llama3.2:3b')
-        
-        while cursor < duracao_total:
-            fim_bloco = min(cursor + tamanho_bloco_sec, duracao_total)
-            print(f"[ANALISE] Processando bloco: {int(cursor)}s até {int(fim_bloco)}s")
-            
-            # Filtra segmentos do bloco atual
-            texto_bloco = ""
-            for seg in segmentos_transcricao:
-                if seg['inicio'] >= cursor and seg['fim'] <= fim_bloco:
-                    texto_bloco += f"{seg['texto']} "
-            
-            if len(texto_bloco) > 200: # Só analisa se tiver conteúdo suficiente
-                prompt = PROMPT_ANALISE_GOSPEL.replace("{transcricao_trecho}", texto_bloco)
-                
-                try:
-                    resposta = ollama.chat(
-                        model=modelo_ollama,
-                        messages=[
-                            {'role': 'system', 'content': 'Você é um especialista em viralização de vídeos cristãos. Retorne APENAS JSON válido.'},
-                            {'role': 'user', 'content': prompt}
-                        ],
-                        options={'temperature': 0.7} # Criatividade controlada
-                    )
-                    
-                    conteudo = resposta['message']['content'].strip()
-                    # Limpeza básica de Markdown
-                    if conteudo.startswith('```'):
-                        conteudo = conteudo.split('\n', 1)[1].rsplit('\n', 1)[0]
-                    
-                    # Extração de JSON (robusta)
-                    import re
-                    json_match = re.search(r'\{.*\}', conteudo, re.DOTALL)
-                    if json_match:
-                        resultado = json.loads(json_match.group())
-                        sugestoes_bloco = resultado.get('sugestoes', [])
-                        
-                        # Adiciona offset temporal aproximado se a IA não devolver timestamp (fallback)
-                        for s in sugestoes_bloco:
-                            s['_bloco_inicio'] = cursor 
-                        
-                        todas_sugestoes_brutas.extend(sugestoes_bloco)
-                        print(f"   -> {len(sugestoes_bloco)} sugestões encontradas neste bloco.")
-                    
-                except Exception as e:
-                    print(f"[ERRO] Falha ao processar bloco {cursor}: {str(e)}")
-            
-            # Avança o cursor (menos o overlap)
-            cursor += (tamanho_bloco_sec - overlap_sec)
-
-       # ==================================================================
-        # POS-PROCESSAMENTO E REFINAMENTO DE TEMPOS (CORRIGIDO)
-        # ==================================================================
-        print("[ANALISE] Refinando tempos e validando cortes...")
-        
-        sugestoes_finais = []
-        
-        # Ordena por score (se houver) para pegar os melhores
-        todas_sugestoes_brutas.sort(key=lambda x: x.get('score', 0), reverse=True)
-        
-        # Limita a quantidade total baseada na duração do vídeo
-        max_shorts = max(5, int(duracao_total / 300))
-        top_sugestoes = todas_sugestoes_brutas[:max_shorts]
-
-        for sug in top_sugestoes:
-            # Tenta achar o timestamp exato pelo texto citado pela IA
-            txt_ini = sug.get('citacao_inicio', '')
-            txt_fim = sug.get('citacao_fim', '')
-            
-            inicio_real, fim_real = encontrar_timestamps_por_texto(segmentos_transcricao, txt_ini, txt_fim)
-            
-            # CORREÇÃO AQUI: Verifica se tanto o início quanto o fim foram encontrados
-            if inicio_real is None or fim_real is None:
-                print(f"   [SKIP] Sugestão ignorada (texto não encontrado na transcrição): {sug.get('titulo')}")
-                continue
-
-            # Padding de segurança (Áudio Breathing Room)
-            inicio_real = max(0, float(inicio_real) - 1.5)
-            
-            # Garante que fim_real é float antes de somar
-            fim_real = float(fim_real)
-            fim_real = min(float(duracao_total), fim_real + 1.5)
-            
-            # Validação de Duração
-            duracao = fim_real - inicio_real
-            
-            # Se for muito curto, tentamos expandir para a próxima frase (contexto)
-            if duracao < MIN_SHORT_DURATION:
-                fim_real += (MIN_SHORT_DURATION - duracao)
-                # Garante que não passou do final do vídeo
-                fim_real = min(float(duracao_total), fim_real)
-                duracao = fim_real - inicio_real
-            
-            # Se for muito longo, cortamos
-            if duracao > MAX_SHORT_DURATION:
-                fim_real = inicio_real + MAX_SHORT_DURATION
-                duracao = MAX_SHORT_DURATION
-
-            sugestoes_finais.append({
-                'titulo': sug.get('titulo', 'Short Viral'),
-                'inicio_segundos': round(inicio_real, 2),
-                'fim_segundos': round(fim_real, 2),
-                'duracao_segundos': round(duracao, 2),
-                'descricao': sug.get('resumo', ''),
-                'potencial_viral': sug.get('gatilho_viral', 'Impacto Emocional'),
-                'hook': txt_ini,
-                'tags': ["#gospel", "#pregação", "#fé", "#motivação", "#shorts"]
-            })
-
-        # Ordena cronologicamente para facilitar a edição
-        sugestoes_finais.sort(key=lambda x: x['inicio_segundos'])
-
-        if not sugestoes_finais:
-             return jsonify({
-                'success': False,
-                'error': 'A IA analisou os blocos mas não conseguiu extrair cortes com qualidade suficiente.'
-            }), 500
-
-        analise_data = {
-            'sugestoes': sugestoes_finais,
-            'total_sugestoes': len(sugestoes_finais),
-            'modelo_ia': modelo_ollama,
-            'metodo': 'chunking_v2'
-        }
-        persistencia.atualizar_etapa(video_id, 'analise', analise_data)
+@analise_bp.route('/analise/cache', methods=['GET'])
+def estatisticas_cache_llm():
+    """Ocupação e taxa de acertos do cache de respostas do LLM"""
+    try:
+        return jsonify({'success': True, 'cache_llm': cache_llm.estatisticas()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        return jsonify({
-            'success': True,
-            'sugestoes': sugestoes_finais,
-            'video_id': video_id,
-            'cache': False
-        })
+@analise_bp.route('/analise/plano', methods=['GET'])
+def plano_analise():
+    """Divisão em blocos que a análise usaria, sem chamar o modelo"""
+    try:
+        video_id = request.args.get('video_id')
+        modelo_ollama = request.args.get('modelo') or MODELO_PADRAO
+        prefiltro = request.args.get('prefiltro', '1') not in ('0', 'false')
 
+        video_salvo = persistencia.obter_video_por_id(video_id)
+        if not video_salvo:
+            return jsonify({'success': False, 'error': 'Vídeo não encontrado'}), 404
+        segmentos = video_salvo.get('transcricao', {}).get('segmentos', [])
+        if not segmentos:
+            return jsonify({'success': False, 'error': 'Segmentos da transcrição não encontrados'}), 400
+
+        _blocos, plano, _opcoes = planejar_blocos(IndiceTranscricao(segmentos).segmentos, modelo_ollama, prefiltro)
+        return jsonify({'success': True, 'plano_blocos': plano})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @analise_bp.route('/analise/atualizar-intervalo', methods=['POST'])
@@ -296,19 +540,21 @@ def atualizar_intervalo():
         if not video_salvo:
             return jsonify({'success': False, 'error': 'Vídeo não encontrado'}), 404
 
-        analise = video_salvo.get('analise', {})
-        sugestoes = analise.get('sugestoes', [])
-
-        if 0 <= indice < len(sugestoes):
-            sugestoes[indice]['inicio_segundos'] = inicio_segundos
-            sugestoes[indice]['fim_segundos'] = fim_segundos
-            sugestoes[indice]['duracao_segundos'] = fim_segundos - inicio_segundos
-            
-            persistencia.atualizar_etapa(video_id, 'analise', analise)
-            
-            return jsonify({'success': True, 'sugestao': sugestoes[indice]})
-        
-        return jsonify({'success': False, 'error': 'Índice inválido'}), 400
+        sugestoes = video_salvo.get('analise', {}).get('sugestoes', [])
+        if not (isinstance(indice, int) and 0 <= indice < len(sugestoes)):
+            return jsonify({'success': False, 'error': 'Índice inválido'}), 400
+
+        def ajustar(analise):
+            # Aplica sobre a versão mais recente da análise, sob o lock do vídeo
+            analise = analise or {}
+            sugestao = analise.get('sugestoes', [])[indice]
+            sugestao['inicio_segundos'] = inicio_segundos
+            sugestao['fim_segundos'] = fim_segundos
+            sugestao['duracao_segundos'] = fim_segundos - inicio_segundos
+            return analise
+
+        analise = persistencia.modificar_etapa(video_id, 'analise', ajustar)
+        return jsonify({'success': True, 'sugestao': analise['sugestoes'][indice]})
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
@@ -6,31 +6,34 @@ from flask import Blueprint, request, jsonify
 import os
 import subprocess
 import sys
-import json
-import shutil
+import re
+import tempfile
+import time
+from contextlib import ExitStack
 from urllib.parse import urlparse, parse_qs
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 SHORTS_DIR = os.path.join(UPLOAD_DIR, "shorts")
-TEMP_VIDEO_TEMPLATE = "{video_id}_temp.mp4"
 MIN_SHORT_DURATION = 40
 MAX_SHORT_DURATION = 180
 
+# Trechos separados por até esse intervalo (s) são decodificados juntos no lote
+LOTE_INTERVALO_MAXIMO = float(os.environ.get("SHORTS_LOTE_INTERVALO", 30))
+
+# Linha do -vstats_file (versão 2): "out= 0 st= 0 frame= ... time= 12.345 ..."
+VSTATS_REGEX = re.compile(r'out=\s*(\d+)\s+st=\s*\d+.*?time=\s*([\d.]+)')
+
 sys.path.insert(0, BASE_DIR)
 from utils.persistencia import persistencia
+from utils.escalonador import escalonador
+from utils.cache_midia import cache_midia
+from utils.midia import keyframe_anterior, obter_fonte_trecho, tem_audio
+from utils.perfis_render import PERFIL_RENDER_PADRAO, filtro_vertical, obter_perfil_render, opcoes_encoder
+from utils.legendas import KARAOKE, eventos_karaoke, eventos_legenda, filtro_ass, gerar_ass
 
 shorts_bp = Blueprint('shorts', __name__)
 
-def _obter_comando_ytdlp():
-    if shutil.which("yt-dlp"):
-        return ["yt-dlp"]
-    if shutil.which("python"):
-        return ["python", "-m", "yt_dlp"]
-    if shutil.which("python3"):
-        return ["python3", "-m", "yt_dlp"]
-    return None
-
 def _ajustar_intervalo_descarga(inicio, fim, duracao_video=None):
     """Garante o intervalo mínimo de 40s e máximo de 3min."""
     inicio = max(0.0, float(inicio))
@@ -60,185 +63,502 @@ def _ajustar_intervalo_descarga(inicio, fim, duracao_video=None):
     return inicio, fim, duracao
 
 # ------------------------------
-# ROTA PRINCIPAL — DOWNLOAD SHORT
+# FILTRO 9:16 + LEGENDAS (compartilhado entre corte único e lote)
 # ------------------------------
-@shorts_bp.route('/shorts/baixar', methods=['POST'])
-def baixar_short():
-    try:
-        data = request.json
-        video_id = data.get('video_id')
-        url = data.get('url')
-        inicio_segundos = float(data.get('inicio_segundos', 0))
-        fim_segundos = float(data.get('fim_segundos', 0))
-        titulo_short = data.get('titulo', 'short')
-        indice_sugestao = data.get('indice_sugestao', 0)
-
-        if not video_id and not url:
-            return jsonify({'success': False, 'error': 'ID do vídeo ou URL não fornecidos'}), 400
-
-        if inicio_segundos is None or fim_segundos is None:
-            return jsonify({'success': False, 'error': 'Tempos não fornecidos'}), 400
-
-        # Buscar dados persistidos
-        if url:
-            video_salvo = persistencia.obter_video(url)
-            if not video_salvo:
-                return jsonify({'success': False, 'error': 'Vídeo não encontrado'}), 404
-            video_id = video_salvo["video_id"]
-            url_video = url
-        else:
-            video_salvo = persistencia.obter_video_por_id(video_id)
-            if not video_salvo:
-                return jsonify({'success': False, 'error': 'Vídeo não encontrado'}), 404
-            url_video = video_salvo["url"]
-
-        duracao_video = video_salvo.get("info_video", {}).get("duracao_segundos")
-        inicio_segundos, fim_segundos, duracao = _ajustar_intervalo_descarga(
-            inicio_segundos, fim_segundos, duracao_video
-        )
+def _montar_filtro_short(segmentos, inicio_segundos, fim_segundos, duracao, caminho_ass, palavras=None,
+                         perfil=None, legendas=True):
+    """
+    Monta o filtro de vídeo de um short: recorte 9:16 e legendas ASS
+
+    As frases (com fade) e a marca d'água são gravadas em `caminho_ass` e
+    queimadas por um único filtro, com tempos relativos ao início do short.
+    Se a transcrição tiver o tempo de cada palavra, as legendas são karaokê.
+    A resolução vem do perfil de renderização (padrão: final).
+    """
+    vertical_filter = filtro_vertical(perfil or obter_perfil_render())
+    if not legendas:
+        return vertical_filter
+
+    eventos = eventos_legenda(segmentos, inicio_segundos, fim_segundos, duracao)
+    karaoke = eventos_karaoke(palavras, inicio_segundos, fim_segundos, duracao) if KARAOKE else None
+    gerar_ass(eventos, duracao, caminho_ass, karaoke=karaoke)
+
+    return vertical_filter + "," + filtro_ass(caminho_ass)
+
+
+def _carregar_video(video_id=None, url=None):
+    """
+    Busca os dados persistidos do vídeo por URL ou ID
+
+    Returns:
+        Tupla (video_salvo, url_video, erro), onde erro é (resposta, status) ou None
+    """
+    if url:
+        video_salvo = persistencia.obter_video(url)
+        if not video_salvo:
+            return None, None, ({'success': False, 'error': 'Vídeo não encontrado'}, 404)
+        return video_salvo, url, None
+
+    video_salvo = persistencia.obter_video_por_id(video_id)
+    if not video_salvo:
+        return None, None, ({'success': False, 'error': 'Vídeo não encontrado'}, 404)
+    return video_salvo, video_salvo["url"], None
+
+
+def _caminho_short(video_id, indice_sugestao, inicio_segundos, perfil=PERFIL_RENDER_PADRAO):
+    os.makedirs(SHORTS_DIR, exist_ok=True)
+    sufixo = "" if perfil == PERFIL_RENDER_PADRAO else f"_{perfil}"
+    nome_arquivo = f"{video_id}_short_{indice_sugestao}_{int(inicio_segundos)}s{sufixo}.mp4"
+    return os.path.join(SHORTS_DIR, nome_arquivo)
+
+
+def _registrar_short(video_id, output_path, inicio_segundos, fim_segundos, duracao,
+                     titulo_short, indice_sugestao, perfil=PERFIL_RENDER_PADRAO):
+    """Anexa o short aos metadados do vídeo (previews não são registrados)"""
+    if perfil == 'preview':
+        return
+    # Anexa sob o lock do vídeo, sem sobrescrever shorts salvos em paralelo
+    persistencia.anexar_a_etapa(video_id, "shorts_baixados", {
+        "caminho_arquivo": output_path,
+        "inicio_segundos": inicio_segundos,
+        "fim_segundos": fim_segundos,
+        "duracao_segundos": duracao,
+        "titulo": titulo_short,
+        "indice_sugestao": indice_sugestao,
+        "perfil": perfil,
+        "tamanho_bytes": os.path.getsize(output_path)
+    })
+
+
+def _comando_preview_copia(fonte, inicio_segundos, fim_segundos, output_path):
+    """
+    Preview sem recodificar: corte por stream copy a partir do keyframe anterior ao início
+
+    Sem recodificação não há recorte 9:16 nem legendas; o preview mantém o
+    quadro original e pode começar alguns segundos antes do pedido.
+
+    Returns:
+        Tupla (comando, inicio_real)
+    """
+    inicio_local = keyframe_anterior(fonte['caminho'], inicio_segundos - fonte['deslocamento'])
+    inicio_real = inicio_local + fonte['deslocamento']
+    comando = [
+        "ffmpeg",
+        "-ss", f"{inicio_local:.3f}",
+        "-i", fonte['caminho'],
+        "-t", f"{fim_segundos - inicio_real:.3f}",
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        "-c", "copy",
+        "-avoid_negative_ts", "make_zero",
+        "-y",
+        output_path
+    ]
+    return comando, inicio_real
 
-        os.makedirs(SHORTS_DIR, exist_ok=True)
-
-        nome_arquivo = f"{video_id}_short_{indice_sugestao}_{int(inicio_segundos)}s.mp4"
-        output_path = os.path.join(SHORTS_DIR, nome_arquivo)
-
-        # ------------------------------
-        # Download do vídeo FULL (se não existe)
-        # ------------------------------
-        temp_path = os.path.join(SHORTS_DIR, TEMP_VIDEO_TEMPLATE.format(video_id=video_id))
-        comando_base = _obter_comando_ytdlp()
-
-        if not comando_base:
-            return jsonify({'success': False, 'error': 'yt-dlp não encontrado'}), 500
-
-        if not os.path.exists(temp_path):
-            resultado = subprocess.run(
-                comando_base + [
-                    "-f", "best[height<=1080]",
-                    "--output", temp_path,
-                    "--quiet",
-                    "--no-warnings",
-                    url_video
-                ],
-                capture_output=True, text=True, timeout=600
-            )
-            if resultado.returncode != 0:
-                return jsonify({'success': False, 'error': 'Erro ao baixar vídeo'}), 500
-
-        # ------------------------------
-        # Criar EVENTOS DE LEGENDAS (por FRASE)
-        # ------------------------------
-        segmentos = video_salvo.get("transcricao", {}).get("segmentos", [])
-        eventos = []
-
-        for seg in segmentos:
-            if seg["fim"] >= inicio_segundos and seg["inicio"] <= fim_segundos:
-
-                inicio_seg = float(seg["inicio"])
-                fim_seg = float(seg["fim"])
-                frase = seg["texto"].strip()
-                if not frase:
-                    continue
-
-                start_rel = max(inicio_seg - inicio_segundos, 0)
-                end_rel = min(fim_seg - inicio_segundos, duracao)
-
-                frase = (
-                    frase.replace(":", "\\:")
-                         .replace("'", "\\'")
-                         .replace('"', '\\"')
-                )
 
-                eventos.append({
-                    "text": frase,
-                    "start": start_rel,
-                    "end": end_rel
-                })
-
-        # ------------------------------
-        # FILTRO 9:16 + LEGENDAS PROFISSIONAIS
-        # ------------------------------
-        vertical_filter = "scale=-2:1920,crop=1080:1920"
-
-        draws = []
-
-        # LEGENDA LIMPA (SEM FUNDO) — +70px e com fade
-        for ev in eventos:
-            draws.append(
-                "drawtext=text='{}':"
-                "fontcolor=white:"
-                "fontsize=60:"
-                "line_spacing=10:"
-                "x=(w-text_w)/2:"
-                "y=h-350:"  # posição ajustada
-                "alpha='if(lt(t,{:.3f}), (t-{:.3f})/0.25, if(lt(t,{:.3f}), 1, ({}-t)/0.25))'"
-                .format(
-                    ev["text"],
-                    ev["start"], ev["start"],
-                    ev["end"], ev["end"]
-                )
-            )
+# ------------------------------
+# CORTE DO SHORT (usado pela rota e pela fila de jobs)
+# ------------------------------
+def executar_corte_short(video_id=None, url=None, inicio_segundos=0, fim_segundos=0,
+                         titulo_short='short', indice_sugestao=0, perfil=None, legendas=True):
+    """
+    Obtém o trecho do vídeo (se necessário) e renderiza um short 9:16 com legendas
 
-        # ------------------------------
-        # MARCA D'ÁGUA ACIMA (+ opacidade baixa)
-        # ------------------------------
-        watermark = (
-            "drawtext=text='@CortesdoReinodeDeus':"
-            "fontcolor=white@0.45:"
-            "fontsize=42:"
-            "x=(w-text_w)/2:"
-            "y=h-470"  # bem acima da legenda
-        )
-        draws.append(watermark)
+    Args:
+        perfil: Perfil de renderização (preview, final ou arquivo; padrão: final)
+        legendas: Queima as legendas. Um preview sem legendas é cortado por
+            stream copy, sem recodificar
+
+    Returns:
+        Tupla (resposta, status_http)
+    """
+    if not video_id and not url:
+        return {'success': False, 'error': 'ID do vídeo ou URL não fornecidos'}, 400
 
-        filtro_com_texto = vertical_filter + "," + ",".join(draws)
+    if inicio_segundos is None or fim_segundos is None:
+        return {'success': False, 'error': 'Tempos não fornecidos'}, 400
 
-        # ------------------------------
-        # FFmpeg FINAL
-        # ------------------------------
+    try:
+        config_perfil = obter_perfil_render(perfil)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+    perfil = config_perfil['nome']
+
+    # Buscar dados persistidos
+    video_salvo, url_video, erro = _carregar_video(video_id, url)
+    if erro:
+        return erro
+    video_id = video_salvo["video_id"]
+
+    duracao_video = video_salvo.get("info_video", {}).get("duracao_segundos")
+    inicio_segundos, fim_segundos, duracao = _ajustar_intervalo_descarga(
+        inicio_segundos, fim_segundos, duracao_video
+    )
+    output_path = _caminho_short(video_id, indice_sugestao, inicio_segundos, perfil)
+
+    # ------------------------------
+    # Vídeo-fonte (cache de mídia): o vídeo completo, se já baixado, ou só o trecho do short
+    # ------------------------------
+    try:
+        fonte = obter_fonte_trecho(video_id, url_video, inicio_segundos, fim_segundos)
+    except RuntimeError as e:
+        return {'success': False, 'error': str(e)}, 500
+
+    segmentos = video_salvo.get("transcricao", {}).get("segmentos", [])
+    palavras = video_salvo.get("transcricao", {}).get("palavras")
+
+    # ------------------------------
+    # PREVIEW SEM RECODIFICAR
+    # ------------------------------
+    if perfil == 'preview' and not legendas:
+        with cache_midia.reter(video_id, fonte['tipo']):
+            comando_cortar, inicio_real = _comando_preview_copia(
+                fonte, inicio_segundos, fim_segundos, output_path
+            )
+            # Stream copy é só E/S: não ocupa o orçamento de CPU de encode
+            resultado = subprocess.run(comando_cortar, capture_output=True, text=True, timeout=600)
+        if resultado.returncode != 0:
+            return {'success': False, 'error': resultado.stderr}, 500
+        return {
+            "success": True,
+            "video_id": video_id,
+            "caminho_arquivo": output_path,
+            "perfil": perfil,
+            "copia": True,
+            "inicio_real": round(inicio_real, 3)
+        }, 200
+
+    # ------------------------------
+    # FFmpeg FINAL
+    # ------------------------------
+    with tempfile.TemporaryDirectory(prefix="short_") as pasta:
+        filtro_com_texto = _montar_filtro_short(
+            segmentos, inicio_segundos, fim_segundos, duracao, os.path.join(pasta, "legendas.ass"), palavras,
+            config_perfil, legendas
+        )
         comando_cortar = [
             "ffmpeg",
-            "-ss", str(inicio_segundos),
+            "-ss", str(inicio_segundos - fonte['deslocamento']),
             "-t", str(duracao),
-            "-i", temp_path,
+            "-i", fonte['caminho'],
             "-vf", filtro_com_texto,
-            "-c:v", "libx264",
-            "-preset", "fast",
-            "-c:a", "aac",
+            *opcoes_encoder(config_perfil, escalonador.custo_cpu('encode')),
             "-y",
             output_path
         ]
 
-        resultado = subprocess.run(comando_cortar, capture_output=True, text=True, timeout=600)
-        if resultado.returncode != 0:
-            return jsonify({'success': False, 'error': resultado.stderr}), 500
+        with cache_midia.reter(video_id, fonte['tipo']), escalonador.reservar('encode'):
+            resultado = subprocess.run(comando_cortar, capture_output=True, text=True, timeout=600)
+    if resultado.returncode != 0:
+        return {'success': False, 'error': resultado.stderr}, 500
 
-        # ------------------------------
-        # SALVAR METADADOS
-        # ------------------------------
-        shorts_baixados = video_salvo.get("shorts_baixados", [])
-        shorts_baixados.append({
-            "caminho_arquivo": output_path,
-            "inicio_segundos": inicio_segundos,
-            "fim_segundos": fim_segundos,
-            "duracao_segundos": duracao,
-            "titulo": titulo_short,
-            "indice_sugestao": indice_sugestao,
-            "tamanho_bytes": os.path.getsize(output_path)
-        })
+    _registrar_short(video_id, output_path, inicio_segundos, fim_segundos, duracao,
+                     titulo_short, indice_sugestao, perfil)
 
-        video_salvo["shorts_baixados"] = shorts_baixados
-        path_json = persistencia.obter_caminho_video(video_id)
+    return {
+        "success": True,
+        "video_id": video_id,
+        "caminho_arquivo": output_path,
+        "perfil": perfil
+    }, 200
 
-        with open(path_json, "w", encoding="utf-8") as f:
-            json.dump(video_salvo, f, ensure_ascii=False, indent=2)
+# ------------------------------
+# RENDERIZAÇÃO EM LOTE (um único processo ffmpeg)
+# ------------------------------
+def _agrupar_intervalos(pedidos, intervalo_maximo):
+    """
+    Agrupa os shorts cujos trechos se sobrepõem ou estão próximos
+
+    Cada grupo vira uma única entrada do ffmpeg (um seek e uma decodificação),
+    dividida entre os shorts do grupo com split/trim. Trechos distantes ficam em
+    grupos separados para não decodificar o vídeo inteiro entre eles.
+    """
+    grupos = []
+    for pedido in sorted(pedidos, key=lambda p: p['inicio']):
+        if grupos and pedido['inicio'] - grupos[-1]['fim'] <= intervalo_maximo:
+            grupos[-1]['fim'] = max(grupos[-1]['fim'], pedido['fim'])
+            grupos[-1]['pedidos'].append(pedido)
+        else:
+            grupos.append({'inicio': pedido['inicio'], 'fim': pedido['fim'], 'pedidos': [pedido]})
+    return grupos
+
+
+def _montar_comando_lote(grupos, segmentos, pasta, palavras=None, perfil=None):
+    """
+    Monta o comando ffmpeg com uma entrada por grupo e uma saída por short
+
+    Cada grupo lê do seu vídeo-fonte (`grupo['fonte']`, ver obter_fonte_trecho);
+    os arquivos auxiliares ficam em `pasta`. Todas as saídas usam o mesmo
+    perfil de renderização. Fontes sem trilha de áudio geram shorts sem áudio.
+    """
+    perfil = perfil or obter_perfil_render()
+    caminho_filtro = os.path.join(pasta, "filtro.txt")
+    caminho_vstats = os.path.join(pasta, "vstats.log")
+    comando = ["ffmpeg", "-nostdin"]
+    for grupo in grupos:
+        comando += [
+            "-ss", f"{grupo['inicio'] - grupo['fonte']['deslocamento']:.3f}",
+            "-t", f"{grupo['fim'] - grupo['inicio']:.3f}",
+            "-i", grupo['fonte']['caminho']
+        ]
 
-        return jsonify({
-            "success": True,
-            "video_id": video_id,
-            "caminho_arquivo": output_path
+    cadeias = []
+    saida = 0
+    audio_fonte = {}
+    for entrada, grupo in enumerate(grupos):
+        n = len(grupo['pedidos'])
+        caminho_fonte = grupo['fonte']['caminho']
+        if caminho_fonte not in audio_fonte:
+            audio_fonte[caminho_fonte] = tem_audio(caminho_fonte)
+        com_audio = audio_fonte[caminho_fonte]
+        if n > 1:
+            cadeias.append(f"[{entrada}:v]split={n}" + "".join(f"[v{entrada}_{k}]" for k in range(n)))
+            if com_audio:
+                cadeias.append(f"[{entrada}:a]asplit={n}" + "".join(f"[a{entrada}_{k}]" for k in range(n)))
+        for k, pedido in enumerate(grupo['pedidos']):
+            entrada_v = f"[v{entrada}_{k}]" if n > 1 else f"[{entrada}:v]"
+            entrada_a = f"[a{entrada}_{k}]" if n > 1 else f"[{entrada}:a]"
+            inicio_rel = pedido['inicio'] - grupo['inicio']
+            fim_rel = pedido['fim'] - grupo['inicio']
+            filtro = _montar_filtro_short(
+                segmentos, pedido['inicio'], pedido['fim'], pedido['duracao'],
+                os.path.join(pasta, f"legendas_{saida}.ass"), palavras, perfil
+            )
+            cadeias.append(
+                f"{entrada_v}trim=start={inicio_rel:.3f}:end={fim_rel:.3f},setpts=PTS-STARTPTS,"
+                f"{filtro}[vout{saida}]"
+            )
+            if com_audio:
+                cadeias.append(
+                    f"{entrada_a}atrim=start={inicio_rel:.3f}:end={fim_rel:.3f},asetpts=PTS-STARTPTS[aout{saida}]"
+                )
+            pedido['saida'] = saida
+            pedido['audio'] = com_audio
+            saida += 1
+
+    # Script em arquivo: com muitos shorts o filtro pode passar do limite da linha de comando
+    with open(caminho_filtro, 'w', encoding='utf-8') as f:
+        f.write(";\n".join(cadeias))
+
+    comando += [
+        "-filter_complex_script", caminho_filtro,
+        # Estatísticas por quadro de cada saída, usadas para o progresso individual
+        "-vstats_file", caminho_vstats,
+        "-vstats_version", "2",
+    ]
+    for grupo in grupos:
+        for pedido in grupo['pedidos']:
+            comando += ["-map", f"[vout{pedido['saida']}]"]
+            if pedido['audio']:
+                comando += ["-map", f"[aout{pedido['saida']}]"]
+            comando += [
+                *opcoes_encoder(perfil, escalonador.custo_cpu('encode')),
+                "-y",
+                pedido['caminho']
+            ]
+    return comando
+
+
+def _acompanhar_lote(processo, caminho_vstats, duracoes, ao_progresso, timeout):
+    """
+    Aguarda o ffmpeg lendo o arquivo de vstats para calcular o progresso de cada saída
+
+    Returns:
+        Lista com o progresso (0 a 1) de cada saída
+    """
+    progresso = [0.0] * len(duracoes)
+    posicao = 0
+    limite = time.monotonic() + timeout
+
+    while True:
+        terminou = processo.poll() is not None
+        if os.path.exists(caminho_vstats):
+            with open(caminho_vstats, 'rb') as f:
+                f.seek(posicao)
+                bloco = f.read()
+            # Processa apenas linhas completas
+            fim_linha = bloco.rfind(b'\n')
+            if fim_linha >= 0:
+                posicao += fim_linha + 1
+                alterado = False
+                for m in VSTATS_REGEX.finditer(bloco[:fim_linha + 1].decode('utf-8', 'ignore')):
+                    saida = int(m.group(1))
+                    if saida < len(duracoes) and duracoes[saida] > 0:
+                        valor = min(1.0, float(m.group(2)) / duracoes[saida])
+                        if valor > progresso[saida]:
+                            progresso[saida] = valor
+                            alterado = True
+                if alterado and ao_progresso:
+                    ao_progresso(list(progresso))
+
+        if terminou:
+            return progresso
+        if time.monotonic() > limite:
+            processo.kill()
+            processo.wait()
+            raise subprocess.TimeoutExpired(processo.args, timeout)
+        time.sleep(0.5)
+
+
+def executar_corte_lote(video_id=None, url=None, sugestoes=None, indices=None, ao_progresso=None,
+                        perfil=None):
+    """
+    Renderiza vários shorts do mesmo vídeo em um único processo ffmpeg
+
+    Trechos próximos compartilham a mesma decodificação (split/trim) e cada
+    short é codificado em sua própria saída.
+
+    Args:
+        video_id: ID do vídeo
+        url: URL do vídeo (alternativa ao ID)
+        sugestoes: Sugestões a renderizar (padrão: analise.sugestoes salvas)
+        indices: Índices das sugestões a renderizar (padrão: todas)
+        ao_progresso: Callback chamado com a lista de progresso (0 a 1) de cada short
+        perfil: Perfil de renderização (preview, final ou arquivo; padrão: final)
+
+    Returns:
+        Tupla (resposta, status_http)
+    """
+    if not video_id and not url:
+        return {'success': False, 'error': 'ID do vídeo ou URL não fornecidos'}, 400
+
+    try:
+        config_perfil = obter_perfil_render(perfil)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+    perfil = config_perfil['nome']
+
+    video_salvo, url_video, erro = _carregar_video(video_id, url)
+    if erro:
+        return erro
+    video_id = video_salvo["video_id"]
+
+    if sugestoes is None:
+        sugestoes = video_salvo.get("analise", {}).get("sugestoes", [])
+    if indices is None:
+        indices = list(range(len(sugestoes)))
+    if not indices:
+        return {'success': False, 'error': 'Nenhuma sugestão para renderizar'}, 400
+    if any(not isinstance(i, int) or isinstance(i, bool) or not 0 <= i < len(sugestoes) for i in indices):
+        return {'success': False, 'error': 'Índice de sugestão inválido'}, 400
+
+    duracao_video = video_salvo.get("info_video", {}).get("duracao_segundos")
+    pedidos = []
+    for indice in indices:
+        sugestao = sugestoes[indice]
+        inicio, fim, duracao = _ajustar_intervalo_descarga(
+            float(sugestao.get('inicio_segundos', 0)),
+            float(sugestao.get('fim_segundos', 0)),
+            duracao_video
+        )
+        pedidos.append({
+            'indice_sugestao': indice,
+            'titulo': sugestao.get('titulo', 'short'),
+            'inicio': inicio,
+            'fim': fim,
+            'duracao': duracao,
+            'caminho': _caminho_short(video_id, indice, inicio, perfil),
+        })
+
+    segmentos = video_salvo.get("transcricao", {}).get("segmentos", [])
+    palavras = video_salvo.get("transcricao", {}).get("palavras")
+    grupos = _agrupar_intervalos(pedidos, LOTE_INTERVALO_MAXIMO)
+    print(f"[SHORTS] Lote de {len(pedidos)} shorts em {len(grupos)} trechos decodificados")
+
+    # Cada grupo usa o vídeo completo (se em cache) ou apenas o seu trecho. Cada fonte
+    # é retida assim que obtida, para não ser unida e removida pelo grupo seguinte
+    with ExitStack() as retidos:
+        try:
+            for grupo in grupos:
+                grupo['fonte'] = obter_fonte_trecho(video_id, url_video, grupo['inicio'], grupo['fim'])
+                retidos.enter_context(cache_midia.reter(video_id, grupo['fonte']['tipo']))
+        except RuntimeError as e:
+            return {'success': False, 'error': str(e)}, 500
+
+        with tempfile.TemporaryDirectory(prefix="lote_shorts_") as pasta:
+            caminho_vstats = os.path.join(pasta, "vstats.log")
+            comando = _montar_comando_lote(grupos, segmentos, pasta, palavras, config_perfil)
+            # Ordem das saídas no comando
+            ordem = sorted(pedidos, key=lambda p: p['saida'])
+            duracoes = [p['duracao'] for p in ordem]
+
+            def repassar(progresso_saidas):
+                if ao_progresso:
+                    ao_progresso([progresso_saidas[p['saida']] for p in pedidos])
+
+            with open(os.path.join(pasta, "stderr.log"), 'w+') as stderr, escalonador.reservar('encode'):
+                processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=stderr)
+                _acompanhar_lote(processo, caminho_vstats, duracoes, repassar,
+                                 timeout=600 + 60 * len(pedidos))
+                stderr.seek(0)
+                erros = stderr.read()
+
+    if processo.returncode != 0:
+        return {'success': False, 'error': erros[-4000:]}, 500
+
+    shorts = []
+    for pedido in pedidos:
+        _registrar_short(video_id, pedido['caminho'], pedido['inicio'], pedido['fim'],
+                         pedido['duracao'], pedido['titulo'], pedido['indice_sugestao'], perfil)
+        shorts.append({
+            'indice_sugestao': pedido['indice_sugestao'],
+            'caminho_arquivo': pedido['caminho'],
+            'inicio_segundos': pedido['inicio'],
+            'fim_segundos': pedido['fim'],
         })
+    if ao_progresso:
+        ao_progresso([1.0] * len(pedidos))
+
+    return {
+        "success": True,
+        "video_id": video_id,
+        "shorts": shorts,
+        "total": len(shorts),
+        "perfil": perfil
+    }, 200
+
+# ------------------------------
+# ROTA PRINCIPAL — DOWNLOAD SHORT
+# ------------------------------
+@shorts_bp.route('/shorts/baixar', methods=['POST'])
+def baixar_short():
+    try:
+        data = request.json
+        resposta, status = executar_corte_short(
+            video_id=data.get('video_id'),
+            url=data.get('url'),
+            inicio_segundos=float(data.get('inicio_segundos', 0)),
+            fim_segundos=float(data.get('fim_segundos', 0)),
+            titulo_short=data.get('titulo', 'short'),
+            indice_sugestao=data.get('indice_sugestao', 0),
+            perfil=data.get('perfil'),
+            legendas=data.get('legendas', True) is not False
+        )
+        return jsonify(resposta), status
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# ------------------------------
+# ROTA — RENDERIZAÇÃO EM LOTE
+# ------------------------------
+@shorts_bp.route('/shorts/baixar-lote', methods=['POST'])
+def baixar_shorts_lote():
+    """Renderiza todas (ou as escolhidas) sugestões da análise em um único ffmpeg"""
+    try:
+        data = request.json or {}
+        resposta, status = executar_corte_lote(
+            video_id=data.get('video_id'),
+            url=data.get('url'),
+            indices=data.get('indices'),
+            perfil=data.get('perfil')
+        )
+        return jsonify(resposta), status
 
+    except subprocess.TimeoutExpired:
+        return jsonify({"success": False, "error": "Timeout ao renderizar os shorts"}), 500
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -2,7 +2,7 @@
 Rotas da Biblioteca - Lista vídeos processados
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 import os
 import sys
 
@@ -15,32 +15,36 @@ biblioteca_bp = Blueprint('biblioteca', __name__)
 
 @biblioteca_bp.route('/biblioteca/listar', methods=['GET'])
 def listar_videos():
-    """Lista todos os vídeos processados"""
+    """
+    Lista os vídeos processados a partir dos resumos do índice
+
+    Parâmetros (query string, todos opcionais):
+        pagina, por_pagina: paginação (sem por_pagina, retorna todos)
+        ordenar: ultima_atualizacao (padrão), titulo, duracao, sugestoes ou shorts
+        ordem: desc (padrão) ou asc
+        busca: trecho do título
+        concluida / pendente: etapa concluída ou ainda pendente (ex: analise)
+    """
     try:
-        videos = persistencia.listar_videos()
-        
-        # Enriquece com informações adicionais
-        videos_enriquecidos = []
-        for video in videos:
-            video_id = video.get('video_id') or video.get('id')
-            if video_id:
-                dados_completos = persistencia.obter_video_por_id(video_id)
-                if dados_completos:
-                    info_video = dados_completos.get('info_video', {})
-                    videos_enriquecidos.append({
-                        'video_id': video_id,
-                        'url': dados_completos.get('url', video.get('url', '')),
-                        'titulo': info_video.get('titulo', video.get('titulo', 'Sem título')),
-                        'ultima_atualizacao': dados_completos.get('ultima_atualizacao', video.get('ultima_atualizacao', '')),
-                        'thumbnail': info_video.get('url_thumbnail', ''),
-                        'estado': persistencia.obter_estado_processamento(video_id)
-                    })
-        
-        return jsonify({
-            'success': True,
-            'videos': videos_enriquecidos,
-            'total': len(videos_enriquecidos)
-        })
+        try:
+            pagina = int(request.args.get('pagina', 1))
+            por_pagina = request.args.get('por_pagina', type=int)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Paginação inválida'}), 400
+
+        try:
+            resultado = persistencia.listar_resumos(
+                pagina=pagina,
+                por_pagina=por_pagina,
+                ordenar=request.args.get('ordenar', 'ultima_atualizacao'),
+                decrescente=request.args.get('ordem', 'desc').lower() != 'asc',
+                busca=request.args.get('busca'),
+                concluida=request.args.get('concluida'),
+                pendente=request.args.get('pendente')
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        return jsonify({'success': True, **resultado})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
-
@@ -1,5 +1,9 @@
 """
 Rota para processar vídeo completo - orquestra todas as etapas
+
+Além de informar o estado, registra o pipeline completo (info -> áudio ->
+transcrição -> análise -> shorts) na fila de jobs em segundo plano, para que
+o processamento pesado não prenda as threads de requisição do Flask.
 """
 
 from flask import Blueprint, request, jsonify
@@ -9,10 +13,140 @@ import sys
 # Adiciona o diretório raiz ao path para importar utils
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BASE_DIR)
-from utils.persistencia import persistencia
+from utils.persistencia import persistencia, extrair_video_id
+from utils.jobs import fila_jobs
+from utils.escalonador import escalonador
+from utils.cache_midia import cache_midia
+from utils.cache_llm import cache_llm
+
+# Módulos de rota carregados antes deste em rotas/__init__.py
+from rotas.youtube import obter_info_video
+from rotas.transcricao import executar_transcricao
+from rotas.analise import executar_analise
+import baixar_audio
+import baixar_shorts
 
 processar_bp = Blueprint('processar', __name__)
 
+# Concorrência padrão de cada etapa (sobrescrita por JOBS_CONCORRENCIA_<ETAPA>).
+# O uso real de CPU/rede é limitado pelo escalonador (utils/escalonador.py);
+# aqui só definimos quantos jobs podem estar em cada etapa ao mesmo tempo.
+CONCORRENCIA_PADRAO = {
+    'info_video': 4,
+    'audio': 4,
+    'transcricao': 1,
+    'analise': 1,
+    'shorts': 2,
+}
+
+
+def _concorrencia_etapa(etapa):
+    """Lê a concorrência configurada para a etapa"""
+    valor = os.environ.get(f"JOBS_CONCORRENCIA_{etapa.upper()}")
+    try:
+        return max(1, int(valor)) if valor else CONCORRENCIA_PADRAO[etapa]
+    except ValueError:
+        return CONCORRENCIA_PADRAO[etapa]
+
+
+def _verificar(resultado, etapa):
+    """Converte a resposta (dados, status) de uma etapa em exceção se falhar"""
+    resposta, _status = resultado
+    if not resposta.get('success'):
+        raise RuntimeError(resposta.get('error') or f'Falha na etapa {etapa}')
+    return resposta
+
+
+# ------------------------------
+# ETAPAS DO PIPELINE
+# ------------------------------
+def _etapa_info(job):
+    resposta = _verificar(obter_info_video(job.dados['url']), 'info_video')
+    job.dados['video_id'] = resposta['video_id']
+    job.resultado['info_video'] = {'cache': resposta.get('cache', False)}
+
+
+def _etapa_audio(job):
+    resposta = _verificar(
+        baixar_audio.executar_download_audio(job.dados['url'], job.dados['video_id']),
+        'audio'
+    )
+    job.dados['audio_path'] = resposta['audio_path']
+    job.resultado['audio'] = {'audio_path': resposta['audio_path'], 'cache': resposta.get('cache', False)}
+
+
+def _etapa_transcricao(job):
+    resposta = _verificar(
+        executar_transcricao(
+            job.dados['audio_path'],
+            video_id=job.dados['video_id'],
+            url=job.dados['url'],
+            progresso=job.atualizar_progresso,
+            paralelo=job.dados.get('paralelo')
+        ),
+        'transcricao'
+    )
+    job.resultado['transcricao'] = {
+        'total_segmentos': len(resposta.get('transcricao', [])),
+        'cache': resposta.get('cache', False)
+    }
+
+
+def _etapa_analise(job):
+    resposta = _verificar(
+        executar_analise(
+            video_id=job.dados['video_id'],
+            reprocessar=job.dados.get('reprocessar', False),
+            progresso=job.atualizar_progresso
+        ),
+        'analise'
+    )
+    job.dados['sugestoes'] = resposta.get('sugestoes', [])
+    job.resultado['analise'] = {
+        'total_sugestoes': len(job.dados['sugestoes']),
+        'cache': resposta.get('cache', False)
+    }
+
+
+def _etapa_shorts(job):
+    if not job.dados.get('gerar_shorts', True):
+        return False
+
+    sugestoes = job.dados.get('sugestoes', [])
+    if not sugestoes:
+        job.resultado['shorts'] = {'arquivos': [], 'total': 0}
+        return
+
+    def ao_progresso(progresso_shorts):
+        prontos = sum(1 for p in progresso_shorts if p >= 1.0)
+        job.atualizar_progresso(
+            sum(progresso_shorts) / len(progresso_shorts),
+            f"{prontos} de {len(progresso_shorts)} shorts prontos",
+            [round(p, 3) for p in progresso_shorts]
+        )
+
+    # Todos os shorts em um único ffmpeg (trechos próximos decodificados uma vez)
+    resposta = _verificar(
+        baixar_shorts.executar_corte_lote(
+            video_id=job.dados['video_id'],
+            sugestoes=sugestoes,
+            ao_progresso=ao_progresso
+        ),
+        'shorts'
+    )
+    shorts = [s['caminho_arquivo'] for s in resposta['shorts']]
+    job.resultado['shorts'] = {'arquivos': shorts, 'total': len(shorts)}
+
+
+for _nome, _funcao in (
+    ('info_video', _etapa_info),
+    ('audio', _etapa_audio),
+    ('transcricao', _etapa_transcricao),
+    ('analise', _etapa_analise),
+    ('shorts', _etapa_shorts),
+):
+    fila_jobs.registrar_etapa(_nome, _funcao, _concorrencia_etapa(_nome))
+
 @processar_bp.route('/processar-video', methods=['POST'])
 def processar_video_completo():
     """
@@ -73,3 +207,78 @@ def processar_video_completo():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+# ------------------------------
+# JOBS EM SEGUNDO PLANO
+# ------------------------------
+@processar_bp.route('/jobs', methods=['POST'])
+def criar_job():
+    """
+    Submete um vídeo ao pipeline completo e retorna o ID do job imediatamente
+    """
+    try:
+        data = request.json or {}
+        url = data.get('url')
+        video_id = data.get('video_id')
+
+        if not url and video_id:
+            video_salvo = persistencia.obter_video_por_id(video_id)
+            if video_salvo:
+                url = video_salvo.get('url')
+
+        if not url:
+            return jsonify({'success': False, 'error': 'URL ou ID do vídeo não fornecidos'}), 400
+
+        video_id = video_id or extrair_video_id(url)
+        if not video_id:
+            return jsonify({'success': False, 'error': 'URL inválida: não foi possível extrair o ID do vídeo'}), 400
+
+        job = fila_jobs.submeter({
+            'url': url,
+            'video_id': video_id,
+            'reprocessar': bool(data.get('reprocessar')),
+            'gerar_shorts': bool(data.get('gerar_shorts', True)),
+            'paralelo': data.get('paralelo'),
+        }, chave=video_id)
+
+        return jsonify({'success': True, **job.to_dict()}), 202
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@processar_bp.route('/jobs/estatisticas', methods=['GET'])
+def estatisticas_jobs():
+    """Profundidade das filas por etapa, uso de slots/CPU por recurso e caches de mídia e do LLM"""
+    try:
+        return jsonify({
+            'success': True,
+            'etapas': fila_jobs.estatisticas(),
+            'escalonador': escalonador.estatisticas(),
+            'cache_midia': cache_midia.estatisticas(),
+            'cache_llm': cache_llm.estatisticas()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@processar_bp.route('/jobs/<job_id>', methods=['GET'])
+def obter_job(job_id):
+    """Retorna o estado e o progresso de um job"""
+    try:
+        job = fila_jobs.obter(job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+        return jsonify({'success': True, **job.to_dict()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@processar_bp.route('/jobs', methods=['GET'])
+def listar_jobs():
+    """Lista os jobs conhecidos (ativos e finalizados recentemente)"""
+    try:
+        jobs = fila_jobs.listar()
+        return jsonify({'success': True, 'jobs': jobs, 'total': len(jobs)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
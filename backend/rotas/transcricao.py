@@ -1,104 +1,348 @@
 """
 Rotas de Transcrição - Utiliza fast-whisper para transcrever áudio de vídeos
+
+Os segmentos são gravados em um log append-only assim que o Whisper os produz,
+permitindo retomar uma transcrição interrompida a partir do último segmento
+salvo e transmitir os segmentos ao cliente em tempo real (SSE).
 """
 
-from flask import Blueprint, request, jsonify
-from faster_whisper import WhisperModel
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from faster_whisper import decode_audio
+import json
 import os
+import queue
 import sys
+import threading
+from contextlib import nullcontext
 
 # Adiciona o diretório raiz ao path para importar utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.persistencia import persistencia
+from utils.escalonador import escalonador
+from utils.transcricao_paralela import transcritor_paralelo
+from utils.modelos_whisper import PERFIL_PADRAO, registro_modelos
+from utils.cache_midia import cache_midia
+from utils.midia import obter_audio_whisper
+from utils.palavras import compactar_palavras, extrair_palavras
 
 transcricao_bp = Blueprint('transcricao', __name__)
 
-# Inicializa o modelo Whisper (lazy loading)
-_modelo = None
+# Taxa de amostragem esperada pelo Whisper
+TAXA_AMOSTRAGEM = 16000
+
+# Modo paralelo (pool de processos) habilitado por padrão?
+TRANSCRICAO_PARALELA_PADRAO = os.environ.get("TRANSCRICAO_PARALELA", "").lower() in ("1", "true", "sim")
+
+# Guardar o tempo de cada palavra (legendas karaokê) por padrão?
+TRANSCRICAO_PALAVRAS_PADRAO = os.environ.get("TRANSCRICAO_PALAVRAS", "").lower() in ("1", "true", "sim")
+
+# Evita duas transcrições simultâneas do mesmo vídeo
+_locks_transcricao = {}
+_locks_guard = threading.Lock()
 
-def obter_modelo():
-    """Obtém o modelo Whisper (inicializa apenas quando necessário)"""
-    global _modelo
-    if _modelo is None:
-        if os.environ.get("USE_CUDA"):
-            _modelo = WhisperModel("small", device="cuda", compute_type="float16")
+def _lock_transcricao(video_id):
+    """Retorna o lock de transcrição de um vídeo"""
+    with _locks_guard:
+        return _locks_transcricao.setdefault(video_id, threading.Lock())
+
+def _transcrever_com_checkpoint(caminho_audio, video_id, progresso, retomar, ao_segmento,
+                                paralelo=False, perfil=PERFIL_PADRAO, palavras=False):
+    """
+    Executa o Whisper gravando cada segmento no log parcial do vídeo
+
+    Returns:
+        Tupla (segmentos, idioma, duracao_total)
+    """
+    segmentos_anteriores = []
+    if video_id:
+        if retomar:
+            segmentos_anteriores = persistencia.obter_segmentos_parciais(video_id)
         else:
-            _modelo = WhisperModel("small", device="cpu", compute_type="float32")
-    return _modelo
+            persistencia.limpar_segmentos_parciais(video_id)
 
-@transcricao_bp.route('/transcricao', methods=['POST'])
-def transcrever_audio():
-    """Transcreve o áudio de um vídeo usando fast-whisper"""
-    try:
-        data = request.json
-        caminho_audio = data.get('audio_path')
-        video_id = data.get('video_id')
-        url = data.get('url')
+    transcricao_segmentos = list(segmentos_anteriores)
+    inicio_retomada = float(segmentos_anteriores[-1]['fim']) if segmentos_anteriores else 0.0
 
-        if not caminho_audio:
-            return jsonify({'success': False, 'error': 'Caminho do áudio não fornecido'}), 400
+    if ao_segmento:
+        for segmento in segmentos_anteriores:
+            ao_segmento(segmento)
 
-        if not os.path.exists(caminho_audio):
-            return jsonify({'success': False, 'error': 'Arquivo de áudio não encontrado'}), 400
+    if inicio_retomada:
+        print(f"[TRANSCRICAO] Retomando {video_id} a partir de {inicio_retomada}s "
+              f"({len(segmentos_anteriores)} segmentos já salvos)")
+
+    duracao_total = 0.0
+
+    def registrar(seg):
+        transcricao_segmentos.append(seg)
+        if video_id:
+            persistencia.anexar_segmento_transcricao(video_id, seg)
+        if ao_segmento:
+            ao_segmento(seg)
+        if progresso and duracao_total:
+            progresso(seg['fim'] / duracao_total)
+
+    # O modo paralelo usa processos com modelos próprios; em GPU segue sequencial
+    if paralelo and not os.environ.get("USE_CUDA"):
+        audio = decode_audio(caminho_audio, sampling_rate=TAXA_AMOSTRAGEM)
+        duracao_total = round(len(audio) / TAXA_AMOSTRAGEM, 2)
+        restante = audio[int(inicio_retomada * TAXA_AMOSTRAGEM):]
+        idioma = None
+        if len(restante) >= TAXA_AMOSTRAGEM:
+            with escalonador.reservar('transcricao', custo_cpu=transcritor_paralelo.custo_cpu):
+                _segmentos, idioma = transcritor_paralelo.transcrever(
+                    restante,
+                    deslocamento=inicio_retomada,
+                    ao_segmento=registrar,
+                    anterior=segmentos_anteriores[-1] if segmentos_anteriores else None,
+                    palavras=palavras
+                )
+        return transcricao_segmentos, idioma or "pt", duracao_total
+
+    with escalonador.reservar('transcricao'), registro_modelos.emprestar(perfil) as modelo:
+        entrada = caminho_audio
+        if inicio_retomada:
+            # Pula o trecho já transcrito; os tempos são corrigidos pelo deslocamento
+            audio = decode_audio(caminho_audio, sampling_rate=TAXA_AMOSTRAGEM)
+            entrada = audio[int(inicio_retomada * TAXA_AMOSTRAGEM):]
+            if len(entrada) < TAXA_AMOSTRAGEM:
+                return transcricao_segmentos, "pt", round(len(audio) / TAXA_AMOSTRAGEM, 2)
 
-        # Verifica se já existe transcrição salva
-        if url:
-            video_salvo = persistencia.obter_video(url)
-            if video_salvo and 'transcricao' in video_salvo:
-                transcricao_data = video_salvo['transcricao']
-                if transcricao_data.get('texto'):
-                    return jsonify({
-                        'success': True, 
-                        'transcricao': transcricao_data.get('segmentos', []),
-                        'texto_completo': transcricao_data.get('texto'),
-                        'video_id': video_salvo.get('video_id'),
-                        'cache': True
-                    })
-
-        # Obtém modelo e transcreve
-        modelo = obter_modelo()
         segmentos, info = modelo.transcribe(
-            caminho_audio, 
+            entrada, 
             beam_size=5,
             language="pt",  # Português
             vad_filter=True,  # Filtro de voz ativa
-            vad_parameters=dict(min_silence_duration_ms=500)
+            vad_parameters=dict(min_silence_duration_ms=500),
+            word_timestamps=palavras
         )
+        duracao_total = inicio_retomada + info.duration
 
-        transcricao_segmentos = []
-        texto_completo = []
-        
         for segmento in segmentos:
-            transcricao_segmentos.append({
-                'inicio': round(segmento.start, 2),
-                'fim': round(segmento.end, 2),
+            seg = {
+                'inicio': round(segmento.start + inicio_retomada, 2),
+                'fim': round(segmento.end + inicio_retomada, 2),
                 'texto': segmento.text.strip()
-            })
-            texto_completo.append(segmento.text.strip())
+            }
+            if palavras:
+                seg['palavras'] = extrair_palavras(segmento.words, inicio_retomada)
+            registrar(seg)
+
+    return transcricao_segmentos, info.language, round(duracao_total, 2)
+
+def _resolver_audio(caminho_audio, video_id, url):
+    """
+    Caminho atual do áudio do vídeo (chamado com o áudio já retido no cache)
+
+    O caminho salvo no vídeo aponta para o cache de mídia e pode ter sido
+    despejado enquanto o pedido esperava: o cache é consultado de novo e, se o
+    áudio não estiver mais lá, ele é obtido outra vez.
+    """
+    caminho = cache_midia.obter(video_id, 'audio')
+    if caminho:
+        return caminho
+    if caminho_audio and os.path.exists(caminho_audio):
+        return caminho_audio
+    if url:
+        return obter_audio_whisper(video_id, url)
+    return None
+
+def executar_transcricao(caminho_audio, video_id=None, url=None, progresso=None,
+                         retomar=True, ao_segmento=None, paralelo=None,
+                         perfil=PERFIL_PADRAO, palavras=None):
+    """
+    Transcreve (ou recupera do cache) o áudio de um vídeo
+
+    Args:
+        caminho_audio: Caminho do arquivo de áudio (com vídeo, o áudio é
+            procurado de novo no cache de mídia antes de transcrever)
+        video_id: ID do vídeo (opcional)
+        url: URL do vídeo (opcional)
+        progresso: Callback opcional chamado com a fração (0 a 1) já transcrita
+        retomar: Continua a partir do último segmento salvo de uma execução interrompida
+        ao_segmento: Callback opcional chamado com cada segmento assim que fica disponível
+        paralelo: Divide o áudio em blocos transcritos por um pool de processos
+            (padrão: variável TRANSCRICAO_PARALELA)
+        perfil: Perfil do registro de modelos Whisper (só o padrão no modo paralelo)
+        palavras: Guarda o tempo de cada palavra em `transcricao['palavras']`
+            (padrão: variável TRANSCRICAO_PALAVRAS)
+
+    Returns:
+        Tupla (resposta, status_http)
+    """
+    if not registro_modelos.existe(perfil):
+        return {'success': False, 'error': f"Perfil de modelo Whisper desconhecido: {perfil}"}, 400
+
+    # Os processos do modo paralelo usam o modelo do perfil padrão: outro perfil
+    # pedido junto com paralelo=True é recusado; sem pedido explícito, vale o perfil
+    if perfil != PERFIL_PADRAO:
+        if paralelo and not os.environ.get("USE_CUDA"):
+            return {'success': False, 'error': 'O modo paralelo usa apenas o perfil de modelo padrão'}, 400
+        paralelo = False
+
+    if not video_id and url:
+        video_salvo = persistencia.obter_video(url)
+        if video_salvo:
+            video_id = video_salvo.get('video_id')
+
+    # Sem vídeo, o áudio não pode ser recuperado do cache: precisa existir já
+    if not video_id:
+        if not caminho_audio:
+            return {'success': False, 'error': 'Caminho do áudio não fornecido'}, 400
+        if not os.path.exists(caminho_audio):
+            return {'success': False, 'error': 'Arquivo de áudio não encontrado'}, 400
+
+    lock = _lock_transcricao(video_id) if video_id else threading.Lock()
+    with lock:
+        # Verifica se já existe transcrição salva (inclusive de uma execução concorrente)
+        if url:
+            video_salvo = persistencia.obter_video(url)
+        else:
+            video_salvo = persistencia.obter_video_por_id(video_id) if video_id else None
+        if video_salvo and 'transcricao' in video_salvo:
+            transcricao_data = video_salvo['transcricao']
+            if transcricao_data.get('texto'):
+                if ao_segmento:
+                    for segmento in transcricao_data.get('segmentos', []):
+                        ao_segmento(segmento)
+                return {
+                    'success': True, 
+                    'transcricao': transcricao_data.get('segmentos', []),
+                    'texto_completo': transcricao_data.get('texto'),
+                    'video_id': video_salvo.get('video_id'),
+                    'cache': True
+                }, 200
 
-        texto_final = ' '.join(texto_completo)
+        if paralelo is None:
+            paralelo = TRANSCRICAO_PARALELA_PADRAO
+        if palavras is None:
+            palavras = TRANSCRICAO_PALAVRAS_PADRAO
+        # O áudio não pode ser despejado do cache de mídia durante a transcrição
+        with cache_midia.reter(video_id, 'audio') if video_id else nullcontext():
+            if video_id:
+                caminho_audio = _resolver_audio(caminho_audio, video_id, url or (video_salvo or {}).get('url'))
+                if not caminho_audio:
+                    return {'success': False, 'error': 'Arquivo de áudio não encontrado'}, 400
+            transcricao_segmentos, idioma, duracao_total = _transcrever_com_checkpoint(
+                caminho_audio, video_id, progresso, retomar, ao_segmento, paralelo, perfil, palavras
+            )
+        # Palavras saem dos segmentos e ficam em listas paralelas únicas
+        transcricao_segmentos, palavras_transcricao = compactar_palavras(transcricao_segmentos)
+        texto_final = ' '.join(seg['texto'] for seg in transcricao_segmentos)
 
         # Salva transcrição
         transcricao_data = {
             'segmentos': transcricao_segmentos,
             'texto': texto_final,
-            'idioma': info.language,
-            'duracao_total': round(info.duration, 2)
+            'idioma': idioma,
+            'duracao_total': duracao_total
         }
+        if palavras_transcricao:
+            transcricao_data['palavras'] = palavras_transcricao
         
         if video_id:
             persistencia.atualizar_etapa(video_id, 'transcricao', transcricao_data)
-        elif url:
-            video_salvo = persistencia.obter_video(url)
-            if video_salvo:
-                persistencia.atualizar_etapa(video_salvo.get('video_id'), 'transcricao', transcricao_data)
-
-        return jsonify({
-            'success': True, 
-            'transcricao': transcricao_segmentos,
-            'texto_completo': texto_final,
-            'video_id': video_id,
-            'cache': False
-        })
+            persistencia.limpar_segmentos_parciais(video_id)
+
+    return {
+        'success': True, 
+        'transcricao': transcricao_segmentos,
+        'texto_completo': texto_final,
+        'video_id': video_id,
+        'cache': False
+    }, 200
+
+@transcricao_bp.route('/transcricao', methods=['POST'])
+def transcrever_audio():
+    """Transcreve o áudio de um vídeo usando fast-whisper"""
+    try:
+        data = request.json
+        resposta, status = executar_transcricao(
+            data.get('audio_path'),
+            video_id=data.get('video_id'),
+            url=data.get('url'),
+            retomar=data.get('retomar', True) is not False,
+            paralelo=data.get('paralelo'),
+            perfil=data.get('perfil_modelo') or PERFIL_PADRAO,
+            palavras=data.get('palavras')
+        )
+        return jsonify(resposta), status
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@transcricao_bp.route('/transcricao/stream/<video_id>', methods=['GET'])
+def transcrever_audio_stream(video_id):
+    """
+    Transcreve o áudio e transmite cada segmento via Server-Sent Events
+
+    Eventos: 'segmento' (um por segmento, incluindo os já salvos),
+    'fim' (resumo final) ou 'erro'. Se o cliente desconectar, a transcrição
+    continua em segundo plano e fica salva normalmente.
+    """
+    try:
+        video_salvo = persistencia.obter_video_por_id(video_id)
+        if not video_salvo:
+            return jsonify({'success': False, 'error': 'Vídeo não encontrado'}), 404
+
+        caminho_audio = request.args.get('audio_path') or video_salvo.get('audio', {}).get('caminho_arquivo')
+        retomar = request.args.get('retomar', '1') != '0'
+        paralelo = request.args.get('paralelo')
+        paralelo = None if paralelo is None else paralelo not in ('0', 'false')
+        palavras = request.args.get('palavras')
+        palavras = None if palavras is None else palavras not in ('0', 'false')
+        url = video_salvo.get('url')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    fila = queue.Queue()
+
+    def trabalhador():
+        try:
+            resposta, _status = executar_transcricao(
+                caminho_audio,
+                video_id=video_id,
+                url=url,
+                retomar=retomar,
+                ao_segmento=lambda seg: fila.put(('segmento', seg)),
+                paralelo=paralelo,
+                palavras=palavras
+            )
+            if resposta.get('success'):
+                fila.put(('fim', {
+                    'success': True,
+                    'video_id': video_id,
+                    'total_segmentos': len(resposta.get('transcricao', [])),
+                    'cache': resposta.get('cache', False)
+                }))
+            else:
+                fila.put(('erro', resposta))
+        except Exception as e:
+            fila.put(('erro', {'success': False, 'error': str(e)}))
+
+    threading.Thread(target=trabalhador, name=f"transcricao-stream-{video_id}", daemon=True).start()
+
+    def eventos():
+        while True:
+            try:
+                tipo, dados = fila.get(timeout=15)
+            except queue.Empty:
+                # Mantém a conexão viva enquanto o modelo carrega ou processa silêncio
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+            if tipo != 'segmento':
+                break
+
+    return Response(
+        stream_with_context(eventos()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@transcricao_bp.route('/transcricao/modelos', methods=['GET'])
+def listar_modelos():
+    """Lista os perfis de modelos Whisper e a ocupação de cada pool"""
+    try:
+        return jsonify({'success': True, 'modelos': registro_modelos.estatisticas()})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -15,55 +15,63 @@ from utils.persistencia import persistencia
 
 youtube_bp = Blueprint('youtube', __name__)
 
+def obter_info_video(video_url):
+    """
+    Extrai (ou recupera do cache) as informações de um vídeo do YouTube
+
+    Returns:
+        Tupla (resposta, status_http)
+    """
+    if not video_url:
+        return {'success': False, 'error': 'URL do vídeo não fornecida'}, 400
+
+    # Verifica se já existe no cache
+    video_salvo = persistencia.obter_video(video_url)
+    if video_salvo and 'info_video' in video_salvo:
+        return {
+            'success': True, 
+            'video_info': video_salvo['info_video'],
+            'video_id': video_salvo.get('video_id'),
+            'cache': True
+        }, 200
+
+    # Extrai informações do YouTube
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info_dict = ydl.extract_info(video_url, download=False)
+        
+        info = {
+            'titulo': info_dict.get('title'),
+            'autor': info_dict.get('uploader'),
+            'duracao_segundos': info_dict.get('duration'),
+            'data_publicacao': info_dict.get('upload_date'),
+            'descricao': info_dict.get('description'),
+            'url_thumbnail': info_dict.get('thumbnail'),
+            'visualizacoes': info_dict.get('view_count'),
+            'video_id': info_dict.get('id'),
+        }
+    
+    # Salva no sistema de persistência
+    video_id = persistencia.salvar_video(video_url, {'info_video': info})
+    persistencia.atualizar_etapa(video_id, 'info_video', info)
+    
+    return {
+        'success': True, 
+        'video_info': info,
+        'video_id': video_id,
+        'cache': False
+    }, 200
+
 @youtube_bp.route('/youtube/info', methods=['POST'])
 def youtube_info():
     """Extrai informações básicas de um vídeo do YouTube"""
     try:
         data = request.json
-        video_url = data.get('url')
-
-        if not video_url:
-            return jsonify({'success': False, 'error': 'URL do vídeo não fornecida'}), 400
-
-        # Verifica se já existe no cache
-        video_salvo = persistencia.obter_video(video_url)
-        if video_salvo and 'info_video' in video_salvo:
-            return jsonify({
-                'success': True, 
-                'video_info': video_salvo['info_video'],
-                'video_id': video_salvo.get('video_id'),
-                'cache': True
-            })
-
-        # Extrai informações do YouTube
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(video_url, download=False)
-            
-            info = {
-                'titulo': info_dict.get('title'),
-                'autor': info_dict.get('uploader'),
-                'duracao_segundos': info_dict.get('duration'),
-                'data_publicacao': info_dict.get('upload_date'),
-                'descricao': info_dict.get('description'),
-                'url_thumbnail': info_dict.get('thumbnail'),
-                'visualizacoes': info_dict.get('view_count'),
-                'video_id': info_dict.get('id'),
-            }
-        
-        # Salva no sistema de persistência
-        video_id = persistencia.salvar_video(video_url, {'info_video': info})
-        persistencia.atualizar_etapa(video_id, 'info_video', info)
-        
-        return jsonify({
-            'success': True, 
-            'video_info': info,
-            'video_id': video_id,
-            'cache': False
-        })
+        resposta, status = obter_info_video(data.get('url'))
+        return jsonify(resposta), status
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
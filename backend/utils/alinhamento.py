@@ -0,0 +1,138 @@
+"""
+Alinhamento aproximado das citações da IA com a transcrição
+
+O modelo devolve as primeiras e as últimas palavras de cada corte, mas nem
+sempre literalmente: troca uma palavra, muda a acentuação ou junta o fim de
+um segmento com o começo do seguinte. O alinhamento trabalha sobre a
+sequência contínua de palavras normalizadas do IndiceTranscricao (que ignora
+as fronteiras entre segmentos):
+
+1. procura a citação exata pelo índice de n-gramas (confiança 1.0)
+2. senão, cada palavra da citação vota nas posições onde a citação
+   começaria; as posições mais votadas são comparadas com a citação por
+   distância de edição em nível de palavra (com início e fim livres no texto)
+3. a confiança é 1 - custo / palavras da citação; abaixo do mínimo, não há
+   alinhamento
+"""
+
+import os
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.indice_transcricao import IndiceTranscricao, tokenizar
+
+
+# Confiança mínima para aceitar um alinhamento aproximado
+CONFIANCA_MINIMA = float(os.environ.get("ANALISE_CONFIANCA_MINIMA", 0.6))
+
+# Posições candidatas avaliadas por citação
+MAX_CANDIDATAS = 64
+
+# Palavras muito frequentes (artigos, preposições) não votam
+MAX_OCORRENCIAS_VOTO = 2000
+
+# Palavras a mais examinadas antes e depois de cada candidata
+FOLGA_JANELA = 3
+
+
+def _custo_substituicao(a: str, b: str) -> float:
+    """0 para palavras iguais, 0.5 para variações próximas (plural, erro de grafia), 1 para diferentes"""
+    if a == b:
+        return 0.0
+    if len(a) > 3 and len(b) > 3 and SequenceMatcher(None, a, b).ratio() >= 0.8:
+        return 0.5
+    return 1.0
+
+
+def _alinhar_janela(citacao: List[str], janela: List[str]) -> Tuple[float, int, int]:
+    """
+    Distância de edição da citação contra o melhor trecho da janela
+
+    Início e fim na janela são livres (alinhamento semi-global).
+
+    Returns:
+        Tupla (custo, primeira palavra, última palavra) com posições na janela
+    """
+    m, n = len(citacao), len(janela)
+    # custo[j] e origem[j]: melhor alinhamento de citacao[:i] terminando em janela[:j]
+    custo = [0.0] * (n + 1)
+    origem = list(range(n + 1))
+    for i in range(1, m + 1):
+        novo_custo = [float(i)] + [0.0] * n
+        nova_origem = [0] + [0] * n
+        for j in range(1, n + 1):
+            opcoes = (
+                (custo[j - 1] + _custo_substituicao(citacao[i - 1], janela[j - 1]), origem[j - 1]),
+                (custo[j] + 1, origem[j]),                  # palavra da citação ausente no texto
+                (novo_custo[j - 1] + 1, nova_origem[j - 1]),  # palavra a mais no texto
+            )
+            novo_custo[j], nova_origem[j] = min(opcoes, key=lambda o: o[0])
+        custo, origem = novo_custo, nova_origem
+
+    melhor = min(range(1, n + 1), key=lambda j: (custo[j], j)) if n else 0
+    return custo[melhor], origem[melhor], max(origem[melhor], melhor - 1)
+
+
+def _candidatas(indice: IndiceTranscricao, citacao: List[str], primeira_palavra: int) -> List[int]:
+    """Posições de início mais votadas pelas palavras da citação"""
+    votos: Dict[int, int] = {}
+    for deslocamento, palavra in enumerate(citacao):
+        posicoes = indice.posicoes_palavra.get(palavra, [])
+        if len(posicoes) > MAX_OCORRENCIAS_VOTO:
+            continue
+        for posicao in posicoes:
+            inicio = posicao - deslocamento
+            if inicio >= primeira_palavra - FOLGA_JANELA:
+                votos[inicio] = votos.get(inicio, 0) + 1
+    return sorted(votos, key=lambda p: (-votos[p], p))[:MAX_CANDIDATAS]
+
+
+def alinhar_citacao(indice: IndiceTranscricao, texto: str, a_partir_de: float = 0.0,
+                    confianca_minima: float = CONFIANCA_MINIMA) -> Optional[Dict[str, Any]]:
+    """
+    Localiza a citação na transcrição, de forma exata ou aproximada
+
+    Args:
+        indice: Índice da transcrição
+        texto: Citação devolvida pela IA
+        a_partir_de: Só considera segmentos que começam neste tempo ou depois
+        confianca_minima: Confiança mínima (0 a 1) do alinhamento aproximado
+
+    Returns:
+        Dicionário com 'segmento_inicio' e 'segmento_fim' (posições em
+        indice.segmentos) e 'confianca', ou None
+    """
+    citacao = tokenizar(texto)
+    if not citacao:
+        return None
+
+    exato = indice.buscar_citacao(texto, a_partir_de)
+    if exato:
+        return {'segmento_inicio': exato[0], 'segmento_fim': exato[1], 'confianca': 1.0}
+
+    # Primeira palavra do primeiro segmento permitido
+    primeiro_segmento = indice.posicao_no_tempo(a_partir_de)
+    if primeiro_segmento >= len(indice.segmentos):
+        return None
+    primeira_palavra = bisect_left(indice.segmento_da_palavra, primeiro_segmento)
+
+    melhor = None
+    for candidata in _candidatas(indice, citacao, primeira_palavra):
+        ini = max(primeira_palavra, candidata - FOLGA_JANELA)
+        fim = min(len(indice.palavras), candidata + len(citacao) + FOLGA_JANELA)
+        if ini >= fim:
+            continue
+        custo, primeira, ultima = _alinhar_janela(citacao, indice.palavras[ini:fim])
+        confianca = max(0.0, 1 - custo / len(citacao))
+        chave = (confianca, -(ini + primeira))
+        if melhor is None or chave > melhor[0]:
+            melhor = (chave, ini + primeira, ini + ultima)
+
+    if melhor is None or melhor[0][0] < confianca_minima:
+        return None
+    return {
+        'segmento_inicio': indice.segmento_da_palavra[melhor[1]],
+        'segmento_fim': indice.segmento_da_palavra[melhor[2]],
+        'confianca': round(melhor[0][0], 3),
+    }
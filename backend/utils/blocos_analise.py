@@ -0,0 +1,139 @@
+"""
+Divisão da transcrição em blocos para a análise por orçamento de tokens
+
+Em vez de janelas fixas de 10 minutos, os blocos são montados com segmentos
+inteiros do Whisper até o orçamento de tokens do modelo (a janela de contexto
+menos o prompt e a resposta esperada). Quem fala rápido não estoura o
+contexto e quem fala devagar não gasta chamadas com blocos meio vazios.
+
+Cada bloco começa repetindo o fim do anterior (até uma fração do orçamento),
+a partir do início de uma frase, para a IA não receber um raciocínio cortado
+ao meio. Nenhum segmento fica de fora: todo segmento pertence a pelo menos
+um bloco.
+
+Os tokens são estimados pelo tamanho do texto (sem depender do tokenizador de
+cada modelo), de forma conservadora para português.
+"""
+
+import math
+from typing import Any, Dict, List
+
+from utils.indice_transcricao import FIM_DE_FRASE
+
+
+# Caracteres por token em português (estimativa conservadora)
+CARACTERES_POR_TOKEN = 3.2
+
+# Tokens reservados para a resposta do modelo (2 a 3 sugestões em JSON)
+TOKENS_RESPOSTA = 1024
+
+# Blocos com menos texto que isso não valem uma chamada
+MIN_CARACTERES_BLOCO = 200
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa de tokens de um texto"""
+    return math.ceil(len(texto or '') / CARACTERES_POR_TOKEN)
+
+
+def orcamento_tokens(contexto: int, tokens_prompt: int, tokens_resposta: int = TOKENS_RESPOSTA) -> int:
+    """
+    Tokens de transcrição que cabem em uma chamada
+
+    Args:
+        contexto: Janela de contexto usada na chamada (num_ctx)
+        tokens_prompt: Tokens do prompt de sistema e do template, sem a transcrição
+        tokens_resposta: Tokens reservados para a resposta
+
+    Raises:
+        ValueError: Se o prompt e a resposta não deixarem espaço para a transcrição
+    """
+    orcamento = contexto - tokens_prompt - tokens_resposta
+    if orcamento < 256:
+        raise ValueError(f"Contexto de {contexto} tokens insuficiente para o prompt "
+                         f"({tokens_prompt}) e a resposta ({tokens_resposta})")
+    return orcamento
+
+
+def _texto_segmentos(segmentos: List[Dict[str, Any]]) -> str:
+    """Texto corrido; segmentos com 'salto' (pré-filtro) indicam o trecho omitido antes deles"""
+    return ''.join(f"[...] {seg['texto']} " if seg.get('salto') else f"{seg['texto']} " for seg in segmentos)
+
+
+def _inicio_sobreposicao(segmentos: List[Dict[str, Any]], tokens: List[int],
+                         inicio_bloco: int, fim_bloco: int, sobreposicao: int) -> int:
+    """
+    Posição do segmento onde começa o próximo bloco
+
+    Volta a partir do fim do bloco enquanto couber em `sobreposicao` tokens e
+    escolhe o segmento mais antigo que começa uma frase (o anterior termina em
+    pontuação final). Sem frase no trecho, não há sobreposição.
+    """
+    escolhido = fim_bloco
+    acumulado = 0
+    posicao = fim_bloco - 1
+    while posicao > inicio_bloco:
+        acumulado += tokens[posicao]
+        if acumulado > sobreposicao:
+            break
+        if FIM_DE_FRASE.search(segmentos[posicao - 1]['texto']):
+            escolhido = posicao
+        posicao -= 1
+    return escolhido
+
+
+def montar_blocos(segmentos: List[Dict[str, Any]], orcamento: int,
+                  fracao_sobreposicao: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Agrupa segmentos inteiros em blocos de até `orcamento` tokens
+
+    Args:
+        segmentos: Segmentos em ordem cronológica ({'inicio', 'fim', 'texto'})
+        orcamento: Tokens de transcrição por bloco
+        fracao_sobreposicao: Fração do orçamento repetida no início do bloco seguinte
+
+    Returns:
+        Lista de blocos {'inicio', 'fim', 'texto', 'tokens', 'segmentos'};
+        um segmento maior que o orçamento vira um bloco sozinho
+    """
+    tokens = [estimar_tokens(seg['texto']) + 1 for seg in segmentos]
+    sobreposicao = int(orcamento * fracao_sobreposicao)
+
+    blocos = []
+    inicio = 0
+    while inicio < len(segmentos):
+        fim = inicio
+        total = 0
+        while fim < len(segmentos) and (fim == inicio or total + tokens[fim] <= orcamento):
+            total += tokens[fim]
+            fim += 1
+
+        trecho = segmentos[inicio:fim]
+        texto = _texto_segmentos(trecho)
+        if len(texto) > MIN_CARACTERES_BLOCO:
+            blocos.append({
+                'inicio': trecho[0]['inicio'],
+                'fim': trecho[-1]['fim'],
+                'texto': texto,
+                'tokens': total,
+                'segmentos': len(trecho),
+            })
+
+        if fim >= len(segmentos):
+            break
+        inicio = _inicio_sobreposicao(segmentos, tokens, inicio, fim, sobreposicao)
+
+    return blocos
+
+
+def plano_blocos(blocos: List[Dict[str, Any]], contexto: int, orcamento: int) -> Dict[str, Any]:
+    """Resumo da divisão (quantidade e tokens por bloco), para acompanhar e comparar modelos"""
+    tokens_por_bloco = [bloco['tokens'] for bloco in blocos]
+    return {
+        'contexto_tokens': contexto,
+        'orcamento_tokens': orcamento,
+        'total_blocos': len(blocos),
+        'tokens_por_bloco': tokens_por_bloco,
+        'tokens_total': sum(tokens_por_bloco),
+        'ocupacao_media': round(sum(tokens_por_bloco) / (len(blocos) * orcamento), 3) if blocos else 0,
+    }
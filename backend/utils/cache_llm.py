@@ -0,0 +1,171 @@
+"""
+Cache em disco das respostas do modelo de linguagem
+
+Cada resposta é guardada em um arquivo JSON cujo nome é o hash da chamada
+(modelo, opções, prompt de sistema, template do prompt e texto do bloco).
+Reprocessar um vídeo sem mudar a transcrição, o prompt ou o modelo reaproveita
+as respostas, e uma análise interrompida retoma a partir dos blocos já
+respondidos. O último acesso é o mtime do arquivo e, quando o total passa do
+orçamento, as respostas menos usadas são removidas.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.persistencia import diretorio_dados_padrao
+
+
+# Orçamento padrão de disco do cache, em MB
+ORCAMENTO_PADRAO_MB = 256
+
+
+def chave_llm(modelo: str, opcoes: Dict[str, Any], sistema: str, template: str, texto: str) -> str:
+    """Hash SHA-256 que identifica uma chamada ao modelo"""
+    conteudo = json.dumps(
+        {'modelo': modelo, 'opcoes': opcoes, 'sistema': sistema, 'template': template, 'texto': texto},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+class CacheLLM:
+    """Respostas do modelo por hash da chamada, com despejo LRU por tamanho"""
+
+    def __init__(self, base_dir: str = None, orcamento_bytes: int = None):
+        """
+        Inicializa o cache
+
+        Args:
+            base_dir: Diretório do cache (padrão: LLM_CACHE_DIR ou dados/cache_llm)
+            orcamento_bytes: Espaço máximo em disco (padrão: LLM_CACHE_MAX_MB ou 256 MB)
+        """
+        self.base_dir = Path(base_dir or os.environ.get("LLM_CACHE_DIR") or diretorio_dados_padrao() / "cache_llm")
+        if orcamento_bytes is None:
+            orcamento_mb = float(os.environ.get("LLM_CACHE_MAX_MB") or ORCAMENTO_PADRAO_MB)
+            orcamento_bytes = int(orcamento_mb * 1024 ** 2)
+        self.orcamento_bytes = max(0, int(orcamento_bytes))
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._acertos = 0
+        self._faltas = 0
+        self._despejados = 0
+        self._tamanho_bytes = None
+
+    def _caminho(self, chave: str) -> Path:
+        return self.base_dir / chave[:2] / f"{chave}.json"
+
+    def _arquivos(self):
+        return self.base_dir.glob("*/*.json")
+
+    def _total_bytes(self) -> int:
+        """Tamanho ocupado (calculado na primeira consulta e mantido depois)"""
+        if self._tamanho_bytes is None:
+            total = 0
+            for caminho in self._arquivos():
+                try:
+                    total += caminho.stat().st_size
+                except OSError:
+                    pass
+            self._tamanho_bytes = total
+        return self._tamanho_bytes
+
+    def obter(self, chave: str) -> Optional[str]:
+        """Resposta guardada para a chave, ou None"""
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                resposta = json.load(f)['resposta']
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._faltas += 1
+            return None
+
+        try:
+            # Marca o acesso para o despejo LRU
+            os.utime(caminho)
+        except OSError:
+            pass
+        with self._lock:
+            self._acertos += 1
+        return resposta
+
+    def guardar(self, chave: str, resposta: str, metadados: Dict[str, Any] = None):
+        """Grava a resposta de forma atômica e despeja as mais antigas se preciso"""
+        caminho = self._caminho(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        dados = {'resposta': resposta, 'criado_em': datetime.now().isoformat(), **(metadados or {})}
+
+        fd, temporario = tempfile.mkstemp(prefix=f".{chave[:8]}.", suffix=".tmp", dir=caminho.parent)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+        tamanho = os.path.getsize(temporario)
+        try:
+            anterior = caminho.stat().st_size
+        except OSError:
+            anterior = 0
+        os.replace(temporario, caminho)
+
+        with self._lock:
+            self._tamanho_bytes = self._total_bytes() + tamanho - anterior
+            if self._tamanho_bytes > self.orcamento_bytes:
+                self._despejar(protegido=caminho)
+
+    def _despejar(self, protegido: Path = None):
+        """Remove as respostas acessadas há mais tempo até caber no orçamento (lock adquirido)"""
+        arquivos = []
+        for caminho in self._arquivos():
+            try:
+                info = caminho.stat()
+            except OSError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+        arquivos.sort()
+
+        total = sum(tamanho for _mtime, tamanho, _caminho in arquivos)
+        for _mtime, tamanho, caminho in arquivos:
+            if total <= self.orcamento_bytes:
+                break
+            if caminho == protegido:
+                continue
+            try:
+                caminho.unlink()
+            except OSError:
+                continue
+            total -= tamanho
+            self._despejados += 1
+        self._tamanho_bytes = total
+
+    def limpar(self):
+        """Remove todas as respostas guardadas"""
+        with self._lock:
+            for caminho in self._arquivos():
+                try:
+                    caminho.unlink()
+                except OSError:
+                    pass
+            self._tamanho_bytes = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Ocupação, orçamento e taxa de acertos"""
+        with self._lock:
+            consultas = self._acertos + self._faltas
+            return {
+                'arquivos': sum(1 for _ in self._arquivos()),
+                'tamanho_bytes': self._total_bytes(),
+                'orcamento_bytes': self.orcamento_bytes,
+                'acertos': self._acertos,
+                'faltas': self._faltas,
+                'taxa_acertos': round(self._acertos / consultas, 3) if consultas else None,
+                'despejados': self._despejados,
+            }
+
+
+# Instância global
+cache_llm = CacheLLM()
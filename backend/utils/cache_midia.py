@@ -0,0 +1,403 @@
+"""
+Cache de mídia compartilhado entre etapas e processos
+
+Áudios e vídeos baixados ficam em uploads/cache, com o nome derivado do hash
+da chave (vídeo + tipo de mídia) e registrados em um manifesto com tamanho,
+checksum, formato e horários de criação e último acesso. Um arquivo só entra
+no cache depois de completo (gravação em arquivo temporário + rename), dois
+pedidos da mesma mídia executam o download uma única vez (single-flight, com
+lock de arquivo entre processos) e os arquivos menos usados são removidos
+quando o total passa do orçamento de disco.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, apenas entre threads
+    fcntl = None
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Orçamento padrão de disco do cache, em GB
+ORCAMENTO_PADRAO_GB = 20
+
+
+def _sha256_arquivo(caminho: Path) -> str:
+    """Checksum SHA-256 do conteúdo do arquivo"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def validar_midia(caminho: str) -> bool:
+    """
+    Confere com o ffprobe se um arquivo de mídia (ex: de antes do cache) é legível
+
+    Sem o ffprobe disponível, aceita qualquer arquivo não vazio.
+    """
+    try:
+        if os.path.getsize(caminho) == 0:
+            return False
+    except OSError:
+        return False
+    if not shutil.which("ffprobe"):
+        return True
+    resultado = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", caminho],
+        capture_output=True, text=True, timeout=60
+    )
+    try:
+        return resultado.returncode == 0 and float(resultado.stdout.strip()) > 0
+    except ValueError:
+        return False
+
+
+@contextmanager
+def _lock_arquivo(caminho: Path):
+    """Lock exclusivo entre processos usando um arquivo auxiliar"""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class CacheMidia:
+    """Cache de arquivos de mídia com manifesto, single-flight e despejo LRU"""
+
+    def __init__(self, base_dir: str = None, orcamento_bytes: int = None):
+        """
+        Inicializa o cache
+
+        Args:
+            base_dir: Diretório do cache (padrão: MIDIA_CACHE_DIR ou uploads/cache)
+            orcamento_bytes: Espaço máximo em disco (padrão: MIDIA_CACHE_MAX_GB
+                ou 20 GB)
+        """
+        self.base_dir = Path(base_dir or os.environ.get("MIDIA_CACHE_DIR") or BACKEND_DIR / "uploads" / "cache")
+        if orcamento_bytes is None:
+            orcamento_gb = float(os.environ.get("MIDIA_CACHE_MAX_GB") or ORCAMENTO_PADRAO_GB)
+            orcamento_bytes = int(orcamento_gb * 1024 ** 3)
+        self.orcamento_bytes = max(0, int(orcamento_bytes))
+
+        self.manifesto_path = self.base_dir / "manifesto.json"
+        self._dir_temporario = self.base_dir / "tmp"
+        self._dir_locks = self.base_dir / "locks"
+        for diretorio in (self.base_dir, self._dir_temporario, self._dir_locks):
+            diretorio.mkdir(parents=True, exist_ok=True)
+
+        # Locks por chave (threads) e contagem de arquivos em uso (não despejáveis)
+        self._lock = threading.Lock()
+        self._locks_chave: Dict[str, threading.Lock] = {}
+        self._em_uso: Dict[str, int] = {}
+        self._acertos = 0
+        self._faltas = 0
+
+        self._limpar_temporarios()
+
+    # ------------------------------
+    # MANIFESTO
+    # ------------------------------
+    @staticmethod
+    def chave(video_id: str, tipo: str) -> str:
+        """Chave lógica de uma mídia (ex: abc123:audio)"""
+        return f"{video_id}:{tipo}"
+
+    def _hash_chave(self, chave: str) -> str:
+        return hashlib.sha256(chave.encode('utf-8')).hexdigest()
+
+    def _caminho_final(self, chave: str, formato: str) -> Path:
+        """Caminho endereçado pelo hash da chave: <cache>/ab/abcdef....<formato>"""
+        h = self._hash_chave(chave)
+        return self.base_dir / h[:2] / f"{h}.{formato}"
+
+    def _ler_manifesto(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifesto_path.exists():
+            return {}
+        try:
+            with open(self.manifesto_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar_manifesto(self, manifesto: Dict[str, Dict[str, Any]]):
+        """Grava o manifesto de forma atômica"""
+        fd, temporario = tempfile.mkstemp(prefix=".manifesto.", suffix=".tmp", dir=self.base_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.manifesto_path)
+
+    @contextmanager
+    def _manifesto(self):
+        """Lê e grava o manifesto sob lock entre threads e processos"""
+        with self._lock, _lock_arquivo(self._dir_locks / "manifesto.lock"):
+            manifesto = self._ler_manifesto()
+            original = json.dumps(manifesto, sort_keys=True)
+            yield manifesto
+            if json.dumps(manifesto, sort_keys=True) != original:
+                self._salvar_manifesto(manifesto)
+
+    def _limpar_temporarios(self, idade_minima: float = 6 * 3600):
+        """Remove arquivos temporários antigos deixados por processos interrompidos"""
+        limite = time.time() - idade_minima
+        for caminho in self._dir_temporario.glob("*"):
+            try:
+                if caminho.stat().st_mtime < limite:
+                    caminho.unlink()
+            except OSError:
+                pass
+
+    # ------------------------------
+    # CONSULTA
+    # ------------------------------
+    def obter(self, video_id: str, tipo: str) -> Optional[str]:
+        """
+        Retorna o caminho da mídia se ela estiver completa no cache
+
+        Entradas cujo arquivo sumiu ou mudou de tamanho são descartadas.
+        """
+        chave = self.chave(video_id, tipo)
+        with self._manifesto() as manifesto:
+            entrada = manifesto.get(chave)
+            if not entrada:
+                return None
+            caminho = Path(entrada['caminho'])
+            try:
+                valido = caminho.stat().st_size == entrada['tamanho_bytes']
+            except OSError:
+                valido = False
+            if not valido:
+                manifesto.pop(chave, None)
+                return None
+            entrada['acessado_em'] = datetime.now().isoformat()
+            return str(caminho)
+
+    def entrada(self, video_id: str, tipo: str) -> Optional[Dict[str, Any]]:
+        """Retorna uma cópia da entrada do manifesto (tamanho, checksum, formato...)"""
+        with self._manifesto() as manifesto:
+            entrada = manifesto.get(self.chave(video_id, tipo))
+            return dict(entrada) if entrada else None
+
+    def listar(self, video_id: str) -> List[Dict[str, Any]]:
+        """Cópias das entradas do manifesto de um vídeo (todos os tipos)"""
+        with self._manifesto() as manifesto:
+            return [dict(e) for e in manifesto.values() if e['video_id'] == video_id]
+
+    # ------------------------------
+    # PUBLICAÇÃO
+    # ------------------------------
+    def caminho_temporario(self, formato: str) -> str:
+        """Caminho temporário (no mesmo disco do cache) para gravar uma mídia nova"""
+        return str(self._dir_temporario / f"{uuid.uuid4().hex}.{formato}")
+
+    def publicar(self, video_id: str, tipo: str, caminho_origem: str,
+                 formato: str = None, mover: bool = True) -> str:
+        """
+        Publica um arquivo completo no cache (rename atômico para o destino)
+
+        Args:
+            video_id: ID do vídeo
+            tipo: Tipo de mídia (ex: audio, video)
+            caminho_origem: Arquivo já completo
+            formato: Extensão do arquivo (padrão: extensão da origem)
+            mover: Move o arquivo (True) ou copia (False)
+
+        Returns:
+            Caminho final no cache
+        """
+        origem = Path(caminho_origem)
+        formato = formato or origem.suffix.lstrip('.') or 'bin'
+        chave = self.chave(video_id, tipo)
+        destino = self._caminho_final(chave, formato)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+
+        if not mover:
+            copia = Path(self.caminho_temporario(formato))
+            shutil.copyfile(origem, copia)
+            origem = copia
+        checksum = _sha256_arquivo(origem)
+        tamanho = origem.stat().st_size
+        try:
+            os.replace(origem, destino)
+        except OSError:
+            # Origem em outro disco: copia para o temporário do cache e renomeia
+            copia = Path(self.caminho_temporario(formato))
+            shutil.move(str(origem), copia)
+            os.replace(copia, destino)
+
+        agora = datetime.now().isoformat()
+        with self._manifesto() as manifesto:
+            anterior = manifesto.get(chave)
+            if anterior and anterior['caminho'] != str(destino):
+                self._apagar(Path(anterior['caminho']))
+            manifesto[chave] = {
+                'video_id': video_id,
+                'tipo': tipo,
+                'caminho': str(destino),
+                'formato': formato,
+                'tamanho_bytes': tamanho,
+                'sha256': checksum,
+                'criado_em': agora,
+                'acessado_em': agora,
+            }
+            self._despejar(manifesto, protegida=chave)
+
+        print(f"[CACHE] Publicado {chave} ({tamanho / 1024 / 1024:.1f} MB)")
+        return str(destino)
+
+    def obter_ou_criar(self, video_id: str, tipo: str, formato: str,
+                       produzir: Callable[[str], Optional[str]]) -> str:
+        """
+        Retorna a mídia do cache ou a produz uma única vez
+
+        Se outro pedido (thread ou processo) já está produzindo a mesma mídia,
+        aguarda o término e reutiliza o resultado.
+
+        Args:
+            video_id: ID do vídeo
+            tipo: Tipo de mídia (ex: audio, video)
+            formato: Extensão do arquivo final
+            produzir: Recebe um caminho temporário e grava a mídia nele. Pode
+                retornar outro caminho, se o arquivo foi gerado com nome diferente.
+
+        Returns:
+            Caminho final no cache
+        """
+        caminho = self.obter(video_id, tipo)
+        if caminho:
+            with self._lock:
+                self._acertos += 1
+            return caminho
+
+        chave = self.chave(video_id, tipo)
+        with self._lock:
+            lock_chave = self._locks_chave.setdefault(chave, threading.Lock())
+
+        with lock_chave, _lock_arquivo(self._dir_locks / f"{self._hash_chave(chave)}.lock"):
+            # Outro pedido pode ter concluído enquanto aguardávamos o lock
+            caminho = self.obter(video_id, tipo)
+            if caminho:
+                with self._lock:
+                    self._acertos += 1
+                return caminho
+
+            with self._lock:
+                self._faltas += 1
+            temporario = self.caminho_temporario(formato)
+            try:
+                gerado = produzir(temporario) or temporario
+                if not os.path.exists(gerado) or os.path.getsize(gerado) == 0:
+                    raise RuntimeError(f"Mídia {chave} não foi gerada")
+                return self.publicar(video_id, tipo, gerado, formato)
+            finally:
+                for resto in Path(self._dir_temporario).glob(Path(temporario).stem + "*"):
+                    self._apagar(resto)
+
+    # ------------------------------
+    # USO E DESPEJO
+    # ------------------------------
+    @contextmanager
+    def reter(self, video_id: str, tipo: str):
+        """
+        Impede que a mídia seja despejada enquanto estiver em uso neste processo
+
+        Uso:
+            with cache_midia.reter(video_id, 'video'):
+                ... ffmpeg lendo o arquivo ...
+        """
+        chave = self.chave(video_id, tipo)
+        with self._lock:
+            self._em_uso[chave] = self._em_uso.get(chave, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._em_uso[chave] -= 1
+                if self._em_uso[chave] <= 0:
+                    del self._em_uso[chave]
+
+    def _apagar(self, caminho: Path):
+        try:
+            caminho.unlink()
+        except OSError:
+            pass
+
+    def _despejar(self, manifesto: Dict[str, Dict[str, Any]], protegida: str = None):
+        """Remove as mídias menos usadas até o total caber no orçamento (lock adquirido)"""
+        total = sum(e['tamanho_bytes'] for e in manifesto.values())
+        if total <= self.orcamento_bytes:
+            return
+
+        candidatas = sorted(
+            (
+                (chave, entrada) for chave, entrada in manifesto.items()
+                if chave != protegida and chave not in self._em_uso
+            ),
+            key=lambda item: item[1]['acessado_em']
+        )
+        for chave, entrada in candidatas:
+            if total <= self.orcamento_bytes:
+                break
+            self._apagar(Path(entrada['caminho']))
+            total -= entrada['tamanho_bytes']
+            del manifesto[chave]
+            print(f"[CACHE] Despejado {chave} ({entrada['tamanho_bytes'] / 1024 / 1024:.1f} MB)")
+
+        if total > self.orcamento_bytes:
+            print(f"[CACHE] Orçamento excedido por mídias em uso ({total / 1024 ** 3:.2f} GB)")
+
+    def remover(self, video_id: str, tipo: str = None):
+        """
+        Remove uma mídia (ou todas as mídias de um vídeo) do cache
+
+        Mídias retidas neste processo são mantidas; o despejo LRU as remove depois.
+        """
+        with self._manifesto() as manifesto:
+            for chave, entrada in list(manifesto.items()):
+                if chave in self._em_uso:
+                    continue
+                if entrada['video_id'] == video_id and (tipo is None or entrada['tipo'] == tipo):
+                    self._apagar(Path(entrada['caminho']))
+                    del manifesto[chave]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Ocupação do cache, orçamento e taxa de acertos"""
+        with self._manifesto() as manifesto:
+            total = sum(e['tamanho_bytes'] for e in manifesto.values())
+            por_tipo: Dict[str, int] = {}
+            for entrada in manifesto.values():
+                por_tipo[entrada['tipo']] = por_tipo.get(entrada['tipo'], 0) + 1
+        with self._lock:
+            return {
+                'arquivos': len(manifesto),
+                'por_tipo': por_tipo,
+                'tamanho_bytes': total,
+                'orcamento_bytes': self.orcamento_bytes,
+                'em_uso': sorted(self._em_uso),
+                'acertos': self._acertos,
+                'faltas': self._faltas,
+            }
+
+
+# Instância global
+cache_midia = CacheMidia()
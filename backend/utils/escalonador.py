@@ -0,0 +1,193 @@
+"""
+Escalonador de recursos para as etapas pesadas do processamento
+
+Cada classe de recurso (download, transcrição, análise, encode) tem uma
+quantidade própria de slots e um custo em núcleos de CPU. Um trabalho só
+começa quando há slot livre no seu recurso e sobra orçamento global de CPU,
+de forma que downloads (custo zero) continuam em paralelo enquanto a
+transcrição e o encode disputam os núcleos de forma coordenada.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+
+# Configuração padrão: slots e custo em núcleos de CPU por recurso
+# (slots None: quantos trabalhos cabem no orçamento de CPU)
+RECURSOS_PADRAO = {
+    'download': {'slots': 4, 'custo_cpu': 0},
+    'transcricao': {'slots': None, 'custo_cpu': 4},
+    # Chamadas simultâneas ao Ollama (ver OLLAMA_NUM_PARALLEL no servidor)
+    'analise': {'slots': 4, 'custo_cpu': 0},
+    'encode': {'slots': 2, 'custo_cpu': 2},
+}
+
+
+def _ler_int_env(nome: str, padrao: int) -> int:
+    """Lê um inteiro de variável de ambiente, com valor padrão"""
+    valor = os.environ.get(nome)
+    if valor is None or valor == '':
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        return padrao
+
+
+class Escalonador:
+    """Controla slots por recurso e um orçamento global de CPU"""
+
+    def __init__(self, orcamento_cpu: int = None, recursos: Dict[str, Dict[str, int]] = None):
+        """
+        Inicializa o escalonador
+
+        Args:
+            orcamento_cpu: Total de núcleos disponíveis para as etapas (padrão:
+                ESCALONADOR_ORCAMENTO_CPU ou os.cpu_count())
+            recursos: Configuração {recurso: {'slots', 'custo_cpu'}} (padrão:
+                RECURSOS_PADRAO, sobrescrito por ESCALONADOR_SLOTS_<RECURSO> e
+                ESCALONADOR_CUSTO_<RECURSO>)
+        """
+        if orcamento_cpu is None:
+            orcamento_cpu = _ler_int_env('ESCALONADOR_ORCAMENTO_CPU', os.cpu_count() or 1)
+        self.orcamento_cpu = max(1, int(orcamento_cpu))
+
+        self._cond = threading.Condition()
+        self._cpu_em_uso = 0
+        self._espera: List[Dict[str, Any]] = []
+        self._recursos: Dict[str, Dict[str, Any]] = {}
+
+        for nome, config in (recursos or RECURSOS_PADRAO).items():
+            custo_cpu = _ler_int_env(f'ESCALONADOR_CUSTO_{nome.upper()}', config['custo_cpu'])
+            slots = config['slots']
+            if slots is None:
+                slots = self.orcamento_cpu // max(1, custo_cpu)
+            self.configurar_recurso(
+                nome,
+                slots=_ler_int_env(f'ESCALONADOR_SLOTS_{nome.upper()}', slots),
+                custo_cpu=custo_cpu
+            )
+
+    def configurar_recurso(self, nome: str, slots: int, custo_cpu: int = 0):
+        """
+        Cria ou altera a configuração de um recurso
+
+        Args:
+            nome: Nome do recurso
+            slots: Quantidade máxima de trabalhos simultâneos
+            custo_cpu: Núcleos de CPU ocupados por cada trabalho
+        """
+        with self._cond:
+            recurso = self._recursos.setdefault(nome, {
+                'em_uso': 0,
+                'concluidos': 0,
+                'tempo_espera_total': 0.0,
+                'tempo_execucao_total': 0.0,
+            })
+            recurso['slots'] = max(1, int(slots))
+            # Um custo maior que o orçamento nunca seria atendido
+            recurso['custo_cpu'] = max(0, min(int(custo_cpu), self.orcamento_cpu))
+            self._cond.notify_all()
+
+    def custo_cpu(self, nome: str) -> int:
+        """Retorna quantos núcleos um trabalho do recurso pode usar (mínimo 1)"""
+        recurso = self._recursos.get(nome)
+        return max(1, recurso['custo_cpu']) if recurso else 1
+
+    def slots(self, nome: str) -> int:
+        """Retorna a quantidade de slots do recurso"""
+        recurso = self._recursos.get(nome)
+        return recurso['slots'] if recurso else 1
+
+    def _pode_executar(self, pedido: Dict[str, Any]) -> bool:
+        """Verifica se o pedido pode começar agora (chamado com o lock adquirido)"""
+        recurso = self._recursos[pedido['recurso']]
+        if recurso['em_uso'] >= recurso['slots']:
+            return False
+        if pedido['custo'] == 0:
+            return True
+        if self._cpu_em_uso + pedido['custo'] > self.orcamento_cpu:
+            return False
+
+        # Pedidos mais antigos que só aguardam CPU têm prioridade (evita starvation)
+        for anterior in self._espera:
+            if anterior is pedido:
+                break
+            outro = self._recursos[anterior['recurso']]
+            if anterior['custo'] > 0 and outro['em_uso'] < outro['slots']:
+                return False
+        return True
+
+    @contextmanager
+    def reservar(self, nome: str, custo_cpu: int = None):
+        """
+        Aguarda um slot do recurso e reserva sua parcela de CPU
+
+        Args:
+            nome: Nome do recurso
+            custo_cpu: Núcleos a reservar neste trabalho (padrão: custo do recurso)
+
+        Uso:
+            with escalonador.reservar('transcricao'):
+                ...
+        """
+        with self._cond:
+            if nome not in self._recursos:
+                self.configurar_recurso(nome, slots=1, custo_cpu=0)
+            recurso = self._recursos[nome]
+            custo = recurso['custo_cpu'] if custo_cpu is None else max(0, min(int(custo_cpu), self.orcamento_cpu))
+            pedido = {'recurso': nome, 'custo': custo}
+            self._espera.append(pedido)
+            chegada = time.monotonic()
+            try:
+                while not self._pode_executar(pedido):
+                    self._cond.wait()
+            finally:
+                self._espera.remove(pedido)
+            recurso['em_uso'] += 1
+            recurso['tempo_espera_total'] += time.monotonic() - chegada
+            self._cpu_em_uso += pedido['custo']
+
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                recurso['em_uso'] -= 1
+                recurso['concluidos'] += 1
+                recurso['tempo_execucao_total'] += time.monotonic() - inicio
+                self._cpu_em_uso -= pedido['custo']
+                self._cond.notify_all()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna ocupação de slots, fila e CPU de cada recurso"""
+        with self._cond:
+            aguardando: Dict[str, int] = {}
+            for pedido in self._espera:
+                aguardando[pedido['recurso']] = aguardando.get(pedido['recurso'], 0) + 1
+
+            return {
+                'cpu': {
+                    'orcamento': self.orcamento_cpu,
+                    'em_uso': self._cpu_em_uso,
+                },
+                'recursos': {
+                    nome: {
+                        'slots': r['slots'],
+                        'em_uso': r['em_uso'],
+                        'aguardando': aguardando.get(nome, 0),
+                        'custo_cpu': r['custo_cpu'],
+                        'concluidos': r['concluidos'],
+                        'tempo_espera_medio': round(r['tempo_espera_total'] / r['concluidos'], 3) if r['concluidos'] else 0.0,
+                        'tempo_execucao_medio': round(r['tempo_execucao_total'] / r['concluidos'], 3) if r['concluidos'] else 0.0,
+                    }
+                    for nome, r in self._recursos.items()
+                },
+            }
+
+
+# Instância global
+escalonador = Escalonador()
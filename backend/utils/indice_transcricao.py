@@ -0,0 +1,122 @@
+"""
+Índice da transcrição para a análise
+
+Construído uma vez por análise a partir dos segmentos do Whisper:
+
+- a lista ordenada dos inícios dos segmentos, para extrair a janela de um
+  bloco por busca binária em vez de percorrer todos os segmentos
+- as palavras normalizadas (minúsculas, sem acentos nem pontuação) de toda a
+  transcrição em sequência, com o segmento de cada uma, e um índice de
+  trigramas de palavras -> posições, para localizar as citações da IA sem
+  varrer o texto inteiro (e de palavra -> posições, usado pelo alinhamento
+  aproximado em utils/alinhamento.py)
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Palavras por n-grama do índice de texto
+TAMANHO_NGRAMA = 3
+
+# Texto que termina uma frase (pontuação final, talvez seguida de aspas ou parênteses)
+FIM_DE_FRASE = re.compile(r'[.!?…]["\')\]]*\s*$')
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos e sem pontuação"""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', texto))
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Palavras normalizadas do texto"""
+    return normalizar_texto(texto).split()
+
+
+class IndiceTranscricao:
+    """Busca por tempo e por texto sobre os segmentos de uma transcrição"""
+
+    def __init__(self, segmentos: List[Dict[str, Any]]):
+        """
+        Args:
+            segmentos: Segmentos da transcrição ({'inicio', 'fim', 'texto'})
+        """
+        self.segmentos = sorted(segmentos, key=lambda seg: (seg['inicio'], seg['fim']))
+        self.inicios = [float(seg['inicio']) for seg in self.segmentos]
+
+        self.palavras: List[str] = []
+        self.segmento_da_palavra: List[int] = []
+        for posicao, seg in enumerate(self.segmentos):
+            tokens = tokenizar(seg['texto'])
+            self.palavras.extend(tokens)
+            self.segmento_da_palavra.extend([posicao] * len(tokens))
+
+        self.ngramas: Dict[Tuple[str, ...], List[int]] = {}
+        for i in range(len(self.palavras) - TAMANHO_NGRAMA + 1):
+            self.ngramas.setdefault(tuple(self.palavras[i:i + TAMANHO_NGRAMA]), []).append(i)
+
+        self.posicoes_palavra: Dict[str, List[int]] = {}
+        for i, palavra in enumerate(self.palavras):
+            self.posicoes_palavra.setdefault(palavra, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.segmentos)
+
+    # ------------------------------
+    # BUSCA POR TEMPO
+    # ------------------------------
+    def janela(self, inicio: float, fim: float) -> List[Dict[str, Any]]:
+        """Segmentos que começam em `inicio` ou depois e terminam até `fim`"""
+        a = bisect_left(self.inicios, inicio)
+        b = bisect_right(self.inicios, fim)
+        return [seg for seg in self.segmentos[a:b] if seg['fim'] <= fim]
+
+    def texto_janela(self, inicio: float, fim: float) -> str:
+        """Texto corrido dos segmentos da janela"""
+        return ''.join(f"{seg['texto']} " for seg in self.janela(inicio, fim))
+
+    def posicao_no_tempo(self, tempo: float) -> int:
+        """Posição do primeiro segmento que começa em `tempo` ou depois"""
+        return bisect_left(self.inicios, tempo)
+
+    def inicia_frase(self, posicao: int) -> bool:
+        """Se o segmento na posição começa uma frase (o anterior termina em pontuação final)"""
+        if posicao <= 0:
+            return True
+        return bool(FIM_DE_FRASE.search(self.segmentos[posicao - 1]['texto']))
+
+    # ------------------------------
+    # BUSCA POR TEXTO
+    # ------------------------------
+    def _ocorrencias(self, tokens: List[str]) -> List[int]:
+        """Posições (em self.palavras) onde a sequência de palavras aparece, em ordem"""
+        if not tokens:
+            return []
+        if len(tokens) >= TAMANHO_NGRAMA:
+            candidatas = self.ngramas.get(tuple(tokens[:TAMANHO_NGRAMA]), [])
+        else:
+            candidatas = self.posicoes_palavra.get(tokens[0], [])
+        n = len(tokens)
+        return [i for i in candidatas if self.palavras[i:i + n] == tokens]
+
+    def buscar_citacao(self, texto: str, a_partir_de: float = 0.0) -> Optional[Tuple[int, int]]:
+        """
+        Localiza a primeira ocorrência da citação em segmentos que começam em `a_partir_de` ou depois
+
+        A citação pode atravessar segmentos vizinhos.
+
+        Returns:
+            Tupla (posição do segmento da primeira palavra, posição do segmento
+            da última palavra) ou None
+        """
+        tokens = tokenizar(texto)
+        primeira_valida = self.posicao_no_tempo(a_partir_de)
+        for i in self._ocorrencias(tokens):
+            seg_inicio = self.segmento_da_palavra[i]
+            if seg_inicio >= primeira_valida:
+                return seg_inicio, self.segmento_da_palavra[i + len(tokens) - 1]
+        return None
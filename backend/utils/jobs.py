@@ -0,0 +1,251 @@
+"""
+Fila de jobs em segundo plano para o pipeline de processamento de vídeos
+
+Cada job percorre uma sequência de etapas (info -> áudio -> transcrição ->
+análise -> shorts). Cada etapa tem sua própria fila e seu próprio conjunto de
+workers, de forma que vários vídeos podem avançar em paralelo com concorrência
+limitada por etapa, sem prender as threads de requisição do Flask.
+"""
+
+import queue
+import threading
+import traceback
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Estados possíveis de um job e de cada etapa
+ESTADO_NA_FILA = 'na_fila'
+ESTADO_EXECUTANDO = 'executando'
+ESTADO_CONCLUIDO = 'concluido'
+ESTADO_ERRO = 'erro'
+ESTADO_IGNORADO = 'ignorado'
+
+
+class Job:
+    """Representa um vídeo sendo processado pelo pipeline"""
+
+    def __init__(self, etapas: List[str], dados: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.dados = dict(dados)
+        self.resultado: Dict[str, Any] = {}
+        self.estado = ESTADO_NA_FILA
+        self.erro: Optional[str] = None
+        self.chave: Optional[str] = None
+        self.etapa_atual: Optional[str] = None
+        self.criado_em = datetime.now().isoformat()
+        self.atualizado_em = self.criado_em
+        self.etapas: Dict[str, Dict[str, Any]] = {
+            nome: {'estado': ESTADO_NA_FILA, 'inicio': None, 'fim': None, 'erro': None, 'progresso': 0.0}
+            for nome in etapas
+        }
+        self._lock = threading.Lock()
+
+    def atualizar_progresso(self, progresso: float, mensagem: Optional[str] = None,
+                            detalhes: Optional[Any] = None):
+        """Atualiza o progresso (0 a 1) da etapa em execução (detalhes: ex. progresso por short)"""
+        with self._lock:
+            if self.etapa_atual:
+                etapa = self.etapas[self.etapa_atual]
+                etapa['progresso'] = max(0.0, min(1.0, float(progresso)))
+                if mensagem is not None:
+                    etapa['mensagem'] = mensagem
+                if detalhes is not None:
+                    etapa['detalhes'] = detalhes
+            self.atualizado_em = datetime.now().isoformat()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna uma cópia serializável do job"""
+        with self._lock:
+            total = len(self.etapas) or 1
+            progresso = sum(
+                1.0 if e['estado'] in (ESTADO_CONCLUIDO, ESTADO_IGNORADO) else e.get('progresso', 0.0)
+                for e in self.etapas.values()
+            ) / total
+            return {
+                'job_id': self.id,
+                'estado': self.estado,
+                'etapa_atual': self.etapa_atual,
+                'progresso': round(progresso, 4),
+                'erro': self.erro,
+                'video_id': self.dados.get('video_id'),
+                'url': self.dados.get('url'),
+                'etapas': {nome: dict(e) for nome, e in self.etapas.items()},
+                'resultado': dict(self.resultado),
+                'criado_em': self.criado_em,
+                'atualizado_em': self.atualizado_em,
+            }
+
+
+class FilaJobs:
+    """Gerencia os jobs e os workers de cada etapa do pipeline"""
+
+    def __init__(self, max_jobs_historico: int = 500):
+        """
+        Inicializa a fila de jobs
+
+        Args:
+            max_jobs_historico: Quantidade máxima de jobs finalizados mantidos em memória
+        """
+        self.max_jobs_historico = max_jobs_historico
+        self._etapas: List[Dict[str, Any]] = []
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._iniciado = False
+
+    def registrar_etapa(self, nome: str, funcao: Callable[[Job], Any], concorrencia: int = 1):
+        """
+        Registra uma etapa do pipeline, na ordem de execução
+
+        Args:
+            nome: Nome da etapa (ex: audio, transcricao)
+            funcao: Função que recebe o Job e executa a etapa. Pode retornar False
+                para indicar que a etapa foi ignorada.
+            concorrencia: Quantidade de workers dedicados a essa etapa
+        """
+        if self._iniciado:
+            raise RuntimeError("Não é possível registrar etapas após iniciar os workers")
+        self._etapas.append({
+            'nome': nome,
+            'funcao': funcao,
+            'concorrencia': max(1, int(concorrencia)),
+            'fila': queue.Queue(),
+        })
+
+    def _iniciar_workers(self):
+        """Cria as threads de cada etapa (apenas na primeira submissão)"""
+        with self._lock:
+            if self._iniciado:
+                return
+            for indice, etapa in enumerate(self._etapas):
+                for n in range(etapa['concorrencia']):
+                    thread = threading.Thread(
+                        target=self._loop_worker,
+                        args=(indice,),
+                        name=f"job-{etapa['nome']}-{n}",
+                        daemon=True
+                    )
+                    thread.start()
+            self._iniciado = True
+
+    def submeter(self, dados: Dict[str, Any], chave: Optional[str] = None) -> Job:
+        """
+        Cria um job e o coloca na fila da primeira etapa
+
+        Args:
+            dados: Contexto inicial do job (url, video_id, opções)
+            chave: Identificador opcional (ex: video_id). Se já existir um job
+                ativo com a mesma chave, ele é retornado em vez de criar outro.
+
+        Returns:
+            O Job criado (ou o job ativo já existente)
+        """
+        if not self._etapas:
+            raise RuntimeError("Nenhuma etapa registrada na fila de jobs")
+
+        self._iniciar_workers()
+        with self._lock:
+            if chave:
+                for existente in self._jobs.values():
+                    if existente.chave == chave and existente.estado not in (ESTADO_CONCLUIDO, ESTADO_ERRO):
+                        return existente
+            job = Job([e['nome'] for e in self._etapas], dados)
+            job.chave = chave
+            self._jobs[job.id] = job
+            self._limpar_historico()
+        self._etapas[0]['fila'].put(job)
+        return job
+
+    def obter(self, job_id: str) -> Optional[Job]:
+        """Obtém um job pelo ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def listar(self) -> List[Dict[str, Any]]:
+        """Lista todos os jobs conhecidos (mais recentes primeiro)"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted((j.to_dict() for j in jobs), key=lambda j: j['criado_em'], reverse=True)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna, por etapa, a quantidade de workers, de jobs na fila e em execução"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        executando: Dict[str, int] = {}
+        for job in jobs:
+            if job.estado == ESTADO_EXECUTANDO and job.etapa_atual:
+                executando[job.etapa_atual] = executando.get(job.etapa_atual, 0) + 1
+
+        return {
+            etapa['nome']: {
+                'workers': etapa['concorrencia'],
+                'na_fila': etapa['fila'].qsize(),
+                'executando': executando.get(etapa['nome'], 0),
+            }
+            for etapa in self._etapas
+        }
+
+    def _limpar_historico(self):
+        """Descarta os jobs finalizados mais antigos acima do limite"""
+        finalizados = [
+            j for j in self._jobs.values()
+            if j.estado in (ESTADO_CONCLUIDO, ESTADO_ERRO)
+        ]
+        excesso = len(finalizados) - self.max_jobs_historico
+        if excesso > 0:
+            finalizados.sort(key=lambda j: j.atualizado_em)
+            for job in finalizados[:excesso]:
+                self._jobs.pop(job.id, None)
+
+    def _loop_worker(self, indice_etapa: int):
+        """Consome a fila de uma etapa e encaminha o job para a próxima"""
+        etapa = self._etapas[indice_etapa]
+        nome = etapa['nome']
+
+        while True:
+            job = etapa['fila'].get()
+            try:
+                with job._lock:
+                    job.estado = ESTADO_EXECUTANDO
+                    job.etapa_atual = nome
+                    job.etapas[nome]['estado'] = ESTADO_EXECUTANDO
+                    job.etapas[nome]['inicio'] = datetime.now().isoformat()
+                    job.atualizado_em = job.etapas[nome]['inicio']
+
+                print(f"[JOBS] Job {job.id[:8]} -> etapa '{nome}'")
+                resultado = etapa['funcao'](job)
+
+                with job._lock:
+                    estado_etapa = ESTADO_IGNORADO if resultado is False else ESTADO_CONCLUIDO
+                    job.etapas[nome]['estado'] = estado_etapa
+                    job.etapas[nome]['progresso'] = 1.0
+                    job.etapas[nome]['fim'] = datetime.now().isoformat()
+                    job.atualizado_em = job.etapas[nome]['fim']
+
+                if indice_etapa + 1 < len(self._etapas):
+                    with job._lock:
+                        job.estado = ESTADO_NA_FILA
+                        job.etapa_atual = None
+                    self._etapas[indice_etapa + 1]['fila'].put(job)
+                else:
+                    with job._lock:
+                        job.estado = ESTADO_CONCLUIDO
+                        job.etapa_atual = None
+                    print(f"[JOBS] Job {job.id[:8]} concluído")
+            except Exception as e:
+                traceback.print_exc()
+                with job._lock:
+                    job.estado = ESTADO_ERRO
+                    job.erro = str(e)
+                    job.etapas[nome]['estado'] = ESTADO_ERRO
+                    job.etapas[nome]['erro'] = str(e)
+                    job.etapas[nome]['fim'] = datetime.now().isoformat()
+                    job.atualizado_em = job.etapas[nome]['fim']
+                print(f"[JOBS] Job {job.id[:8]} falhou na etapa '{nome}': {e}")
+            finally:
+                etapa['fila'].task_done()
+
+
+# Instância global
+fila_jobs = FilaJobs()
@@ -0,0 +1,198 @@
+"""
+Geração de legendas ASS para os shorts
+
+As legendas de cada short (e a marca d'água) são gravadas em um arquivo ASS e
+queimadas no vídeo com um único filtro `ass`, em vez de um `drawtext` por
+frase. O libass só renderiza os eventos ativos em cada quadro e o texto não
+precisa ser escapado para a sintaxe de filtros do ffmpeg.
+
+Quando a transcrição guarda o tempo de cada palavra, as frases são quebradas
+em linhas curtas e cada palavra é destacada no momento em que é falada
+(efeito karaokê com a tag `\k` do ASS).
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.palavras import palavras_no_intervalo
+
+
+# Resolução de referência das legendas (igual à saída 9:16; o libass escala se for outra)
+LARGURA_REFERENCIA = 1080
+ALTURA_REFERENCIA = 1920
+
+MARCA_DAGUA = os.environ.get("SHORTS_MARCA_DAGUA", "@CortesdoReinodeDeus")
+FONTE_LEGENDA = os.environ.get("SHORTS_FONTE", "Sans")
+
+# Duração do fade de entrada/saída de cada frase, em ms
+FADE_MS = 250
+
+# Legendas karaokê (quando há tempo por palavra): palavras por linha e pausa que força nova linha
+KARAOKE = os.environ.get("SHORTS_KARAOKE", "1").lower() not in ("0", "false", "nao")
+PALAVRAS_POR_LINHA = max(1, int(os.environ.get("SHORTS_PALAVRAS_POR_LINHA", 4)))
+PAUSA_NOVA_LINHA = 0.8
+
+CABECALHO_ASS = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {largura}
+PlayResY: {altura}
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Legenda,{fonte},60,&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,8,60,60,0,1
+Style: Karaoke,{fonte},72,&H0000FFFF,&H00FFFFFF,&H00000000,&H00000000,-1,0,0,0,100,100,0,0,1,3,0,8,60,60,0,1
+Style: MarcaDagua,{fonte},42,&H8CFFFFFF,&H8CFFFFFF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,8,60,60,0,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def _tempo_ass(segundos: float) -> str:
+    """Formata o tempo no padrão ASS (H:MM:SS.cc)"""
+    centesimos = int(round(max(0.0, segundos) * 100))
+    horas, centesimos = divmod(centesimos, 360000)
+    minutos, centesimos = divmod(centesimos, 6000)
+    segs, centesimos = divmod(centesimos, 100)
+    return f"{horas}:{minutos:02d}:{segs:02d}.{centesimos:02d}"
+
+
+def _texto_ass(texto: str) -> str:
+    """Neutraliza os caracteres que o ASS interpretaria como comandos"""
+    return (
+        texto.replace("\\", "/")
+             .replace("{", "(")
+             .replace("}", ")")
+             .replace("\r", " ")
+             .replace("\n", " ")
+             .strip()
+    )
+
+
+def eventos_legenda(segmentos: List[Dict[str, Any]], inicio_segundos: float,
+                    fim_segundos: float, duracao: float) -> List[Tuple[float, float, str]]:
+    """
+    Seleciona as frases da transcrição que aparecem no short
+
+    Returns:
+        Lista de (inicio, fim, texto) com tempos relativos ao início do short
+    """
+    eventos = []
+    for seg in segmentos:
+        if seg["fim"] >= inicio_segundos and seg["inicio"] <= fim_segundos:
+            frase = seg["texto"].strip()
+            if not frase:
+                continue
+            inicio_rel = max(float(seg["inicio"]) - inicio_segundos, 0)
+            fim_rel = min(float(seg["fim"]) - inicio_segundos, duracao)
+            if fim_rel > inicio_rel:
+                eventos.append((inicio_rel, fim_rel, frase))
+    return eventos
+
+
+def eventos_karaoke(palavras: Optional[Dict[str, list]], inicio_segundos: float, fim_segundos: float,
+                    duracao: float) -> List[Tuple[float, float, List[Tuple[float, float, str]]]]:
+    """
+    Agrupa as palavras do short em linhas curtas para o efeito karaokê
+
+    Uma linha termina ao atingir PALAVRAS_POR_LINHA ou quando há uma pausa
+    maior que PAUSA_NOVA_LINHA antes da próxima palavra.
+
+    Returns:
+        Lista de (inicio, fim, palavras) com palavras = [(inicio, fim, texto)],
+        todos os tempos relativos ao início do short
+    """
+    linhas = []
+    atual = []
+    for inicio, fim, texto in palavras_no_intervalo(palavras, inicio_segundos, fim_segundos):
+        inicio_rel = max(inicio - inicio_segundos, 0)
+        fim_rel = min(fim - inicio_segundos, duracao)
+        if fim_rel <= inicio_rel:
+            continue
+        if atual and (len(atual) >= PALAVRAS_POR_LINHA or inicio_rel - atual[-1][1] > PAUSA_NOVA_LINHA):
+            linhas.append(atual)
+            atual = []
+        atual.append((inicio_rel, fim_rel, texto))
+    if atual:
+        linhas.append(atual)
+
+    eventos = []
+    for i, linha in enumerate(linhas):
+        fim_linha = linha[-1][1]
+        # Emenda com a linha seguinte se a pausa for curta, evitando piscar
+        if i + 1 < len(linhas) and linhas[i + 1][0][0] - fim_linha <= PAUSA_NOVA_LINHA:
+            fim_linha = linhas[i + 1][0][0]
+        eventos.append((linha[0][0], fim_linha, linha))
+    return eventos
+
+
+def _texto_karaoke(inicio_linha: float, palavras: List[Tuple[float, float, str]]) -> str:
+    """Texto ASS com uma tag \\k por palavra (e pelas pausas entre elas)"""
+    partes = []
+    cursor = int(round(inicio_linha * 100))
+    for inicio, fim, texto in palavras:
+        inicio_cs = max(int(round(inicio * 100)), cursor)
+        fim_cs = max(int(round(fim * 100)), inicio_cs)
+        if inicio_cs > cursor:
+            partes.append(f"{{\\k{inicio_cs - cursor}}}")
+        partes.append(f"{{\\k{fim_cs - inicio_cs}}}{_texto_ass(texto)} ")
+        cursor = fim_cs
+    return ''.join(partes).rstrip()
+
+
+def gerar_ass(eventos: List[Tuple[float, float, str]], duracao: float, caminho: str,
+              marca_dagua: str = MARCA_DAGUA,
+              karaoke: List[Tuple[float, float, List[Tuple[float, float, str]]]] = None) -> str:
+    """
+    Grava o arquivo ASS com as frases (fade de entrada/saída) e a marca d'água
+
+    Se `karaoke` tiver linhas (ver eventos_karaoke), elas substituem as frases.
+
+    Posições equivalentes às do antigo drawtext: legenda a 350 px e marca
+    d'água a 470 px da base do vídeo.
+
+    Returns:
+        Caminho do arquivo gerado
+    """
+    y_legenda = ALTURA_REFERENCIA - 350
+    y_marca = ALTURA_REFERENCIA - 470
+    centro = LARGURA_REFERENCIA // 2
+
+    linhas = [CABECALHO_ASS.format(largura=LARGURA_REFERENCIA, altura=ALTURA_REFERENCIA, fonte=FONTE_LEGENDA)]
+    if marca_dagua:
+        linhas.append(
+            f"Dialogue: 0,{_tempo_ass(0)},{_tempo_ass(duracao)},MarcaDagua,,0,0,0,,"
+            f"{{\\pos({centro},{y_marca})}}{_texto_ass(marca_dagua)}\n"
+        )
+    if karaoke:
+        for inicio, fim, palavras in karaoke:
+            linhas.append(
+                f"Dialogue: 1,{_tempo_ass(inicio)},{_tempo_ass(fim)},Karaoke,,0,0,0,,"
+                f"{{\\pos({centro},{y_legenda})}}{_texto_karaoke(inicio, palavras)}\n"
+            )
+    else:
+        for inicio, fim, texto in eventos:
+            linhas.append(
+                f"Dialogue: 1,{_tempo_ass(inicio)},{_tempo_ass(fim)},Legenda,,0,0,0,,"
+                f"{{\\pos({centro},{y_legenda})\\fad({FADE_MS},{FADE_MS})}}{_texto_ass(texto)}\n"
+            )
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.writelines(linhas)
+    return caminho
+
+
+def _escapar(texto: str, especiais: str) -> str:
+    return ''.join('\\' + c if c in especiais else c for c in texto)
+
+
+def filtro_ass(caminho: str) -> str:
+    """
+    Filtro ffmpeg que queima o arquivo ASS
+
+    O caminho é escapado nos dois níveis do ffmpeg: valor da opção e filtergraph.
+    """
+    valor = _escapar(caminho, "\\':")
+    return "ass=" + _escapar(valor, "\\'[],;")
@@ -0,0 +1,288 @@
+"""
+Aquisição de mídia: baixa o vídeo uma única vez e deriva o áudio localmente
+
+O vídeo-fonte (usado para cortar os shorts) é baixado pelo yt-dlp e guardado
+no cache de mídia. O áudio para o Whisper é extraído desse mesmo arquivo com
+o ffmpeg, já em 16 kHz mono PCM: sem um segundo download e sem a
+recodificação para MP3, que o Whisper desfaria de qualquer forma. Se o vídeo
+completo não está em cache e os shorts usam trechos, só a trilha de áudio é
+baixada para a transcrição.
+
+Para cortar um short sem o vídeo completo em cache, apenas o trecho
+necessário é baixado (`--download-sections` do yt-dlp, com keyframes
+forçados nos cortes para que o arquivo comece exatamente no tempo pedido),
+com uma margem que permite ajustar o intervalo do short sem novo download.
+Os trechos ficam no cache com o intervalo no tipo (ex: `trecho:93000-161000`)
+e pedidos que se sobrepõem a trechos já baixados geram um único trecho com a
+união dos intervalos.
+"""
+
+import os
+import shutil
+import re
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.cache_midia import cache_midia, validar_midia
+from utils.escalonador import escalonador
+
+
+# Formato do vídeo-fonte (arquivo único com áudio e vídeo)
+FORMATO_VIDEO = "best[height<=1080]"
+
+# Formato baixado só para a transcrição quando os shorts usam trechos
+FORMATO_AUDIO = "bestaudio/best"
+
+# Áudio entregue ao Whisper
+TAXA_AMOSTRAGEM_AUDIO = 16000
+
+# Onde o vídeo completo era guardado antes do cache de mídia
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+VIDEO_LEGADO_TEMPLATE = os.path.join(UPLOAD_DIR, "shorts", "{video_id}_temp.mp4")
+
+# Baixar só os trechos dos shorts quando o vídeo completo não está em cache
+DOWNLOAD_TRECHOS = os.environ.get("MIDIA_DOWNLOAD_TRECHOS", "1").lower() not in ("0", "false", "nao")
+
+# Margem (s) antes e depois de cada trecho: pequenos ajustes no intervalo do
+# short continuam dentro do trecho já baixado
+MARGEM_TRECHO = float(os.environ.get("MIDIA_TRECHO_MARGEM", 10))
+
+TIPO_TRECHO_REGEX = re.compile(r'^trecho:(\d+)-(\d+)$')
+
+
+def obter_comando_ytdlp() -> Optional[List[str]]:
+    """Comando disponível para executar o yt-dlp"""
+    if shutil.which("yt-dlp"):
+        return ["yt-dlp"]
+    if shutil.which("python"):
+        return ["python", "-m", "yt_dlp"]
+    if shutil.which("python3"):
+        return ["python3", "-m", "yt_dlp"]
+    return None
+
+
+def _baixar_video(url: str, destino: str, secao: Tuple[float, float] = None,
+                  formato: str = FORMATO_VIDEO) -> str:
+    """Baixa o vídeo-fonte (ou só o trecho `secao`, em segundos) para o caminho temporário do cache"""
+    comando_base = obter_comando_ytdlp()
+    if not comando_base:
+        raise RuntimeError('yt-dlp não encontrado. Instale com: pip install yt-dlp')
+
+    opcoes_secao = []
+    if secao:
+        # Sem keyframe no corte, o arquivo começaria no keyframe anterior e os
+        # tempos do trecho ficariam deslocados em relação ao vídeo
+        opcoes_secao = [
+            "--download-sections", f"*{secao[0]:.3f}-{secao[1]:.3f}",
+            "--force-keyframes-at-cuts",
+        ]
+
+    # Downloads não consomem o orçamento de CPU, mas têm limite de slots; forçar
+    # keyframes recodifica o trecho com o ffmpeg, então ele disputa a CPU como encode
+    with escalonador.reservar('encode' if secao else 'download'):
+        resultado = subprocess.run(
+            comando_base + [
+                "-f", formato,
+                *opcoes_secao,
+                "--output", destino,
+                "--quiet",
+                "--no-warnings",
+                url
+            ],
+            capture_output=True, text=True, timeout=1800
+        )
+    if resultado.returncode != 0:
+        print('YT-DLP STDERR:', resultado.stderr)
+        raise RuntimeError(resultado.stderr.strip() or 'Erro ao baixar vídeo')
+    return destino
+
+
+def obter_video_fonte(video_id: str, url: str) -> str:
+    """
+    Retorna o vídeo-fonte do cache, baixando-o uma única vez se necessário
+
+    Raises:
+        RuntimeError: Se o download falhar
+    """
+    caminho = cache_midia.obter(video_id, 'video')
+    if caminho:
+        return caminho
+
+    # Vídeos baixados antes do cache são adotados se estiverem íntegros
+    caminho_legado = VIDEO_LEGADO_TEMPLATE.format(video_id=video_id)
+    if os.path.exists(caminho_legado) and validar_midia(caminho_legado):
+        return cache_midia.publicar(video_id, 'video', caminho_legado, 'mp4')
+
+    caminho = cache_midia.obter_ou_criar(
+        video_id, 'video', 'mp4',
+        lambda destino: _baixar_video(url, destino)
+    )
+    # Com o vídeo completo, os trechos baixados antes não são mais necessários
+    for inicio, fim, tipo in _trechos_em_cache(video_id):
+        cache_midia.remover(video_id, tipo)
+    return caminho
+
+
+def _tipo_trecho(inicio: float, fim: float) -> str:
+    return f"trecho:{int(round(inicio * 1000))}-{int(round(fim * 1000))}"
+
+
+def _trechos_em_cache(video_id: str) -> List[Tuple[float, float, str]]:
+    """Trechos do vídeo presentes no cache, como (inicio, fim, tipo)"""
+    trechos = []
+    for entrada in cache_midia.listar(video_id):
+        encontrado = TIPO_TRECHO_REGEX.match(entrada['tipo'])
+        if encontrado:
+            trechos.append((int(encontrado.group(1)) / 1000, int(encontrado.group(2)) / 1000, entrada['tipo']))
+    return sorted(trechos)
+
+
+def obter_fonte_trecho(video_id: str, url: str, inicio: float, fim: float) -> Dict[str, Any]:
+    """
+    Retorna um arquivo local que cobre [inicio, fim] do vídeo
+
+    Usa o vídeo completo se ele estiver em cache (ou se o modo de trechos
+    estiver desligado); senão um trecho em cache que cubra o intervalo; senão
+    baixa o intervalo com margem, unido aos trechos em cache que o tocam.
+
+    Returns:
+        Dicionário com 'caminho', 'deslocamento' (tempo do vídeo, em segundos,
+        do início do arquivo) e 'tipo' (para cache_midia.reter)
+
+    Raises:
+        RuntimeError: Se o download falhar
+    """
+    caminho = cache_midia.obter(video_id, 'video')
+    if caminho or not DOWNLOAD_TRECHOS or os.path.exists(VIDEO_LEGADO_TEMPLATE.format(video_id=video_id)):
+        return {'caminho': caminho or obter_video_fonte(video_id, url), 'deslocamento': 0.0, 'tipo': 'video'}
+
+    trechos = _trechos_em_cache(video_id)
+    for ini_trecho, fim_trecho, tipo in trechos:
+        if ini_trecho <= inicio and fim_trecho >= fim:
+            caminho = cache_midia.obter(video_id, tipo)
+            if caminho:
+                return {'caminho': caminho, 'deslocamento': ini_trecho, 'tipo': tipo}
+
+    # União com os trechos que se sobrepõem (ou encostam) ao intervalo pedido
+    ini_novo = max(0.0, inicio - MARGEM_TRECHO)
+    fim_novo = fim + MARGEM_TRECHO
+    substituidos = []
+    for ini_trecho, fim_trecho, tipo in trechos:
+        if ini_trecho <= fim_novo and fim_trecho >= ini_novo:
+            ini_novo = min(ini_novo, ini_trecho)
+            fim_novo = max(fim_novo, fim_trecho)
+            substituidos.append(tipo)
+
+    tipo = _tipo_trecho(ini_novo, fim_novo)
+    print(f"[MIDIA] Baixando trecho {ini_novo:.1f}s-{fim_novo:.1f}s de {video_id}"
+          + (f" (unindo {len(substituidos)} trechos)" if substituidos else ""))
+    caminho = cache_midia.obter_ou_criar(
+        video_id, tipo, 'mp4',
+        lambda destino: _baixar_video(url, destino, secao=(ini_novo, fim_novo))
+    )
+    for antigo in substituidos:
+        if antigo != tipo:
+            cache_midia.remover(video_id, antigo)
+    return {'caminho': caminho, 'deslocamento': ini_novo, 'tipo': tipo}
+
+
+def keyframe_anterior(caminho_video: str, tempo: float, janela: float = 20.0) -> float:
+    """
+    Tempo do último keyframe de vídeo em ou antes de `tempo` (para cortes sem recodificação)
+
+    Procura apenas na janela de `janela` segundos antes do tempo; se não houver
+    keyframe ali (ou o ffprobe não estiver disponível), devolve o próprio tempo.
+    """
+    if not shutil.which("ffprobe"):
+        return tempo
+    resultado = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-skip_frame", "nokey",
+            "-read_intervals", f"{max(0.0, tempo - janela):.3f}%{tempo + 0.05:.3f}",
+            "-show_entries", "frame=best_effort_timestamp_time",
+            "-of", "csv=p=0",
+            caminho_video
+        ],
+        capture_output=True, text=True, timeout=120
+    )
+    tempos = []
+    for linha in resultado.stdout.splitlines():
+        try:
+            tempos.append(float(linha.strip().strip(',')))
+        except ValueError:
+            continue
+    anteriores = [t for t in tempos if t <= tempo + 0.001]
+    return max(anteriores) if anteriores else tempo
+
+
+def tem_audio(caminho_video: str) -> bool:
+    """Se o arquivo tem trilha de áudio (sem o ffprobe disponível, supõe que sim)"""
+    if not shutil.which("ffprobe"):
+        return True
+    resultado = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=index",
+         "-of", "csv=p=0", caminho_video],
+        capture_output=True, text=True, timeout=60
+    )
+    return resultado.returncode != 0 or bool(resultado.stdout.strip())
+
+
+def extrair_audio(caminho_video: str, destino: str) -> str:
+    """
+    Extrai o áudio do vídeo em WAV 16 kHz mono (PCM, sem perda adicional)
+
+    Raises:
+        RuntimeError: Se o ffmpeg falhar ou não estiver instalado
+    """
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError('ffmpeg não encontrado. Instale o ffmpeg para extrair o áudio.')
+
+    comando = [
+        "ffmpeg",
+        "-i", caminho_video,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(TAXA_AMOSTRAGEM_AUDIO),
+        "-c:a", "pcm_s16le",
+        "-y",
+        destino
+    ]
+    # Decodificar só a trilha de áudio é leve: um núcleo basta
+    with escalonador.reservar('encode', custo_cpu=1):
+        resultado = subprocess.run(comando, capture_output=True, text=True, timeout=1800)
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip() or 'Erro ao extrair o áudio do vídeo')
+    return destino
+
+
+def obter_audio_whisper(video_id: str, url: str) -> str:
+    """
+    Retorna o áudio para transcrição, derivado do vídeo-fonte
+
+    Um áudio já presente no cache (inclusive MP3 de versões anteriores) é
+    reutilizado. Com o vídeo completo em cache (ou sem o modo de trechos), o
+    áudio é extraído localmente dele; senão só a trilha de áudio é baixada e
+    os shorts continuam baixando apenas os próprios trechos.
+
+    Raises:
+        RuntimeError: Se o download ou a extração falharem
+    """
+    def produzir(destino):
+        video_em_cache = cache_midia.obter(video_id, 'video') or \
+            os.path.exists(VIDEO_LEGADO_TEMPLATE.format(video_id=video_id))
+        if DOWNLOAD_TRECHOS and not video_em_cache:
+            fonte = f"{destino}.fonte"
+            try:
+                _baixar_video(url, fonte, formato=FORMATO_AUDIO)
+                return extrair_audio(fonte, destino)
+            finally:
+                if os.path.exists(fonte):
+                    os.remove(fonte)
+
+        caminho_video = obter_video_fonte(video_id, url)
+        with cache_midia.reter(video_id, 'video'):
+            return extrair_audio(caminho_video, destino)
+
+    return cache_midia.obter_ou_criar(video_id, 'audio', 'wav', produzir)
@@ -0,0 +1,212 @@
+"""
+Registro de modelos Whisper com pool de instâncias e pré-carregamento
+
+Cada perfil do registro define tamanho do modelo, dispositivo, compute_type
+(ex: int8 em CPU, float16 em GPU) e threads. Os modelos ficam em um pool de
+instâncias emprestadas por transcrição, de forma que requisições simultâneas
+não disputam um único modelo global, e podem ser carregados já na
+inicialização do servidor.
+"""
+
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from faster_whisper import WhisperModel
+
+from utils.escalonador import escalonador
+
+
+PERFIL_PADRAO = 'padrao'
+
+
+def _configuracao_padrao() -> Dict[str, Any]:
+    """Perfil padrão a partir das variáveis de ambiente"""
+    usar_cuda = bool(os.environ.get("USE_CUDA"))
+    return {
+        'tamanho': os.environ.get("WHISPER_MODELO", "small"),
+        'device': "cuda" if usar_cuda else "cpu",
+        # int8 em CPU costuma ser várias vezes mais rápido que float32
+        'compute_type': os.environ.get("WHISPER_COMPUTE_TYPE", "float16" if usar_cuda else "int8"),
+        'cpu_threads': int(os.environ.get("WHISPER_CPU_THREADS") or escalonador.custo_cpu('transcricao')),
+        'num_workers': int(os.environ.get("WHISPER_NUM_WORKERS") or 1),
+        # Uma instância por slot de transcrição do escalonador (por padrão,
+        # quantas transcrições cabem no orçamento de CPU); criadas sob demanda
+        'instancias': int(os.environ.get("WHISPER_INSTANCIAS") or escalonador.slots('transcricao')),
+    }
+
+
+class RegistroModelos:
+    """Perfis de modelos Whisper e seus pools de instâncias"""
+
+    def __init__(self):
+        self._perfis: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, tamanho: str = "small", device: str = "cpu",
+                  compute_type: str = "int8", cpu_threads: int = 4,
+                  num_workers: int = 1, instancias: int = 1):
+        """
+        Registra (ou substitui) um perfil de modelo
+
+        Args:
+            nome: Nome do perfil
+            tamanho: Tamanho/caminho do modelo (tiny, base, small, medium...)
+            device: cpu ou cuda
+            compute_type: Tipo de computação do CTranslate2 (int8, int8_float32, float16...)
+            cpu_threads: Threads de CPU por instância
+            num_workers: Workers internos do CTranslate2 por instância
+            instancias: Quantidade máxima de instâncias no pool
+        """
+        with self._lock:
+            self._perfis[nome] = {
+                'config': {
+                    'tamanho': tamanho,
+                    'device': device,
+                    'compute_type': compute_type,
+                    'cpu_threads': max(1, int(cpu_threads)),
+                    'num_workers': max(1, int(num_workers)),
+                    'instancias': max(1, int(instancias)),
+                },
+                'livres': queue.LifoQueue(),
+                'criadas': 0,
+                'em_uso': 0,
+            }
+
+    def configuracao(self, nome: str = PERFIL_PADRAO) -> Dict[str, Any]:
+        """Retorna uma cópia da configuração de um perfil"""
+        return dict(self._obter_perfil(nome)['config'])
+
+    def existe(self, nome: str) -> bool:
+        """Se o perfil está registrado"""
+        return nome in self._perfis
+
+    def _obter_perfil(self, nome: str) -> Dict[str, Any]:
+        perfil = self._perfis.get(nome)
+        if perfil is None:
+            raise ValueError(f"Perfil de modelo Whisper desconhecido: {nome}")
+        return perfil
+
+    def _carregar(self, config: Dict[str, Any]) -> WhisperModel:
+        """Carrega uma nova instância do modelo"""
+        print(f"[WHISPER] Carregando modelo '{config['tamanho']}' "
+              f"({config['device']}, {config['compute_type']}, {config['cpu_threads']} threads)")
+        return WhisperModel(
+            config['tamanho'],
+            device=config['device'],
+            compute_type=config['compute_type'],
+            cpu_threads=config['cpu_threads'],
+            num_workers=config['num_workers']
+        )
+
+    @contextmanager
+    def emprestar(self, nome: str = PERFIL_PADRAO):
+        """
+        Empresta uma instância do pool do perfil (criando se houver vaga)
+
+        Uso:
+            with registro_modelos.emprestar() as modelo:
+                segmentos, info = modelo.transcribe(...)
+        """
+        perfil = self._obter_perfil(nome)
+        modelo = None
+
+        with self._lock:
+            try:
+                modelo = perfil['livres'].get_nowait()
+            except queue.Empty:
+                if perfil['criadas'] < perfil['config']['instancias']:
+                    perfil['criadas'] += 1
+                    criar = True
+                else:
+                    criar = False
+
+        if modelo is None:
+            if criar:
+                try:
+                    modelo = self._carregar(perfil['config'])
+                except Exception:
+                    with self._lock:
+                        perfil['criadas'] -= 1
+                    raise
+            else:
+                # Pool cheio: aguarda uma instância ser devolvida
+                modelo = perfil['livres'].get()
+
+        with self._lock:
+            perfil['em_uso'] += 1
+        try:
+            yield modelo
+        finally:
+            with self._lock:
+                perfil['em_uso'] -= 1
+            perfil['livres'].put(modelo)
+
+    def precarregar(self, nomes: List[str] = None, todas_instancias: bool = False):
+        """
+        Carrega os modelos antecipadamente para a primeira transcrição não pagar o custo
+
+        Args:
+            nomes: Perfis a carregar (padrão: todos)
+            todas_instancias: Carrega o pool inteiro em vez de uma instância por perfil
+        """
+        for nome in nomes or list(self._perfis):
+            perfil = self._obter_perfil(nome)
+            alvo = perfil['config']['instancias'] if todas_instancias else 1
+            while True:
+                with self._lock:
+                    if perfil['criadas'] >= alvo:
+                        break
+                    perfil['criadas'] += 1
+                try:
+                    perfil['livres'].put(self._carregar(perfil['config']))
+                except Exception as e:
+                    with self._lock:
+                        perfil['criadas'] -= 1
+                    print(f"[WHISPER] Falha ao pré-carregar o perfil '{nome}': {e}")
+                    break
+
+    def precarregar_em_segundo_plano(self, todas_instancias: bool = False) -> threading.Thread:
+        """Executa o pré-carregamento em uma thread daemon"""
+        thread = threading.Thread(
+            target=self.precarregar,
+            kwargs={'todas_instancias': todas_instancias},
+            name="whisper-precarregar",
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Configuração e ocupação de cada perfil"""
+        with self._lock:
+            return {
+                nome: {
+                    **perfil['config'],
+                    'carregadas': perfil['criadas'],
+                    'em_uso': perfil['em_uso'],
+                }
+                for nome, perfil in self._perfis.items()
+            }
+
+
+def _criar_registro() -> RegistroModelos:
+    """Cria o registro com o perfil padrão e os perfis extras de WHISPER_PERFIS (JSON)"""
+    registro = RegistroModelos()
+    registro.registrar(PERFIL_PADRAO, **_configuracao_padrao())
+
+    extras = os.environ.get("WHISPER_PERFIS")
+    if extras:
+        try:
+            for nome, config in json.loads(extras).items():
+                registro.registrar(nome, **config)
+        except (ValueError, TypeError) as e:
+            print(f"[WHISPER] WHISPER_PERFIS inválido, ignorando: {e}")
+    return registro
+
+
+# Instância global
+registro_modelos = _criar_registro()
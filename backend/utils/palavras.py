@@ -0,0 +1,90 @@
+"""
+Marcações de tempo por palavra em formato compacto
+
+Com `word_timestamps=True` o Whisper devolve o tempo de cada palavra. Em vez
+de um dicionário por palavra (um sermão de 2 horas tem ~20 mil), as palavras
+são guardadas como listas paralelas:
+
+    {'inicio': [0.0, 0.42, ...], 'fim': [0.38, 0.9, ...], 'texto': ['Irmãos,', 'hoje', ...]}
+
+Durante a transcrição cada segmento carrega as palavras dele (assim o log
+parcial continua suficiente para retomar). Ao final elas são reunidas em um
+único conjunto de listas em `transcricao['palavras']`, em ordem cronológica,
+o que permite buscar o trecho de um short por busca binária.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def palavras_vazias() -> Dict[str, list]:
+    return {'inicio': [], 'fim': [], 'texto': []}
+
+
+def extrair_palavras(words: Optional[Iterable[Any]], deslocamento: float = 0.0) -> Optional[Dict[str, list]]:
+    """
+    Converte as palavras de um segmento do faster-whisper em listas paralelas
+
+    Args:
+        words: `segmento.words` (None quando o Whisper rodou sem word_timestamps)
+        deslocamento: Tempo (s) a somar para obter o tempo global no vídeo
+
+    Returns:
+        Listas paralelas ou None se não houver marcações por palavra
+    """
+    if words is None:
+        return None
+    palavras = palavras_vazias()
+    for palavra in words:
+        texto = palavra.word.strip()
+        if not texto:
+            continue
+        palavras['inicio'].append(round(palavra.start + deslocamento, 2))
+        palavras['fim'].append(round(palavra.end + deslocamento, 2))
+        palavras['texto'].append(texto)
+    return palavras
+
+
+def descartar_iniciais(palavras: Optional[Dict[str, list]], quantidade: int) -> Optional[Dict[str, list]]:
+    """Remove as `quantidade` primeiras palavras (emenda entre blocos)"""
+    if not palavras or quantidade <= 0:
+        return palavras
+    return {chave: valores[quantidade:] for chave, valores in palavras.items()}
+
+
+def compactar_palavras(segmentos: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, list]]]:
+    """
+    Retira as palavras de cada segmento e as reúne em listas únicas
+
+    Returns:
+        Tupla (segmentos sem a chave 'palavras', palavras ou None se nenhum
+        segmento tinha marcações por palavra)
+    """
+    limpos = []
+    palavras = None
+    for seg in segmentos:
+        if 'palavras' not in seg:
+            limpos.append(seg)
+            continue
+        if palavras is None:
+            palavras = palavras_vazias()
+        for chave in ('inicio', 'fim', 'texto'):
+            palavras[chave].extend(seg['palavras'][chave])
+        limpos.append({k: v for k, v in seg.items() if k != 'palavras'})
+    return limpos, palavras
+
+
+def palavras_no_intervalo(palavras: Optional[Dict[str, list]], inicio: float,
+                          fim: float) -> List[Tuple[float, float, str]]:
+    """
+    Palavras que começam dentro de [inicio, fim], em ordem
+
+    Returns:
+        Lista de (inicio, fim, texto) com tempos globais
+    """
+    if not palavras or not palavras.get('inicio'):
+        return []
+    inicios = palavras['inicio']
+    a = bisect_left(inicios, inicio)
+    b = bisect_right(inicios, fim)
+    return list(zip(inicios[a:b], palavras['fim'][a:b], palavras['texto'][a:b]))
@@ -0,0 +1,96 @@
+"""
+Perfis de renderização dos shorts
+
+Cada perfil define resolução, velocidade do encoder e qualidade:
+
+- preview: 540x960, o mais rápido possível e qualidade baixa, para conferir
+  cortes enquanto o intervalo é ajustado
+- final: a qualidade de sempre (1080x1920, libx264 fast)
+- arquivo: 1080x1920 lento e com qualidade alta, para guardar
+
+O encoder é escolhido por SHORTS_ENCODER (padrão libx264) e os perfis são
+traduzidos para as opções de cada encoder, de forma que o mesmo perfil
+funciona em CPU ou com encoders de hardware (NVENC, Quick Sync, VideoToolbox).
+"""
+
+import os
+from typing import Any, Dict, List
+
+
+PERFIL_RENDER_PADRAO = 'final'
+
+PERFIS_RENDER: Dict[str, Dict[str, Any]] = {
+    'preview': {'largura': 540, 'altura': 960, 'velocidade': 'rapida', 'qualidade': 'baixa', 'audio': '96k'},
+    'final': {'largura': 1080, 'altura': 1920, 'velocidade': 'normal', 'qualidade': 'normal', 'audio': '128k'},
+    'arquivo': {'largura': 1080, 'altura': 1920, 'velocidade': 'lenta', 'qualidade': 'alta', 'audio': '192k'},
+}
+
+# Opções de cada encoder por velocidade e qualidade
+ENCODERS: Dict[str, Dict[str, Any]] = {
+    'libx264': {
+        'velocidade': {'rapida': ['-preset', 'ultrafast'], 'normal': ['-preset', 'fast'], 'lenta': ['-preset', 'slow']},
+        'qualidade': {'baixa': ['-crf', '32'], 'normal': ['-crf', '23'], 'alta': ['-crf', '18']},
+        'software': True,
+    },
+    'h264_nvenc': {
+        'velocidade': {'rapida': ['-preset', 'p1'], 'normal': ['-preset', 'p4'], 'lenta': ['-preset', 'p7']},
+        'qualidade': {'baixa': ['-rc', 'vbr', '-cq', '34'], 'normal': ['-rc', 'vbr', '-cq', '25'],
+                      'alta': ['-rc', 'vbr', '-cq', '19']},
+        'software': False,
+    },
+    'h264_qsv': {
+        'velocidade': {'rapida': ['-preset', 'veryfast'], 'normal': ['-preset', 'medium'], 'lenta': ['-preset', 'veryslow']},
+        'qualidade': {'baixa': ['-global_quality', '34'], 'normal': ['-global_quality', '25'],
+                      'alta': ['-global_quality', '19']},
+        'software': False,
+    },
+    'h264_videotoolbox': {
+        'velocidade': {'rapida': ['-realtime', '1'], 'normal': [], 'lenta': []},
+        'qualidade': {'baixa': ['-q:v', '40'], 'normal': ['-q:v', '60'], 'alta': ['-q:v', '75']},
+        'software': False,
+    },
+}
+
+ENCODER_PADRAO = os.environ.get("SHORTS_ENCODER", "libx264")
+
+
+def obter_perfil_render(nome: str = None) -> Dict[str, Any]:
+    """
+    Configuração do perfil (com o nome incluído)
+
+    Raises:
+        ValueError: Se o perfil não existir
+    """
+    nome = nome or PERFIL_RENDER_PADRAO
+    if nome not in PERFIS_RENDER:
+        raise ValueError(f"Perfil de renderização desconhecido: {nome} "
+                         f"(disponíveis: {', '.join(PERFIS_RENDER)})")
+    return dict(PERFIS_RENDER[nome], nome=nome)
+
+
+def filtro_vertical(perfil: Dict[str, Any]) -> str:
+    """Escala e recorta o vídeo para 9:16 na resolução do perfil"""
+    return f"scale=-2:{perfil['altura']},crop={perfil['largura']}:{perfil['altura']}"
+
+
+def opcoes_encoder(perfil: Dict[str, Any], threads: int, encoder: str = None) -> List[str]:
+    """
+    Opções de codificação de vídeo e áudio de uma saída do ffmpeg
+
+    Args:
+        perfil: Perfil retornado por obter_perfil_render
+        threads: Threads do encoder de software (orçamento do escalonador)
+        encoder: Encoder de vídeo (padrão: SHORTS_ENCODER)
+    """
+    encoder = encoder or ENCODER_PADRAO
+    config = ENCODERS.get(encoder)
+    if not config:
+        raise ValueError(f"Encoder não suportado: {encoder} (disponíveis: {', '.join(ENCODERS)})")
+
+    opcoes = ["-c:v", encoder]
+    opcoes += config['velocidade'][perfil['velocidade']]
+    opcoes += config['qualidade'][perfil['qualidade']]
+    if config['software']:
+        opcoes += ["-threads", str(threads)]
+    opcoes += ["-c:a", "aac", "-b:a", perfil['audio']]
+    return opcoes
@@ -2,22 +2,168 @@
 Sistema de persistência local para salvar o progresso do processamento de vídeos
 """
 
+import atexit
 import json
 import os
+import pickle
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Callable
 from pathlib import Path
 
 
+# Instâncias com gravações do índice possivelmente adiadas, sincronizadas na saída
+_instancias_abertas: "weakref.WeakSet" = weakref.WeakSet()
+
+
+@atexit.register
+def _sincronizar_instancias():
+    """Grava os índices pendentes de todas as instâncias ainda vivas"""
+    for instancia in list(_instancias_abertas):
+        instancia.sincronizar_indice()
+
+
+def extrair_video_id(url: str) -> Optional[str]:
+    """Extrai o ID do vídeo de uma URL do YouTube"""
+    from urllib.parse import urlparse, parse_qs
+    
+    try:
+        parsed = urlparse(url)
+        if 'youtube.com' in parsed.netloc or 'youtu.be' in parsed.netloc:
+            if 'youtu.be' in parsed.netloc:
+                video_id = parsed.path.lstrip('/')
+            else:
+                video_id = parse_qs(parsed.query).get('v', [None])[0]
+            return video_id
+    except:
+        pass
+    return None
+
+
+def diretorio_dados_padrao(base_dir: str = None) -> Path:
+    """Diretório de dados: argumento, DADOS_DIR ou backend/dados"""
+    if base_dir:
+        return Path(base_dir)
+    env_dir = os.environ.get("DADOS_DIR")
+    if env_dir:
+        return Path(env_dir)
+    return Path(__file__).resolve().parent.parent / "dados"
+
+
+# Critérios de ordenação aceitos na listagem da biblioteca
+ORDENACOES_BIBLIOTECA = {
+    'ultima_atualizacao': lambda v: v.get('ultima_atualizacao') or '',
+    'titulo': lambda v: (v.get('titulo') or '').casefold(),
+    'duracao': lambda v: v.get('duracao_segundos') or 0,
+    'sugestoes': lambda v: v.get('contagens', {}).get('sugestoes', 0),
+    'shorts': lambda v: v.get('contagens', {}).get('shorts', 0),
+}
+
+
+def resumir_video(dados: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resumo do vídeo guardado no índice (título, thumbnail, etapas e contagens)
+
+    É recalculado a cada gravação para que a biblioteca seja listada sem abrir
+    o documento completo de cada vídeo.
+    """
+    info_video = dados.get('info_video') or {}
+    audio = dados.get('audio') or {}
+    transcricao = dados.get('transcricao') or {}
+    analise = dados.get('analise') or {}
+
+    return {
+        'titulo': info_video.get('titulo', 'Sem título'),
+        'thumbnail': info_video.get('url_thumbnail', ''),
+        'duracao_segundos': info_video.get('duracao_segundos'),
+        'estado': {
+            'info_video': 'info_video' in dados,
+            'audio': bool(audio.get('caminho_arquivo')),
+            'transcricao': bool(transcricao.get('texto')),
+            'analise': bool(analise.get('sugestoes')),
+            'shorts': bool(dados.get('shorts_baixados'))
+        },
+        'contagens': {
+            'segmentos': len(transcricao.get('segmentos') or []),
+            'sugestoes': len(analise.get('sugestoes') or []),
+            'shorts': len(dados.get('shorts_baixados') or []),
+        },
+    }
+
+
+def resumo_desatualizado(resumo: Dict[str, Any]) -> bool:
+    """Se o resumo precisa ser refeito (índice antigo sem estado, ou estado.shorts errado)"""
+    estado = resumo.get('estado')
+    if estado is None:
+        return True
+    return estado.get('shorts') != bool((resumo.get('contagens') or {}).get('shorts'))
+
+
+def consultar_resumos(videos: List[Dict[str, Any]], pagina: int = 1, por_pagina: int = None,
+                      ordenar: str = 'ultima_atualizacao', decrescente: bool = True,
+                      busca: str = None, concluida: str = None, pendente: str = None) -> Dict[str, Any]:
+    """
+    Filtra, ordena e pagina os resumos da biblioteca
+
+    Args:
+        videos: Resumos retornados por listar_videos()
+        pagina: Página desejada (começando em 1)
+        por_pagina: Itens por página (None retorna todos)
+        ordenar: Critério de ORDENACOES_BIBLIOTECA
+        decrescente: Ordem decrescente
+        busca: Trecho procurado no título
+        concluida: Etapa que precisa estar concluída (ex: analise)
+        pendente: Etapa que ainda não pode estar concluída
+
+    Returns:
+        Dicionário com videos, total, pagina, por_pagina e paginas
+    """
+    if ordenar not in ORDENACOES_BIBLIOTECA:
+        raise ValueError(f"Ordenação inválida: {ordenar}")
+
+    if busca:
+        termo = busca.casefold()
+        videos = [v for v in videos if termo in (v.get('titulo') or '').casefold()]
+    if concluida:
+        videos = [v for v in videos if v.get('estado', {}).get(concluida)]
+    if pendente:
+        videos = [v for v in videos if not v.get('estado', {}).get(pendente)]
+
+    videos = sorted(videos, key=ORDENACOES_BIBLIOTECA[ordenar], reverse=decrescente)
+    total = len(videos)
+
+    if por_pagina:
+        por_pagina = max(1, int(por_pagina))
+        pagina = max(1, int(pagina or 1))
+        videos = videos[(pagina - 1) * por_pagina:pagina * por_pagina]
+        paginas = (total + por_pagina - 1) // por_pagina
+    else:
+        pagina, paginas = 1, 1
+
+    return {
+        'videos': videos,
+        'total': total,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'paginas': paginas,
+    }
+
+
 class Persistencia:
     """Gerencia a persistência de dados do processamento de vídeos"""
     
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, apenas_base_dir: bool = False):
         """
         Inicializa o sistema de persistência
         
         Args:
             base_dir: Diretório base para salvar os dados (padrão: backend/dados)
+            apenas_base_dir: Não procura vídeos nos diretórios padrão de dados
+                (biblioteca isolada, ex: testes e benchmark)
         """
         backend_dir = Path(__file__).resolve().parent.parent
         projeto_dir = backend_dir.parent
@@ -30,8 +176,9 @@ class Persistencia:
         elif env_dir:
             candidatos.append(Path(env_dir))
 
-        candidatos.append(backend_dir / "dados")
-        candidatos.append(projeto_dir / "dados")
+        if not (apenas_base_dir and candidatos):
+            candidatos.append(backend_dir / "dados")
+            candidatos.append(projeto_dir / "dados")
 
         # Remove duplicados preservando a ordem
         diretorios = []
@@ -46,10 +193,29 @@ class Persistencia:
         self.base_dir = self.diretorios_busca[0]
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
+        # Um lock por vídeo serializa as escritas (read-modify-write) do mesmo arquivo
+        self._locks_video: Dict[str, threading.RLock] = {}
+        self._lock_locks = threading.Lock()
+        self._lock_indice = threading.RLock()
+
+        # Cache LRU dos documentos já lidos, invalidado pelo mtime/tamanho do arquivo
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_max = max(0, int(os.environ.get("PERSISTENCIA_CACHE_MAX") or 64))
+        self._lock_cache = threading.Lock()
+
         # Arquivo principal de índice
         self.indice_path = self.base_dir / "indice.json"
         self._indice_origem: Dict[str, Path] = {}
         self._carregar_indice()
+
+        # Entradas novas são gravadas na hora; atualizações do resumo de vídeos
+        # já listados (ex: vários shorts anexados) são adiadas para no máximo uma
+        # escrita a cada intervalo, e o que estiver pendente é gravado na saída
+        self._intervalo_indice = max(0.0, float(os.environ.get("PERSISTENCIA_INDICE_INTERVALO") or 2))
+        self._indice_pendente = False
+        self._ultima_gravacao_indice = 0.0
+        self._temporizador_indice: Optional[threading.Timer] = None
+        _instancias_abertas.add(self)
     
     def _carregar_indice(self):
         """Carrega o índice de vídeos processados de todos os diretórios conhecidos"""
@@ -71,25 +237,136 @@ class Persistencia:
     
     def _salvar_indice(self):
         """Salva o índice de vídeos processados no diretório base"""
-        self.indice_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.indice_path, 'w', encoding='utf-8') as f:
-            json.dump(self.indice, f, ensure_ascii=False, indent=2)
+        with self._lock_indice:
+            self._escrever_json_atomico(self.indice_path, self.indice)
+            self._indice_pendente = False
+            self._ultima_gravacao_indice = time.monotonic()
+
+    def _agendar_gravacao_indice(self):
+        """Grava o índice agora ou, se ele foi gravado há menos de um intervalo, ao fim dele"""
+        with self._lock_indice:
+            self._indice_pendente = True
+            restante = self._ultima_gravacao_indice + self._intervalo_indice - time.monotonic()
+            if restante <= 0:
+                self._salvar_indice()
+            elif self._temporizador_indice is None:
+                self._temporizador_indice = threading.Timer(restante, self.sincronizar_indice)
+                self._temporizador_indice.daemon = True
+                self._temporizador_indice.start()
+
+    def sincronizar_indice(self):
+        """Grava imediatamente as alterações do índice ainda pendentes"""
+        with self._lock_indice:
+            if self._temporizador_indice is not None:
+                self._temporizador_indice.cancel()
+                self._temporizador_indice = None
+            # Uma gravação adiada não recria um diretório de dados já removido
+            if self._indice_pendente and self.base_dir.exists():
+                self._salvar_indice()
+
+    def _escrever_json_atomico(self, caminho: Path, dados: Any):
+        """
+        Grava o JSON em um arquivo temporário e o renomeia sobre o destino
+
+        Leitores nunca veem um arquivo pela metade: ou o conteúdo antigo ou o novo.
+        """
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(prefix=f".{caminho.name}.", suffix=".tmp", dir=caminho.parent)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, caminho)
+        except BaseException:
+            try:
+                os.unlink(temporario)
+            except OSError:
+                pass
+            raise
+
+    def _lock_video(self, video_id: str) -> threading.RLock:
+        """Retorna o lock exclusivo de um vídeo"""
+        with self._lock_locks:
+            lock = self._locks_video.get(video_id)
+            if lock is None:
+                lock = self._locks_video[video_id] = threading.RLock()
+            return lock
+
+    def _ler_documento(self, video_id: str, video_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Lê o JSON do vídeo usando o cache quando o arquivo não mudou
+
+        O cache guarda o documento serializado com pickle, de forma que cada
+        chamada recebe uma cópia própria (alterá-la não afeta o cache) sem
+        precisar reinterpretar o JSON inteiro.
+        """
+        try:
+            stat = video_path.stat()
+        except OSError:
+            return None
+        assinatura = (str(video_path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock_cache:
+            item = self._cache.get(video_id)
+            if item and item[0] == assinatura:
+                self._cache.move_to_end(video_id)
+                return pickle.loads(item[1])
+
+        try:
+            with open(video_path, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except Exception:
+            return None
+        self._guardar_cache(video_id, assinatura, dados)
+        return dados
+
+    def _guardar_cache(self, video_id: str, assinatura: tuple, dados: Dict[str, Any]):
+        """Guarda o documento no cache, descartando os menos usados"""
+        if not self._cache_max:
+            return
+        copia = pickle.dumps(dados, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock_cache:
+            self._cache[video_id] = (assinatura, copia)
+            self._cache.move_to_end(video_id)
+            while len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+
+    def _gravar_documento(self, video_id: str, video_path: Path, dados: Dict[str, Any]):
+        """Grava o documento do vídeo de forma atômica e atualiza o cache"""
+        self._escrever_json_atomico(video_path, dados)
+        stat = video_path.stat()
+        self._guardar_cache(video_id, (str(video_path), stat.st_mtime_ns, stat.st_size), dados)
+        self._indice_origem[video_id] = video_path.parent
+        self._atualizar_resumo(video_id, dados)
+
+    def _atualizar_resumo(self, video_id: str, dados: Dict[str, Any], salvar: bool = True):
+        """Atualiza a entrada do vídeo no índice com o resumo do documento"""
+        with self._lock_indice:
+            entrada = self.indice.get(video_id)
+            url = dados.get('url') or (entrada or {}).get('url')
+            # Como antes, só vídeos salvos com URL entram na biblioteca
+            if entrada is None and not url:
+                return
+            nova = {
+                'url': url,
+                'ultima_atualizacao': dados.get('ultima_atualizacao', datetime.now().isoformat()),
+                **resumir_video(dados)
+            }
+            if nova == entrada:
+                return
+            self.indice[video_id] = nova
+            if not salvar:
+                return
+            if entrada is None:
+                # Vídeo novo: outras instâncias e processos precisam vê-lo já
+                self._salvar_indice()
+            else:
+                self._agendar_gravacao_indice()
     
     def _extrair_video_id(self, url: str) -> Optional[str]:
         """Extrai o ID do vídeo de uma URL do YouTube"""
-        from urllib.parse import urlparse, parse_qs
-        
-        try:
-            parsed = urlparse(url)
-            if 'youtube.com' in parsed.netloc or 'youtu.be' in parsed.netloc:
-                if 'youtu.be' in parsed.netloc:
-                    video_id = parsed.path.lstrip('/')
-                else:
-                    video_id = parse_qs(parsed.query).get('v', [None])[0]
-                return video_id
-        except:
-            pass
-        return None
+        return extrair_video_id(url)
     
     def _resolver_caminho_video(self, video_id: str) -> Path:
         """Retorna o caminho do arquivo do vídeo, procurando em todas as pastas conhecidas."""
@@ -107,14 +384,7 @@ class Persistencia:
 
     def obter_video_por_id(self, video_id: str) -> Optional[Dict[str, Any]]:
         """Obtém os dados completos de um vídeo a partir do ID."""
-        video_path = self._resolver_caminho_video(video_id)
-        if video_path.exists():
-            try:
-                with open(video_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return None
-        return None
+        return self._ler_documento(video_id, self._resolver_caminho_video(video_id))
 
     def obter_video(self, url: str) -> Optional[Dict[str, Any]]:
         """
@@ -126,13 +396,8 @@ class Persistencia:
         
         dados = self.obter_video_por_id(video_id)
         if dados and video_id not in self.indice:
-            self.indice[video_id] = {
-                'url': url,
-                'titulo': dados.get('info_video', {}).get('titulo', 'Sem título'),
-                'ultima_atualizacao': dados.get('ultima_atualizacao', datetime.now().isoformat())
-            }
             self._indice_origem[video_id] = self._resolver_caminho_video(video_id).parent
-            self._salvar_indice()
+            self._atualizar_resumo(video_id, {**dados, 'url': dados.get('url') or url})
         return dados
     
     def salvar_video(self, url: str, dados: Dict[str, Any]) -> str:
@@ -155,19 +420,9 @@ class Persistencia:
         dados['url'] = url
         dados['ultima_atualizacao'] = datetime.now().isoformat()
         
-        # Salva arquivo individual
-        video_path = self.obter_caminho_video(video_id)
-        with open(video_path, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=2)
-        self._indice_origem[video_id] = video_path.parent
-        
-        # Atualiza índice
-        self.indice[video_id] = {
-            'url': url,
-            'titulo': dados.get('info_video', {}).get('titulo', 'Sem título'),
-            'ultima_atualizacao': dados['ultima_atualizacao']
-        }
-        self._salvar_indice()
+        # Salva arquivo individual (o índice é atualizado junto)
+        with self._lock_video(video_id):
+            self._gravar_documento(video_id, self.obter_caminho_video(video_id), dados)
         
         return video_id
     
@@ -180,39 +435,133 @@ class Persistencia:
             etapa: Nome da etapa (info_video, audio, transcricao, analise, shorts)
             dados_etapa: Dados da etapa
         """
-        video_path = self.obter_caminho_video(video_id)
+        self.modificar_etapa(video_id, etapa, lambda _atual: dados_etapa)
 
-        if video_path.exists():
-            try:
-                with open(video_path, 'r', encoding='utf-8') as f:
-                    video_data = json.load(f)
-            except Exception:
-                video_data = {'video_id': video_id}
-        else:
-            video_data = {'video_id': video_id}
-        
-        video_data[etapa] = dados_etapa
-        video_data['ultima_atualizacao'] = datetime.now().isoformat()
-        
-        with open(video_path, 'w', encoding='utf-8') as f:
-            json.dump(video_data, f, ensure_ascii=False, indent=2)
-        self._indice_origem[video_id] = video_path.parent
+    def modificar_etapa(self, video_id: str, etapa: str, funcao: Callable[[Any], Any]) -> Any:
+        """
+        Lê, altera e grava uma etapa sob o lock do vídeo (read-modify-write atômico)
+
+        Args:
+            video_id: ID do vídeo
+            etapa: Nome da etapa
+            funcao: Recebe o valor atual da etapa (ou None) e retorna o novo valor
+
+        Returns:
+            Novo valor da etapa
+        """
+        with self._lock_video(video_id):
+            video_path = self.obter_caminho_video(video_id)
+            video_data = self._ler_documento(video_id, video_path) or {'video_id': video_id}
+
+            video_data[etapa] = funcao(video_data.get(etapa))
+            video_data['ultima_atualizacao'] = datetime.now().isoformat()
+
+            self._gravar_documento(video_id, video_path, video_data)
+            return video_data[etapa]
+
+    def anexar_a_etapa(self, video_id: str, etapa: str, item: Any) -> List[Any]:
+        """
+        Acrescenta um item a uma etapa do tipo lista (ex: shorts_baixados)
+
+        Returns:
+            Lista completa após a inclusão
+        """
+        return self.modificar_etapa(video_id, etapa, lambda atual: list(atual or []) + [item])
     
+    def _caminho_parcial_transcricao(self, video_id: str) -> Path:
+        """Caminho do log append-only com os segmentos já transcritos"""
+        return self.base_dir / "parciais" / f"{video_id}.transcricao.jsonl"
+
+    def anexar_segmento_transcricao(self, video_id: str, segmento: Dict[str, Any]):
+        """
+        Acrescenta um segmento ao log parcial da transcrição (append-only)
+
+        Cada segmento é gravado e sincronizado com o disco assim que é produzido,
+        de forma que uma falha no meio da transcrição não perde o que já foi feito.
+        """
+        caminho = self._caminho_parcial_transcricao(video_id)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with open(caminho, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(segmento, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def obter_segmentos_parciais(self, video_id: str) -> List[Dict[str, Any]]:
+        """
+        Lê os segmentos já gravados no log parcial da transcrição
+
+        Uma última linha incompleta (gravação interrompida) é descartada e
+        removida do arquivo, para que os próximos segmentos sejam anexados
+        a partir de um ponto válido.
+        """
+        caminho = self._caminho_parcial_transcricao(video_id)
+        if not caminho.exists():
+            return []
+
+        segmentos = []
+        bytes_validos = 0
+        with open(caminho, 'rb') as f:
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break
+                try:
+                    segmentos.append(json.loads(linha.decode('utf-8')))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                bytes_validos += len(linha)
+
+        if bytes_validos < caminho.stat().st_size:
+            with open(caminho, 'r+b') as f:
+                f.truncate(bytes_validos)
+        return segmentos
+
+    def limpar_segmentos_parciais(self, video_id: str):
+        """Remove o log parcial após a transcrição ser salva por completo"""
+        caminho = self._caminho_parcial_transcricao(video_id)
+        if caminho.exists():
+            caminho.unlink()
+
     def listar_videos(self) -> list:
         """
         Lista todos os vídeos processados
         
         Returns:
-            Lista de dicionários com informações básicas dos vídeos
-        """
-        videos = []
-        for video_id, dados in self.indice.items():
-            videos.append({
-                'video_id': video_id,
-                'id': video_id,  # Alias para compatibilidade
-                **dados
-            })
-        return videos
+            Lista de dicionários com o resumo de cada vídeo (ver resumir_video)
+        """
+        self._completar_resumos()
+        with self._lock_indice:
+            return [
+                {
+                    'video_id': video_id,
+                    'id': video_id,  # Alias para compatibilidade
+                    **dados
+                }
+                for video_id, dados in self.indice.items()
+            ]
+
+    def listar_resumos(self, **filtros) -> Dict[str, Any]:
+        """Lista a biblioteca filtrada, ordenada e paginada (ver consultar_resumos)"""
+        return consultar_resumos(self.listar_videos(), **filtros)
+
+    def _completar_resumos(self):
+        """Gera, uma única vez, o resumo das entradas de índices antigos que não o têm ou estão desatualizadas"""
+        with self._lock_indice:
+            pendentes = [video_id for video_id, dados in self.indice.items() if resumo_desatualizado(dados)]
+        if not pendentes:
+            return
+
+        for video_id in pendentes:
+            dados = self.obter_video_por_id(video_id)
+            if dados:
+                self._atualizar_resumo(video_id, dados, salvar=False)
+            else:
+                # Arquivo ausente: mantém a entrada antiga com etapas não concluídas
+                with self._lock_indice:
+                    entrada = {**resumir_video({}), **self.indice[video_id]}
+                    entrada['estado'] = {**entrada['estado'], 'shorts': bool(entrada['contagens'].get('shorts'))}
+                    self.indice[video_id] = entrada
+        with self._lock_indice:
+            self._salvar_indice()
     
     def obter_estado_processamento(self, video_id: str) -> Dict[str, bool]:
         """
@@ -221,29 +570,23 @@ class Persistencia:
         Returns:
             Dicionário indicando quais etapas foram concluídas
         """
-        video_path = self._resolver_caminho_video(video_id)
-        
-        if not video_path.exists():
-            return {
-                'info_video': False,
-                'audio': False,
-                'transcricao': False,
-                'analise': False,
-                'shorts': False
-            }
-        
-        with open(video_path, 'r', encoding='utf-8') as f:
-            video_data = json.load(f)
-        
-        return {
-            'info_video': 'info_video' in video_data,
-            'audio': 'audio' in video_data and video_data['audio'].get('caminho_arquivo'),
-            'transcricao': 'transcricao' in video_data and video_data['transcricao'].get('texto'),
-            'analise': 'analise' in video_data and video_data['analise'].get('sugestoes'),
-            'shorts': 'shorts' in video_data and len(video_data.get('shorts', [])) > 0
-        }
+        return resumir_video(self.obter_video_por_id(video_id) or {})['estado']
+
+
+def criar_persistencia():
+    """
+    Cria a persistência configurada em PERSISTENCIA_BACKEND
+
+    'json' (padrão) usa um arquivo por vídeo em dados/; 'sqlite' usa um banco
+    SQLite em modo WAL com a mesma API (ver utils/persistencia_sqlite.py).
+    """
+    backend = os.environ.get("PERSISTENCIA_BACKEND", "json").lower()
+    if backend == "sqlite":
+        from utils.persistencia_sqlite import PersistenciaSQLite
+        return PersistenciaSQLite()
+    return Persistencia()
 
 
 # Instância global
-persistencia = Persistencia()
+persistencia = criar_persistencia()
 
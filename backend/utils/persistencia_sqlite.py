@@ -0,0 +1,496 @@
+"""
+Persistência em SQLite (modo WAL) com a mesma API de Persistencia
+
+Em vez de reescrever o JSON inteiro do vídeo a cada etapa, cada etapa é uma
+linha própria e as partes grandes (segmentos da transcrição, sugestões e
+shorts) ficam em tabelas separadas. Atualizar uma etapa só toca as linhas
+daquela etapa, e várias threads podem escrever ao mesmo tempo com segurança.
+
+Migração dos arquivos JSON existentes:
+    python -m utils.persistencia_sqlite --migrar [--origem DIR] [--destino ARQUIVO]
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.persistencia import (
+    Persistencia, consultar_resumos, diretorio_dados_padrao, extrair_video_id, resumir_video,
+    resumo_desatualizado
+)
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    url TEXT,
+    titulo TEXT,
+    ultima_atualizacao TEXT,
+    resumo TEXT
+);
+
+CREATE TABLE IF NOT EXISTS etapas (
+    video_id TEXT NOT NULL,
+    etapa TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (video_id, etapa)
+);
+
+CREATE TABLE IF NOT EXISTS segmentos (
+    video_id TEXT NOT NULL,
+    indice INTEGER NOT NULL,
+    inicio REAL NOT NULL,
+    fim REAL NOT NULL,
+    texto TEXT NOT NULL,
+    extras TEXT,
+    PRIMARY KEY (video_id, indice)
+);
+
+CREATE TABLE IF NOT EXISTS segmentos_parciais (
+    video_id TEXT NOT NULL,
+    indice INTEGER NOT NULL,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (video_id, indice)
+);
+
+CREATE TABLE IF NOT EXISTS sugestoes (
+    video_id TEXT NOT NULL,
+    indice INTEGER NOT NULL,
+    inicio_segundos REAL,
+    fim_segundos REAL,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (video_id, indice)
+);
+
+CREATE TABLE IF NOT EXISTS shorts (
+    video_id TEXT NOT NULL,
+    indice INTEGER NOT NULL,
+    caminho_arquivo TEXT,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (video_id, indice)
+);
+"""
+
+# Campos de primeiro nível do documento que não são etapas
+CAMPOS_VIDEO = ('video_id', 'url', 'ultima_atualizacao')
+
+
+def _json(valor: Any) -> str:
+    return json.dumps(valor, ensure_ascii=False)
+
+
+class PersistenciaSQLite:
+    """Gerencia a persistência de dados do processamento de vídeos em SQLite"""
+
+    def __init__(self, caminho_banco: str = None, base_dir: str = None):
+        """
+        Inicializa o banco (cria as tabelas se necessário)
+
+        Args:
+            caminho_banco: Arquivo do banco (padrão: PERSISTENCIA_SQLITE_PATH
+                ou <dados>/videos.db)
+            base_dir: Diretório de dados usado quando caminho_banco não é informado
+        """
+        caminho = caminho_banco or os.environ.get("PERSISTENCIA_SQLITE_PATH")
+        self.base_dir = diretorio_dados_padrao(base_dir)
+        self.caminho_banco = Path(caminho) if caminho else self.base_dir / "videos.db"
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+
+        self._local = threading.local()
+        conn = self._conexao()
+        conn.executescript(ESQUEMA)
+        # Bancos criados antes do resumo materializado
+        colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(videos)")}
+        if 'resumo' not in colunas:
+            conn.execute("ALTER TABLE videos ADD COLUMN resumo TEXT")
+        conn.commit()
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Uma conexão por thread (sqlite3 não compartilha conexões entre threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.caminho_banco), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _extrair_video_id(self, url: str) -> Optional[str]:
+        """Extrai o ID do vídeo de uma URL do YouTube"""
+        return extrair_video_id(url)
+
+    # ------------------------------
+    # ESCRITA
+    # ------------------------------
+    def _gravar_etapa(self, conn: sqlite3.Connection, video_id: str, etapa: str, dados: Any, agora: str):
+        """Grava uma etapa, separando as listas grandes em suas tabelas"""
+        if etapa == 'transcricao' and isinstance(dados, dict):
+            def extras(seg):
+                # Campos além de inicio/fim/texto; NULL quando o segmento não tem nenhum
+                resto = {k: v for k, v in seg.items() if k not in ('inicio', 'fim', 'texto')}
+                return _json(resto) if resto else None
+
+            conn.execute("DELETE FROM segmentos WHERE video_id = ?", (video_id,))
+            conn.executemany(
+                "INSERT INTO segmentos (video_id, indice, inicio, fim, texto, extras) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (video_id, i, seg.get('inicio', 0), seg.get('fim', 0), seg.get('texto', ''), extras(seg))
+                    for i, seg in enumerate(dados.get('segmentos', []))
+                )
+            )
+            dados = {k: v for k, v in dados.items() if k != 'segmentos'}
+
+        elif etapa == 'analise' and isinstance(dados, dict):
+            conn.execute("DELETE FROM sugestoes WHERE video_id = ?", (video_id,))
+            conn.executemany(
+                "INSERT INTO sugestoes (video_id, indice, inicio_segundos, fim_segundos, dados) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (video_id, i, sug.get('inicio_segundos'), sug.get('fim_segundos'), _json(sug))
+                    for i, sug in enumerate(dados.get('sugestoes', []))
+                )
+            )
+            dados = {k: v for k, v in dados.items() if k != 'sugestoes'}
+
+        elif etapa == 'shorts_baixados' and isinstance(dados, list):
+            conn.execute("DELETE FROM shorts WHERE video_id = ?", (video_id,))
+            conn.executemany(
+                "INSERT INTO shorts (video_id, indice, caminho_arquivo, dados) VALUES (?, ?, ?, ?)",
+                ((video_id, i, s.get('caminho_arquivo'), _json(s)) for i, s in enumerate(dados))
+            )
+            dados = {'_tabela': 'shorts'}
+
+        conn.execute(
+            "INSERT OR REPLACE INTO etapas (video_id, etapa, dados, atualizado_em) VALUES (?, ?, ?, ?)",
+            (video_id, etapa, _json(dados), agora)
+        )
+
+    def _gravar_video(self, conn: sqlite3.Connection, video_id: str, url: Optional[str],
+                      titulo: Optional[str], agora: str):
+        """Cria ou atualiza a linha do vídeo, preservando url/título já conhecidos"""
+        conn.execute(
+            """
+            INSERT INTO videos (video_id, url, titulo, ultima_atualizacao) VALUES (?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                url = COALESCE(excluded.url, videos.url),
+                titulo = COALESCE(excluded.titulo, videos.titulo),
+                ultima_atualizacao = excluded.ultima_atualizacao
+            """,
+            (video_id, url, titulo, agora)
+        )
+
+    def _gravar_documento(self, conn: sqlite3.Connection, video_id: str, dados: Dict[str, Any]):
+        """Substitui o documento inteiro de um vídeo (equivalente a reescrever o JSON)"""
+        for tabela in ('etapas', 'segmentos', 'sugestoes', 'shorts'):
+            conn.execute(f"DELETE FROM {tabela} WHERE video_id = ?", (video_id,))
+
+        agora = dados.get('ultima_atualizacao') or datetime.now().isoformat()
+        titulo = (dados.get('info_video') or {}).get('titulo')
+        self._gravar_video(conn, video_id, dados.get('url'), titulo or 'Sem título', agora)
+        for etapa, valor in dados.items():
+            if etapa not in CAMPOS_VIDEO:
+                self._gravar_etapa(conn, video_id, etapa, valor, agora)
+        self._atualizar_resumo(conn, video_id)
+
+    def _calcular_resumo(self, conn: sqlite3.Connection, video_id: str) -> Dict[str, Any]:
+        """Resumo do vídeo (ver resumir_video) sem carregar segmentos e sugestões"""
+        etapas = {
+            etapa: json.loads(dados)
+            for etapa, dados in conn.execute(
+                "SELECT etapa, dados FROM etapas WHERE video_id = ? AND etapa IN ('info_video', 'audio', 'transcricao')",
+                (video_id,)
+            )
+        }
+        contagens = {
+            tabela: conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE video_id = ?", (video_id,)).fetchone()[0]
+            for tabela in ('segmentos', 'sugestoes', 'shorts')
+        }
+        resumo = resumir_video(etapas)
+        resumo['estado']['analise'] = contagens['sugestoes'] > 0
+        resumo['estado']['shorts'] = contagens['shorts'] > 0
+        resumo['contagens'] = contagens
+        return resumo
+
+    def _atualizar_resumo(self, conn: sqlite3.Connection, video_id: str) -> Dict[str, Any]:
+        """Recalcula o resumo materializado do vídeo (mesma transação da escrita)"""
+        resumo = self._calcular_resumo(conn, video_id)
+        conn.execute("UPDATE videos SET resumo = ? WHERE video_id = ?", (_json(resumo), video_id))
+        return resumo
+
+    def salvar_video(self, url: str, dados: Dict[str, Any]) -> str:
+        """
+        Salva os dados de um vídeo
+
+        Args:
+            url: URL do vídeo do YouTube
+            dados: Dicionário com os dados do vídeo
+
+        Returns:
+            ID do vídeo
+        """
+        video_id = self._extrair_video_id(url)
+        if not video_id:
+            raise ValueError("URL inválida: não foi possível extrair o ID do vídeo")
+
+        dados['video_id'] = video_id
+        dados['url'] = url
+        dados['ultima_atualizacao'] = datetime.now().isoformat()
+
+        conn = self._conexao()
+        with conn:
+            self._gravar_documento(conn, video_id, dados)
+        return video_id
+
+    def atualizar_etapa(self, video_id: str, etapa: str, dados_etapa: Any):
+        """
+        Atualiza uma etapa específica do processamento
+
+        Args:
+            video_id: ID do vídeo
+            etapa: Nome da etapa (info_video, audio, transcricao, analise, shorts)
+            dados_etapa: Dados da etapa
+        """
+        agora = datetime.now().isoformat()
+        titulo = dados_etapa.get('titulo') if etapa == 'info_video' and isinstance(dados_etapa, dict) else None
+
+        conn = self._conexao()
+        with conn:
+            self._gravar_video(conn, video_id, None, titulo, agora)
+            self._gravar_etapa(conn, video_id, etapa, dados_etapa, agora)
+            self._atualizar_resumo(conn, video_id)
+
+    def modificar_etapa(self, video_id: str, etapa: str, funcao: Callable[[Any], Any]) -> Any:
+        """
+        Lê, altera e grava uma etapa dentro de uma única transação de escrita
+
+        Args:
+            video_id: ID do vídeo
+            etapa: Nome da etapa
+            funcao: Recebe o valor atual da etapa (ou None) e retorna o novo valor
+
+        Returns:
+            Novo valor da etapa
+        """
+        conn = self._conexao()
+        # BEGIN IMMEDIATE reserva a escrita antes da leitura (vale entre processos)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            atual = (self.obter_video_por_id(video_id) or {}).get(etapa)
+            novo = funcao(atual)
+            agora = datetime.now().isoformat()
+            self._gravar_video(conn, video_id, None, None, agora)
+            self._gravar_etapa(conn, video_id, etapa, novo, agora)
+            self._atualizar_resumo(conn, video_id)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return novo
+
+    def anexar_a_etapa(self, video_id: str, etapa: str, item: Any) -> List[Any]:
+        """
+        Acrescenta um item a uma etapa do tipo lista (ex: shorts_baixados)
+
+        Returns:
+            Lista completa após a inclusão
+        """
+        return self.modificar_etapa(video_id, etapa, lambda atual: list(atual or []) + [item])
+
+    # ------------------------------
+    # LEITURA
+    # ------------------------------
+    def obter_video_por_id(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Obtém os dados completos de um vídeo a partir do ID."""
+        conn = self._conexao()
+        linha = conn.execute(
+            "SELECT url, ultima_atualizacao FROM videos WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        if not linha:
+            return None
+
+        documento: Dict[str, Any] = {'video_id': video_id}
+        if linha[0] is not None:
+            documento['url'] = linha[0]
+        documento['ultima_atualizacao'] = linha[1]
+
+        for etapa, dados in conn.execute(
+            "SELECT etapa, dados FROM etapas WHERE video_id = ?", (video_id,)
+        ):
+            documento[etapa] = json.loads(dados)
+
+        if 'transcricao' in documento and isinstance(documento['transcricao'], dict):
+            segmentos = []
+            for inicio, fim, texto, extras in conn.execute(
+                "SELECT inicio, fim, texto, extras FROM segmentos WHERE video_id = ? ORDER BY indice",
+                (video_id,)
+            ):
+                seg = {'inicio': inicio, 'fim': fim, 'texto': texto}
+                if extras and extras != '{}':
+                    seg.update(json.loads(extras))
+                segmentos.append(seg)
+            documento['transcricao']['segmentos'] = segmentos
+
+        if 'analise' in documento and isinstance(documento['analise'], dict):
+            documento['analise']['sugestoes'] = [
+                json.loads(dados) for (dados,) in conn.execute(
+                    "SELECT dados FROM sugestoes WHERE video_id = ? ORDER BY indice", (video_id,)
+                )
+            ]
+
+        if 'shorts_baixados' in documento:
+            documento['shorts_baixados'] = [
+                json.loads(dados) for (dados,) in conn.execute(
+                    "SELECT dados FROM shorts WHERE video_id = ? ORDER BY indice", (video_id,)
+                )
+            ]
+
+        return documento
+
+    def obter_video(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém os dados salvos de um vídeo a partir da URL
+        """
+        video_id = self._extrair_video_id(url)
+        if not video_id:
+            return None
+        return self.obter_video_por_id(video_id)
+
+    def listar_videos(self) -> list:
+        """
+        Lista todos os vídeos processados
+
+        Returns:
+            Lista de dicionários com o resumo de cada vídeo (ver resumir_video)
+        """
+        conn = self._conexao()
+        linhas = conn.execute(
+            # Como no índice JSON, só entram vídeos salvos com salvar_video
+            "SELECT video_id, url, titulo, ultima_atualizacao, resumo FROM videos WHERE url IS NOT NULL"
+        ).fetchall()
+
+        videos = []
+        for video_id, url, titulo, ultima_atualizacao, resumo in linhas:
+            if resumo:
+                resumo = json.loads(resumo)
+            if not resumo or resumo_desatualizado(resumo):
+                with conn:
+                    resumo = self._atualizar_resumo(conn, video_id)
+            videos.append({
+                'video_id': video_id,
+                'id': video_id,  # Alias para compatibilidade
+                'url': url,
+                'ultima_atualizacao': ultima_atualizacao,
+                **resumo,
+                'titulo': titulo or resumo.get('titulo') or 'Sem título',
+            })
+        return videos
+
+    def listar_resumos(self, **filtros) -> Dict[str, Any]:
+        """Lista a biblioteca filtrada, ordenada e paginada (ver consultar_resumos)"""
+        return consultar_resumos(self.listar_videos(), **filtros)
+
+    def obter_estado_processamento(self, video_id: str) -> Dict[str, bool]:
+        """
+        Obtém o estado do processamento de um vídeo
+
+        Returns:
+            Dicionário indicando quais etapas foram concluídas
+        """
+        return self._calcular_resumo(self._conexao(), video_id)['estado']
+
+    # ------------------------------
+    # TRANSCRIÇÃO PARCIAL
+    # ------------------------------
+    def anexar_segmento_transcricao(self, video_id: str, segmento: Dict[str, Any]):
+        """Acrescenta um segmento ao log parcial da transcrição (um commit por segmento)"""
+        conn = self._conexao()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO segmentos_parciais (video_id, indice, dados)
+                VALUES (?, (SELECT COUNT(*) FROM segmentos_parciais WHERE video_id = ?), ?)
+                """,
+                (video_id, video_id, _json(segmento))
+            )
+
+    def obter_segmentos_parciais(self, video_id: str) -> List[Dict[str, Any]]:
+        """Lê os segmentos já gravados no log parcial da transcrição"""
+        conn = self._conexao()
+        return [
+            json.loads(dados) for (dados,) in conn.execute(
+                "SELECT dados FROM segmentos_parciais WHERE video_id = ? ORDER BY indice", (video_id,)
+            )
+        ]
+
+    def limpar_segmentos_parciais(self, video_id: str):
+        """Remove o log parcial após a transcrição ser salva por completo"""
+        conn = self._conexao()
+        with conn:
+            conn.execute("DELETE FROM segmentos_parciais WHERE video_id = ?", (video_id,))
+
+    # ------------------------------
+    # MIGRAÇÃO
+    # ------------------------------
+    def migrar_de_json(self, base_dir: str = None) -> Dict[str, int]:
+        """
+        Importa os vídeos salvos em JSON (dados/*.json e logs parciais)
+
+        Args:
+            base_dir: Diretório JSON de origem (padrão: diretórios da Persistencia)
+
+        Returns:
+            Contagem de vídeos e segmentos parciais importados
+        """
+        origem = Persistencia(base_dir)
+        video_ids = set(origem.indice)
+        for diretorio in origem.diretorios_busca:
+            if diretorio.exists():
+                video_ids.update(
+                    p.stem for p in diretorio.glob("*.json") if p.name != "indice.json"
+                )
+
+        total_videos = 0
+        total_parciais = 0
+        conn = self._conexao()
+        for video_id in sorted(video_ids):
+            dados = origem.obter_video_por_id(video_id)
+            if not dados:
+                continue
+            dados.setdefault('url', origem.indice.get(video_id, {}).get('url'))
+            with conn:
+                self._gravar_documento(conn, video_id, dados)
+            total_videos += 1
+
+            parciais = origem.obter_segmentos_parciais(video_id)
+            if parciais:
+                self.limpar_segmentos_parciais(video_id)
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO segmentos_parciais (video_id, indice, dados) VALUES (?, ?, ?)",
+                        ((video_id, i, _json(seg)) for i, seg in enumerate(parciais))
+                    )
+                total_parciais += len(parciais)
+
+        return {'videos': total_videos, 'segmentos_parciais': total_parciais}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Persistência SQLite do Criador de Shorts")
+    parser.add_argument('--migrar', action='store_true', help="Importa os arquivos JSON existentes")
+    parser.add_argument('--origem', help="Diretório com os JSON (padrão: dados/)")
+    parser.add_argument('--destino', help="Arquivo do banco SQLite (padrão: dados/videos.db)")
+    args = parser.parse_args()
+
+    if not args.migrar:
+        parser.print_help()
+    else:
+        banco = PersistenciaSQLite(caminho_banco=args.destino)
+        resultado = banco.migrar_de_json(args.origem)
+        print(f"[MIGRACAO] {resultado['videos']} vídeos e {resultado['segmentos_parciais']} "
+              f"segmentos parciais importados para {banco.caminho_banco}")
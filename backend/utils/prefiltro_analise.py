@@ -0,0 +1,170 @@
+"""
+Pré-filtro local da transcrição antes da análise pela IA
+
+Um culto de 2 horas tem longos trechos sem potencial de corte: leitura
+bíblica corrida, avisos, ofertas e música. Antes de montar os blocos, a
+transcrição é dividida em janelas de ~1 minuto e cada janela recebe uma nota
+calculada só com os segmentos do Whisper:
+
+- ritmo de fala (palavras por segundo) e fração de silêncio entre segmentos
+- léxico de pregação e emoção, interpelação direta ("você", "te") e ênfase
+  (exclamações e perguntas)
+- léxico de avisos/ofertas, marcadores de leitura e de música
+- diversidade de vocabulário (letras de música e alucinações se repetem)
+
+As características são padronizadas entre as janelas do próprio vídeo e
+somadas com pesos. As janelas mais bem avaliadas são mantidas até a fração
+de tokens configurada; trechos vizinhos mantidos continuam juntos e os
+descontínuos são marcados para o texto do bloco indicar o salto.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.blocos_analise import estimar_tokens
+from utils.indice_transcricao import tokenizar
+
+
+# Duração alvo de cada janela avaliada (s)
+JANELA_SEGUNDOS = 60.0
+
+# Pausa mínima entre segmentos contada como silêncio (s)
+PAUSA_MINIMA = 0.5
+
+LEXICO_PREGACAO = {
+    'deus', 'jesus', 'cristo', 'senhor', 'espirito', 'fe', 'graca', 'amor', 'perdao', 'cura',
+    'milagre', 'promessa', 'proposito', 'vida', 'morte', 'medo', 'ansiedade', 'depressao', 'dor',
+    'lagrimas', 'chorar', 'chorando', 'coracao', 'alma', 'familia', 'filho', 'filha', 'pai', 'mae',
+    'casamento', 'vitoria', 'luta', 'deserto', 'esperanca', 'salvacao', 'pecado', 'inferno', 'ceu',
+    'eternidade', 'verdade', 'cruz', 'sangue', 'oracao', 'chamado', 'mudar', 'transformar',
+}
+INTERPELACAO = {'voce', 'voces', 'te', 'contigo', 'tua', 'teu', 'tuas', 'teus'}
+LEXICO_AVISOS = {
+    'aviso', 'avisos', 'oferta', 'ofertas', 'dizimo', 'dizimos', 'pix', 'conta', 'banco', 'inscricao',
+    'inscricoes', 'evento', 'reuniao', 'horario', 'domingo', 'sabado', 'convite', 'cantina',
+    'estacionamento', 'inscreva', 'canal', 'like', 'compartilhe', 'transmissao',
+}
+MARCADORES_LEITURA = {'capitulo', 'versiculo', 'versiculos', 'livro', 'leitura'}
+MARCADORES_MUSICA = ('♪', '♫', '[musica]', '(musica)', '[música]', '(música)')
+
+# Pesos das características padronizadas
+PESOS = {
+    'ritmo': 0.8,
+    'silencio': -0.8,
+    'pregacao': 1.0,
+    'interpelacao': 0.6,
+    'enfase': 0.5,
+    'diversidade': 0.6,
+    'avisos': -1.2,
+    'leitura': -0.5,
+    'musica': -1.5,
+}
+
+
+def dividir_janelas(segmentos: List[Dict[str, Any]], duracao: float = JANELA_SEGUNDOS) -> List[Tuple[int, int]]:
+    """Intervalos [ini, fim) de posições de segmentos com cerca de `duracao` segundos cada"""
+    janelas = []
+    inicio = 0
+    for posicao, seg in enumerate(segmentos):
+        if seg['fim'] - segmentos[inicio]['inicio'] >= duracao:
+            janelas.append((inicio, posicao + 1))
+            inicio = posicao + 1
+    if inicio < len(segmentos):
+        janelas.append((inicio, len(segmentos)))
+    return janelas
+
+
+def caracteristicas_janela(segmentos: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Características brutas de uma janela de segmentos"""
+    duracao = max(segmentos[-1]['fim'] - segmentos[0]['inicio'], 1e-6)
+    palavras = [p for seg in segmentos for p in tokenizar(seg['texto'])]
+    total = max(len(palavras), 1)
+    silencio = sum(
+        max(0.0, atual['inicio'] - anterior['fim'])
+        for anterior, atual in zip(segmentos, segmentos[1:])
+        if atual['inicio'] - anterior['fim'] >= PAUSA_MINIMA
+    )
+    texto = ' '.join(seg['texto'] for seg in segmentos).lower()
+    return {
+        'ritmo': len(palavras) / duracao,
+        'silencio': silencio / duracao,
+        'pregacao': sum(p in LEXICO_PREGACAO for p in palavras) / total,
+        'interpelacao': sum(p in INTERPELACAO for p in palavras) / total,
+        'enfase': (texto.count('!') + texto.count('?')) / len(segmentos),
+        'diversidade': len(set(palavras)) / total,
+        'avisos': sum(p in LEXICO_AVISOS for p in palavras) / total,
+        'leitura': sum(p in MARCADORES_LEITURA for p in palavras) / total,
+        'musica': sum(texto.count(m) for m in MARCADORES_MUSICA) / len(segmentos),
+    }
+
+
+def pontuar_janelas(segmentos: List[Dict[str, Any]], janelas: List[Tuple[int, int]]) -> List[float]:
+    """Nota de cada janela: soma ponderada das características padronizadas (z-score), suavizada"""
+    caracteristicas = [caracteristicas_janela(segmentos[ini:fim]) for ini, fim in janelas]
+    notas = [0.0] * len(janelas)
+    for nome, peso in PESOS.items():
+        valores = [c[nome] for c in caracteristicas]
+        media = sum(valores) / len(valores)
+        desvio = math.sqrt(sum((v - media) ** 2 for v in valores) / len(valores))
+        if desvio == 0:
+            continue
+        for i, valor in enumerate(valores):
+            notas[i] += peso * (valor - media) / desvio
+
+    # Suaviza com as vizinhas: um short passa de uma janela, então trechos contínuos valem mais
+    return [
+        0.5 * nota + 0.25 * (notas[max(i - 1, 0)] + notas[min(i + 1, len(notas) - 1)])
+        for i, nota in enumerate(notas)
+    ]
+
+
+def selecionar_segmentos(segmentos: List[Dict[str, Any]], fracao: float,
+                         max_tokens: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Mantém as janelas mais bem avaliadas até a fração de tokens (ou o teto) configurado
+
+    Args:
+        segmentos: Segmentos em ordem cronológica
+        fracao: Fração dos tokens da transcrição enviada à IA (1 mantém tudo)
+        max_tokens: Teto opcional de tokens enviados (orçamento de chamadas)
+
+    Returns:
+        Tupla (segmentos mantidos em ordem cronológica, resumo). O primeiro
+        segmento de cada trecho descontínuo é uma cópia com 'salto': True.
+    """
+    janelas = dividir_janelas(segmentos)
+    tokens_janela = [
+        sum(estimar_tokens(seg['texto']) + 1 for seg in segmentos[ini:fim]) for ini, fim in janelas
+    ]
+    tokens_total = sum(tokens_janela)
+    alvo = tokens_total * min(max(fracao, 0.0), 1.0)
+    if max_tokens:
+        alvo = min(alvo, max_tokens)
+
+    if alvo >= tokens_total:
+        mantidas = set(range(len(janelas)))
+    else:
+        notas = pontuar_janelas(segmentos, janelas)
+        mantidas = set()
+        acumulado = 0
+        for i in sorted(range(len(janelas)), key=lambda i: (-notas[i], i)):
+            if mantidas and acumulado + tokens_janela[i] > alvo:
+                break
+            mantidas.add(i)
+            acumulado += tokens_janela[i]
+
+    selecionados = []
+    for i, (ini, fim) in enumerate(janelas):
+        if i not in mantidas:
+            continue
+        salto = bool(selecionados) and (i - 1) not in mantidas
+        selecionados.append(dict(segmentos[ini], salto=True) if salto else segmentos[ini])
+        selecionados.extend(segmentos[ini + 1:fim])
+
+    tokens_mantidos = sum(tokens_janela[i] for i in mantidas)
+    return selecionados, {
+        'janelas': len(janelas),
+        'janelas_mantidas': len(mantidas),
+        'tokens_total': tokens_total,
+        'tokens_mantidos': tokens_mantidos,
+    }
@@ -0,0 +1,250 @@
+"""
+Provedores do modelo de linguagem usado na análise
+
+A análise conversa com o modelo por uma interface mínima (respostas em
+streaming e janela de contexto), escolhida por LLM_PROVEDOR:
+
+- 'ollama' (padrão): servidor Ollama local (host em OLLAMA_HOST)
+- 'openai': qualquer servidor compatível com a API de chat da OpenAI
+  (vLLM, llama.cpp, LM Studio...), em LLM_OPENAI_URL com LLM_OPENAI_CHAVE
+- 'replay': respostas gravadas (ou sintetizadas a partir do próprio trecho)
+  com latência configurável, sem GPU nem servidor, para medir o restante
+  da análise de forma determinística
+
+Os clientes de cada provedor só são importados quando ele é escolhido.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Modelo usado quando a requisição não indica outro
+MODELO_PADRAO = os.environ.get("LLM_MODELO") or os.environ.get("OLLAMA_MODEL", "llama3.2:3b")
+
+
+class ProvedorLLM:
+    """Interface dos provedores: conversar em streaming e informar o contexto"""
+
+    nome = ''
+
+    def conversar(self, modelo: str, mensagens: List[Dict[str, str]], formato: Any = None,
+                  opcoes: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        Envia a conversa e devolve os trechos da resposta conforme chegam
+
+        Args:
+            modelo: Nome do modelo
+            mensagens: Mensagens no formato {'role', 'content'}
+            formato: Esquema JSON da resposta, 'json' ou None (texto livre)
+            opcoes: Opções de geração no formato do Ollama (temperature, num_ctx)
+        """
+        raise NotImplementedError
+
+    def contexto(self, modelo: str) -> Optional[int]:
+        """Janela de contexto do modelo em tokens, ou None se não for conhecida"""
+        return None
+
+
+class ProvedorOllama(ProvedorLLM):
+    """Servidor Ollama (OLLAMA_HOST)"""
+
+    nome = 'ollama'
+
+    def __init__(self, timeout: float = None):
+        import ollama
+        self._cliente = ollama.Client(timeout=timeout)
+
+    def conversar(self, modelo, mensagens, formato=None, opcoes=None):
+        partes = self._cliente.chat(
+            model=modelo, messages=mensagens, format=formato, options=opcoes, stream=True
+        )
+        try:
+            for parte in partes:
+                yield parte['message']['content']
+        finally:
+            # Fecha a resposta HTTP quando a leitura é interrompida antes do fim
+            fechar = getattr(partes, 'close', None)
+            if fechar:
+                fechar()
+
+    def contexto(self, modelo):
+        info = self._cliente.show(modelo)
+        model_info = getattr(info, 'modelinfo', None) or info.get('model_info') or {}
+        for chave, valor in model_info.items():
+            if chave.endswith('.context_length'):
+                return int(valor)
+        return None
+
+
+class ProvedorOpenAI(ProvedorLLM):
+    """Servidor compatível com /v1/chat/completions da OpenAI"""
+
+    nome = 'openai'
+
+    def __init__(self, url: str = None, chave: str = None, timeout: float = None):
+        """
+        Args:
+            url: URL base da API (padrão: LLM_OPENAI_URL ou http://localhost:8000/v1)
+            chave: Chave de API (padrão: LLM_OPENAI_CHAVE; servidores locais costumam dispensar)
+            timeout: Timeout de conexão e de leitura entre trechos (s)
+        """
+        self.url = (url or os.environ.get("LLM_OPENAI_URL", "http://localhost:8000/v1")).rstrip('/')
+        self.chave = chave if chave is not None else os.environ.get("LLM_OPENAI_CHAVE", "")
+        self.timeout = timeout
+
+    def conversar(self, modelo, mensagens, formato=None, opcoes=None):
+        import requests
+
+        corpo = {'model': modelo, 'messages': mensagens, 'stream': True}
+        if opcoes and 'temperature' in opcoes:
+            corpo['temperature'] = opcoes['temperature']
+        if isinstance(formato, dict):
+            corpo['response_format'] = {
+                'type': 'json_schema', 'json_schema': {'name': 'resposta', 'schema': formato}
+            }
+        elif formato == 'json':
+            corpo['response_format'] = {'type': 'json_object'}
+        cabecalhos = {'Authorization': f"Bearer {self.chave}"} if self.chave else {}
+
+        with requests.post(f"{self.url}/chat/completions", json=corpo, headers=cabecalhos,
+                           stream=True, timeout=self.timeout) as resposta:
+            resposta.raise_for_status()
+            resposta.encoding = 'utf-8'
+            # Server-sent events: uma linha "data: {...}" por trecho, "data: [DONE]" no fim
+            for linha in resposta.iter_lines(decode_unicode=True):
+                if not linha or not linha.startswith('data:'):
+                    continue
+                dados = linha[5:].strip()
+                if dados == '[DONE]':
+                    break
+                escolhas = json.loads(dados).get('choices') or [{}]
+                trecho = (escolhas[0].get('delta') or {}).get('content')
+                if trecho:
+                    yield trecho
+
+
+class ProvedorReplay(ProvedorLLM):
+    """
+    Respostas gravadas servidas com latência simulada
+
+    As gravações são um arquivo JSONL (uma resposta por linha, como texto ou
+    {'resposta': ...}) ou um diretório do cache do LLM (dados/cache_llm). A
+    resposta de cada conversa é escolhida pelo hash da última mensagem, então
+    a mesma entrada recebe sempre a mesma resposta. Sem gravações, a resposta
+    é sintetizada citando trechos do próprio texto recebido.
+    """
+
+    nome = 'replay'
+
+    # Caracteres por trecho do stream simulado
+    CARACTERES_TRECHO = 16
+
+    def __init__(self, gravacoes: str = None, latencia: float = None, tokens_por_segundo: float = None,
+                 contexto: int = None):
+        """
+        Args:
+            gravacoes: Arquivo JSONL ou diretório do cache (padrão: LLM_REPLAY_GRAVACOES)
+            latencia: Espera até o primeiro trecho, em s (padrão: LLM_REPLAY_LATENCIA ou 0.5)
+            tokens_por_segundo: Velocidade do stream (padrão: LLM_REPLAY_TOKENS_SEGUNDO ou 50; 0 = instantâneo)
+            contexto: Janela de contexto informada (padrão: LLM_REPLAY_CONTEXTO ou 8192)
+        """
+        gravacoes = gravacoes or os.environ.get("LLM_REPLAY_GRAVACOES")
+        self.latencia = float(latencia if latencia is not None else os.environ.get("LLM_REPLAY_LATENCIA", 0.5))
+        self.tokens_por_segundo = float(
+            tokens_por_segundo if tokens_por_segundo is not None
+            else os.environ.get("LLM_REPLAY_TOKENS_SEGUNDO", 50)
+        )
+        self._contexto = int(contexto or os.environ.get("LLM_REPLAY_CONTEXTO", 8192))
+        self.respostas = self._carregar(Path(gravacoes)) if gravacoes else []
+
+    @staticmethod
+    def _carregar(caminho: Path) -> List[str]:
+        """Respostas do arquivo JSONL ou do diretório do cache, em ordem estável"""
+        respostas = []
+        if caminho.is_dir():
+            for arquivo in sorted(caminho.glob("*/*.json")):
+                try:
+                    with open(arquivo, 'r', encoding='utf-8') as f:
+                        respostas.append(json.load(f)['resposta'])
+                except (OSError, ValueError, KeyError):
+                    continue
+            return respostas
+
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if not linha.strip():
+                    continue
+                registro = json.loads(linha)
+                respostas.append(registro['resposta'] if isinstance(registro, dict) else str(registro))
+        return respostas
+
+    @staticmethod
+    def sintetizar(texto: str, semente: int) -> str:
+        """Resposta no formato da análise citando palavras do próprio texto (após 'TRECHO:', se houver)"""
+        trecho = texto.rsplit('TRECHO:', 1)[-1]
+        palavras = re.findall(r'\S+', trecho)
+        sugestoes = []
+        rng = random.Random(semente)
+        if len(palavras) >= 60:
+            for numero in range(1, 3):
+                inicio = rng.randrange(0, len(palavras) - 40)
+                fim = min(len(palavras), inicio + rng.randint(120, 220))
+                sugestoes.append({
+                    'titulo': f"Trecho {numero}",
+                    'citacao_inicio': ' '.join(palavras[inicio:inicio + 5]),
+                    'citacao_fim': ' '.join(palavras[fim - 5:fim]),
+                    'resumo': 'Sugestão sintetizada pelo provedor replay',
+                    'gatilho_viral': rng.choice(['Identificação', 'Medo', 'Esperança', 'Confronto']),
+                    'score': rng.randint(40, 95),
+                })
+        return json.dumps({'sugestoes': sugestoes}, ensure_ascii=False)
+
+    def conversar(self, modelo, mensagens, formato=None, opcoes=None):
+        texto = mensagens[-1]['content'] if mensagens else ''
+        semente = int(hashlib.sha256(texto.encode('utf-8')).hexdigest()[:12], 16)
+        if self.respostas:
+            resposta = self.respostas[semente % len(self.respostas)]
+        else:
+            resposta = self.sintetizar(texto, semente)
+
+        time.sleep(self.latencia)
+        for i in range(0, len(resposta), self.CARACTERES_TRECHO):
+            if self.tokens_por_segundo > 0:
+                # ~4 caracteres por token
+                time.sleep(self.CARACTERES_TRECHO / 4 / self.tokens_por_segundo)
+            yield resposta[i:i + self.CARACTERES_TRECHO]
+
+    def contexto(self, modelo):
+        return self._contexto
+
+
+PROVEDORES = {
+    'ollama': ProvedorOllama,
+    'openai': ProvedorOpenAI,
+    'replay': ProvedorReplay,
+}
+
+
+def criar_provedor_llm(nome: str = None, timeout: float = None) -> ProvedorLLM:
+    """
+    Cria o provedor configurado em LLM_PROVEDOR
+
+    Args:
+        nome: 'ollama' (padrão), 'openai' ou 'replay'
+        timeout: Timeout das chamadas (ignorado pelo replay)
+
+    Raises:
+        ValueError: Se o provedor não existir
+    """
+    nome = (nome or os.environ.get("LLM_PROVEDOR", "ollama")).lower()
+    if nome not in PROVEDORES:
+        raise ValueError(f"Provedor de LLM desconhecido: {nome} (disponíveis: {', '.join(PROVEDORES)})")
+    if nome == 'replay':
+        return ProvedorReplay()
+    return PROVEDORES[nome](timeout=timeout)
@@ -0,0 +1,128 @@
+"""
+Ranking global das sugestões da análise
+
+Os blocos da análise se sobrepõem, então o mesmo momento costuma ser sugerido
+por dois blocos. Depois de resolver os tempos de todas as sugestões (e não só
+das que a IA pontuou melhor), esta etapa:
+
+1. pontua cada corte com uma função determinística: o score da IA mais a
+   força do gancho (o corte começa uma frase e não abre com conectivo), o
+   encaixe da duração na faixa ideal e a confiança do alinhamento da citação
+2. agrupa cortes cujos intervalos se sobrepõem, mantendo o de maior
+   pontuação como representante; a concordância entre blocos vale um bônus
+3. ordena pela pontuação e corta no limite de shorts
+"""
+
+from typing import Any, Dict, List
+
+from utils.indice_transcricao import tokenizar
+
+
+# Faixa de duração ideal (s) e tolerância fora dela até o encaixe zerar
+DURACAO_IDEAL = (60.0, 90.0)
+TOLERANCIA_DURACAO = 30.0
+
+# Sobreposição (fração do corte mais curto) a partir da qual dois cortes são o mesmo momento
+SOBREPOSICAO_DUPLICATA = 0.6
+
+# Pesos da pontuação (somam 1)
+PESOS = {'score_ia': 0.55, 'gancho': 0.2, 'duracao': 0.15, 'alinhamento': 0.1}
+
+# Bônus por bloco adicional que sugeriu o mesmo momento (limitado a BONUS_MAXIMO)
+BONUS_CONCORDANCIA = 0.03
+BONUS_MAXIMO = 0.09
+
+# Aberturas fracas que o prompt pede para evitar
+CONECTIVOS_INICIO = {'e', 'entao', 'mas', 'porque', 'pois', 'ai', 'tipo', 'ne', 'que'}
+
+
+def score_ia(sugestao: Dict[str, Any]) -> float:
+    """Score informado pela IA normalizado para 0 a 1 (0 se ausente ou inválido)"""
+    try:
+        score = float(sugestao.get('score', 0))
+    except (TypeError, ValueError):
+        return 0.0
+    if 0 < score < 1:
+        # Alguns modelos respondem de 0 a 1 em vez de 0 a 100; inteiros
+        # (inclusive 1) continuam na escala de 0 a 100 pedida no esquema
+        return score
+    return min(max(score, 0.0), 100.0) / 100.0
+
+
+def encaixe_duracao(duracao: float) -> float:
+    """1 dentro da faixa ideal, caindo linearmente até 0 a TOLERANCIA_DURACAO dela"""
+    minimo, maximo = DURACAO_IDEAL
+    distancia = max(minimo - duracao, duracao - maximo, 0.0)
+    return max(0.0, 1 - distancia / TOLERANCIA_DURACAO)
+
+
+def forca_gancho(citacao_inicio: str, inicia_frase: bool) -> float:
+    """Metade por começar uma frase, metade por não abrir com conectivo"""
+    palavras = tokenizar(citacao_inicio)
+    sem_conectivo = bool(palavras) and palavras[0] not in CONECTIVOS_INICIO
+    return 0.5 * inicia_frase + 0.5 * sem_conectivo
+
+
+def pontuar(candidato: Dict[str, Any]) -> float:
+    """
+    Pontuação determinística de um corte já com tempos resolvidos
+
+    Args:
+        candidato: Dicionário com 'score_ia', 'gancho', 'duracao' e 'alinhamento' (0 a 1)
+    """
+    return sum(peso * candidato[caracteristica] for caracteristica, peso in PESOS.items())
+
+
+def _sobreposicao(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Interseção dos intervalos como fração do mais curto"""
+    intersecao = min(a['fim'], b['fim']) - max(a['inicio'], b['inicio'])
+    menor = min(a['fim'] - a['inicio'], b['fim'] - b['inicio'])
+    return intersecao / menor if intersecao > 0 and menor > 0 else 0.0
+
+
+def agrupar_duplicatas(candidatos: List[Dict[str, Any]],
+                       limiar: float = SOBREPOSICAO_DUPLICATA) -> List[Dict[str, Any]]:
+    """
+    Junta cortes do mesmo momento, do mais pontuado para o menos
+
+    Cada grupo é representado pelo corte de maior pontuação; 'ocorrencias'
+    conta quantas sugestões caíram nele e a pontuação recebe o bônus de
+    concordância.
+
+    Args:
+        candidatos: Cortes com 'inicio', 'fim' e 'pontuacao'
+        limiar: Sobreposição mínima para considerar duplicata
+
+    Returns:
+        Representantes dos grupos, do mais pontuado para o menos
+    """
+    ordenados = sorted(candidatos, key=lambda c: (-c['pontuacao'], c['inicio'], c['fim']))
+    grupos: List[Dict[str, Any]] = []
+    for candidato in ordenados:
+        grupo = next((g for g in grupos if _sobreposicao(g, candidato) >= limiar), None)
+        if grupo is None:
+            grupos.append(dict(candidato, ocorrencias=1))
+        else:
+            grupo['ocorrencias'] += 1
+
+    for grupo in grupos:
+        bonus = min(BONUS_MAXIMO, BONUS_CONCORDANCIA * (grupo['ocorrencias'] - 1))
+        grupo['pontuacao'] = round(grupo['pontuacao'] + bonus, 4)
+    grupos.sort(key=lambda g: (-g['pontuacao'], g['inicio'], g['fim']))
+    return grupos
+
+
+def ranquear(candidatos: List[Dict[str, Any]], limite: int) -> List[Dict[str, Any]]:
+    """
+    Pontua, remove duplicatas e devolve os `limite` melhores cortes
+
+    Args:
+        candidatos: Cortes com 'inicio', 'fim' e as características de pontuar()
+        limite: Quantidade máxima de cortes
+
+    Returns:
+        Melhores cortes com 'pontuacao' e 'ocorrencias', do mais pontuado para o menos
+    """
+    for candidato in candidatos:
+        candidato['pontuacao'] = round(pontuar(candidato), 4)
+    return agrupar_duplicatas(candidatos)[:limite]
@@ -0,0 +1,147 @@
+"""
+Formato e leitura das respostas do modelo na análise
+
+As chamadas pedem saída estruturada ao Ollama (`format` com o esquema JSON
+das sugestões), então o modelo não devolve mais texto livre com cercas de
+Markdown. A resposta chega em streaming e é lida de forma incremental: cada
+sugestão completa é aproveitada assim que o objeto dela fecha. Se a resposta
+for cortada (limite de tokens, timeout no meio do stream), as sugestões já
+completas continuam valendo e o bloco não precisa ser refeito.
+"""
+
+import json
+from typing import Any, Dict, List
+
+
+# Esquema das sugestões enviado em `format` (Ollama 0.5+)
+ESQUEMA_SUGESTOES: Dict[str, Any] = {
+    'type': 'object',
+    'properties': {
+        'sugestoes': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'titulo': {'type': 'string'},
+                    'citacao_inicio': {'type': 'string'},
+                    'citacao_fim': {'type': 'string'},
+                    'resumo': {'type': 'string'},
+                    'gatilho_viral': {'type': 'string'},
+                    'score': {'type': 'integer', 'minimum': 0, 'maximum': 100},
+                },
+                'required': ['titulo', 'citacao_inicio', 'citacao_fim', 'resumo', 'gatilho_viral', 'score'],
+            },
+        },
+    },
+    'required': ['sugestoes'],
+}
+
+
+def formato_resposta(modo: str):
+    """
+    Valor de `format` da chamada ao Ollama
+
+    Args:
+        modo: 'esquema' (esquema JSON das sugestões), 'json' (só JSON válido,
+            para servidores antigos) ou vazio (texto livre)
+    """
+    if modo == 'esquema':
+        return ESQUEMA_SUGESTOES
+    if modo == 'json':
+        return 'json'
+    return None
+
+
+class LeitorSugestoes:
+    """Leitura incremental e tolerante das sugestões de uma resposta em JSON"""
+
+    def __init__(self):
+        self.texto = ''
+        self.sugestoes: List[Dict[str, Any]] = []
+        # O JSON das sugestões (objeto com 'sugestoes' ou lista) fechou
+        self.completo = False
+
+        self._posicao = 0
+        self._pilha = []  # (caractere de abertura, posição no texto)
+        self._em_string = False
+        self._escape = False
+
+    @property
+    def truncado(self) -> bool:
+        """Se a resposta terminou antes de fechar o JSON"""
+        return not self.completo
+
+    def alimentar(self, pedaco: str) -> List[Dict[str, Any]]:
+        """
+        Acrescenta um trecho da resposta
+
+        Texto fora do JSON (cercas de Markdown, comentários do modelo) é
+        ignorado, inclusive colchetes e chaves que não formam o JSON das
+        sugestões. Uma sugestão é todo objeto dentro de uma lista que tenha
+        'citacao_inicio'; objetos malformados são descartados sem perder os
+        demais.
+
+        Returns:
+            Sugestões completadas por este trecho
+        """
+        self.texto += pedaco
+        texto = self.texto
+        novas = []
+        for i in range(self._posicao, len(texto)):
+            if self.completo:
+                break
+            c = texto[i]
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._em_string = False
+                continue
+            if not self._pilha and c not in '{[':
+                continue
+
+            if c == '"':
+                self._em_string = True
+            elif c in '{[':
+                self._pilha.append((c, i))
+            elif c in '}]' and self._pilha:
+                abertura, inicio = self._pilha.pop()
+                if c == '}' and abertura == '{' and self._pilha and self._pilha[-1][0] == '[':
+                    try:
+                        objeto = json.loads(texto[inicio:i + 1])
+                    except ValueError:
+                        objeto = None
+                    if isinstance(objeto, dict) and 'citacao_inicio' in objeto:
+                        novas.append(objeto)
+                if not self._pilha:
+                    self.completo = self._raiz_valida(texto[inicio:i + 1])
+        self._posicao = len(texto)
+        self.sugestoes.extend(novas)
+        return novas
+
+    @staticmethod
+    def _raiz_valida(trecho: str) -> bool:
+        """Se a estrutura de nível mais alto é o JSON das sugestões (e não texto entre colchetes)"""
+        try:
+            raiz = json.loads(trecho)
+        except ValueError:
+            return False
+        if isinstance(raiz, dict):
+            return 'sugestoes' in raiz
+        return isinstance(raiz, list) and all(isinstance(item, dict) for item in raiz)
+
+
+def extrair_sugestoes(conteudo: str) -> List[Dict[str, Any]]:
+    """
+    Sugestões de uma resposta completa (ou truncada) do modelo
+
+    Raises:
+        ValueError: Se a resposta não tiver JSON completo nem sugestão aproveitável
+    """
+    leitor = LeitorSugestoes()
+    leitor.alimentar(conteudo)
+    if leitor.truncado and not leitor.sugestoes:
+        raise ValueError('Resposta sem JSON aproveitável')
+    return leitor.sugestoes
@@ -0,0 +1,282 @@
+"""
+Transcrição paralela em blocos usando um pool de processos
+
+O áudio é dividido em blocos de alguns minutos com cortes alinhados às pausas
+detectadas pelo VAD. Cada bloco é transcrito por um processo do pool (cada um
+com seu próprio modelo Whisper) e os segmentos são costurados de volta com os
+tempos globais corrigidos e as sobreposições removidas.
+"""
+
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from faster_whisper import WhisperModel
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from utils.modelos_whisper import PERFIL_PADRAO, registro_modelos
+from utils.palavras import descartar_iniciais, extrair_palavras
+
+
+# Taxa de amostragem esperada pelo Whisper
+TAXA_AMOSTRAGEM = 16000
+
+# Maior sequência de palavras repetidas procurada na emenda entre blocos
+MAX_PALAVRAS_SOBREPOSTAS = 12
+
+# Modelo carregado em cada processo do pool
+_modelo_worker = None
+
+
+def _inicializar_worker(nome_modelo: str, compute_type: str, cpu_threads: int):
+    """Carrega o modelo Whisper uma única vez por processo do pool"""
+    global _modelo_worker
+    _modelo_worker = WhisperModel(
+        nome_modelo,
+        device="cpu",
+        compute_type=compute_type,
+        cpu_threads=cpu_threads
+    )
+
+
+def _transcrever_bloco(indice: int, audio, deslocamento: float,
+                       palavras: bool = False) -> Tuple[int, List[Dict[str, Any]], str]:
+    """Transcreve um bloco no processo do pool, devolvendo tempos globais e o idioma"""
+    segmentos, info = _modelo_worker.transcribe(
+        audio,
+        beam_size=5,
+        language="pt",
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=500),
+        word_timestamps=palavras
+    )
+    resultado = []
+    for seg in segmentos:
+        item = {
+            'inicio': round(seg.start + deslocamento, 2),
+            'fim': round(seg.end + deslocamento, 2),
+            'texto': seg.text.strip()
+        }
+        if palavras:
+            item['palavras'] = extrair_palavras(seg.words, deslocamento)
+        resultado.append(item)
+    return indice, resultado, info.language
+
+
+def _normalizar_palavra(palavra: str) -> str:
+    """Palavra em minúsculas, sem acentos nem pontuação (para comparar emendas)"""
+    palavra = unicodedata.normalize('NFKD', palavra.lower())
+    palavra = ''.join(c for c in palavra if not unicodedata.combining(c))
+    return ''.join(re.findall(r'\w+', palavra))
+
+
+def planejar_blocos(audio, duracao_bloco: float, sobreposicao: float = 1.0,
+                    tolerancia: float = 30.0) -> List[Tuple[float, float]]:
+    """
+    Divide o áudio em blocos cortando, sempre que possível, no meio de uma pausa
+
+    Args:
+        audio: Amostras mono a 16 kHz
+        duracao_bloco: Duração alvo de cada bloco, em segundos
+        sobreposicao: Sobreposição usada quando não há pausa perto do corte
+        tolerancia: Distância máxima (s) do alvo em que uma pausa é aceita
+
+    Returns:
+        Lista de (inicio, fim) em segundos
+    """
+    duracao = len(audio) / TAXA_AMOSTRAGEM
+    if duracao <= duracao_bloco + tolerancia:
+        return [(0.0, duracao)]
+
+    fala = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500))
+    pausas = [
+        (fala[i]['end'] + fala[i + 1]['start']) / 2 / TAXA_AMOSTRAGEM
+        for i in range(len(fala) - 1)
+    ]
+
+    blocos = []
+    inicio = 0.0
+    while inicio < duracao:
+        alvo = inicio + duracao_bloco
+        if alvo + tolerancia >= duracao:
+            blocos.append((inicio, duracao))
+            break
+
+        candidatas = [p for p in pausas if abs(p - alvo) <= tolerancia and p > inicio]
+        if candidatas:
+            corte = min(candidatas, key=lambda p: abs(p - alvo))
+            blocos.append((inicio, corte))
+            inicio = corte
+        else:
+            # Sem pausa próxima: corte seco com sobreposição, removida na costura
+            blocos.append((inicio, alvo))
+            inicio = alvo - sobreposicao
+    return blocos
+
+
+def costurar_segmentos(anterior: Optional[Dict[str, Any]], novos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Remove dos segmentos de um bloco o trecho já coberto pelo bloco anterior
+
+    Args:
+        anterior: Último segmento já aceito (ou None no primeiro bloco)
+        novos: Segmentos do bloco seguinte, em ordem
+
+    Returns:
+        Segmentos do bloco seguinte sem duplicações
+    """
+    if not anterior:
+        return list(novos)
+
+    resultado = []
+    for seg in novos:
+        if seg['fim'] <= anterior['fim']:
+            # Totalmente dentro do trecho já transcrito
+            continue
+
+        if seg['inicio'] < anterior['fim']:
+            # Emenda: remove as palavras iniciais repetidas do fim do segmento anterior
+            palavras_ant = [_normalizar_palavra(p) for p in anterior['texto'].split()]
+            palavras = seg['texto'].split()
+            palavras_norm = [_normalizar_palavra(p) for p in palavras]
+            repetidas = 0
+            for k in range(min(MAX_PALAVRAS_SOBREPOSTAS, len(palavras_ant), len(palavras)), 0, -1):
+                if palavras_ant[-k:] == palavras_norm[:k]:
+                    repetidas = k
+                    break
+            texto = ' '.join(palavras[repetidas:]).strip()
+            if not texto:
+                continue
+            seg = dict(seg, inicio=anterior['fim'], texto=texto)
+            if 'palavras' in seg:
+                seg['palavras'] = descartar_iniciais(seg['palavras'], repetidas)
+
+        resultado.append(seg)
+        anterior = seg
+    return resultado
+
+
+class TranscritorParalelo:
+    """Pool de processos, cada um com seu próprio modelo Whisper"""
+
+    def __init__(self, workers: int = None, threads_por_worker: int = None,
+                 nome_modelo: str = None, compute_type: str = None,
+                 duracao_bloco: float = None):
+        """
+        Inicializa o transcritor (o pool só é criado no primeiro uso)
+
+        Args:
+            workers: Quantidade de processos (padrão: TRANSCRICAO_PARALELA_WORKERS
+                ou núcleos / threads_por_worker)
+            threads_por_worker: Threads de CPU de cada modelo (padrão:
+                TRANSCRICAO_PARALELA_THREADS ou 4)
+            nome_modelo: Modelo Whisper usado pelos workers (padrão: perfil padrão do registro)
+            compute_type: Tipo de computação do CTranslate2 (padrão: perfil padrão do registro)
+            duracao_bloco: Duração alvo dos blocos em segundos (padrão:
+                TRANSCRICAO_BLOCO_SEGUNDOS ou 300)
+        """
+        self.threads_por_worker = max(1, int(
+            threads_por_worker or os.environ.get('TRANSCRICAO_PARALELA_THREADS') or 4
+        ))
+        self.workers = max(1, int(
+            workers or os.environ.get('TRANSCRICAO_PARALELA_WORKERS')
+            or (os.cpu_count() or 1) // self.threads_por_worker
+        ))
+        config = registro_modelos.configuracao(PERFIL_PADRAO)
+        self.nome_modelo = nome_modelo or config['tamanho']
+        self.compute_type = compute_type or config['compute_type']
+        self.duracao_bloco = float(
+            duracao_bloco or os.environ.get('TRANSCRICAO_BLOCO_SEGUNDOS') or 300
+        )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def custo_cpu(self) -> int:
+        """Núcleos ocupados pelo pool inteiro"""
+        return self.workers * self.threads_por_worker
+
+    def _obter_pool(self) -> ProcessPoolExecutor:
+        """Cria o pool (spawn, para não herdar threads do Flask) no primeiro uso"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_inicializar_worker,
+                    initargs=(self.nome_modelo, self.compute_type, self.threads_por_worker)
+                )
+            return self._pool
+
+    def transcrever(self, audio, deslocamento: float = 0.0,
+                    ao_segmento: Callable[[Dict[str, Any]], None] = None,
+                    anterior: Optional[Dict[str, Any]] = None,
+                    palavras: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Transcreve o áudio em blocos paralelos
+
+        Os segmentos são entregues a `ao_segmento` em ordem cronológica, assim
+        que todos os blocos anteriores terminam, para que o checkpoint em disco
+        continue sendo um prefixo contínuo da transcrição.
+
+        Args:
+            audio: Amostras mono a 16 kHz
+            deslocamento: Tempo (s) do início do áudio no vídeo original
+            ao_segmento: Callback chamado com cada segmento já costurado
+            anterior: Último segmento já salvo antes do áudio (retomada)
+            palavras: Inclui o tempo de cada palavra nos segmentos
+
+        Returns:
+            Tupla (segmentos costurados com tempos globais, idioma informado
+            pelo Whisper no primeiro bloco)
+        """
+        blocos = planejar_blocos(audio, self.duracao_bloco)
+        print(f"[TRANSCRICAO] Modo paralelo: {len(blocos)} blocos em {self.workers} processos "
+              f"x {self.threads_por_worker} threads")
+
+        pool = self._obter_pool()
+        futuros = [
+            pool.submit(
+                _transcrever_bloco,
+                indice,
+                audio[int(inicio * TAXA_AMOSTRAGEM):int(fim * TAXA_AMOSTRAGEM)],
+                deslocamento + inicio,
+                palavras
+            )
+            for indice, (inicio, fim) in enumerate(blocos)
+        ]
+
+        prontos: Dict[int, List[Dict[str, Any]]] = {}
+        idiomas: Dict[int, str] = {}
+        proximo = 0
+        segmentos: List[Dict[str, Any]] = []
+
+        for futuro in as_completed(futuros):
+            indice, segmentos_bloco, idiomas[indice] = futuro.result()
+            prontos[indice] = segmentos_bloco
+
+            # Entrega apenas o prefixo contínuo de blocos concluídos
+            while proximo in prontos:
+                for seg in costurar_segmentos(anterior, prontos.pop(proximo)):
+                    segmentos.append(seg)
+                    anterior = seg
+                    if ao_segmento:
+                        ao_segmento(seg)
+                proximo += 1
+
+        return segmentos, idiomas.get(0)
+
+    def encerrar(self):
+        """Finaliza o pool de processos"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+# Instância global
+transcritor_paralelo = TranscritorParalelo()
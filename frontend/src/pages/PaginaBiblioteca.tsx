@@ -9,7 +9,7 @@ import {
   Eye,
   FileVideo
 } from "lucide-react";
-import { api } from "../services/api";
+import listarBiblioteca from "../services/listar-biblioteca";
 
 interface VideoBiblioteca {
   video_id: string;
@@ -33,12 +33,10 @@ const PaginaBiblioteca = () => {
     setErro("");
     
     try {
-      // Por enquanto, vamos buscar do backend
-      // Em produção, você pode criar uma rota específica para listar vídeos
-      // Por enquanto, vamos tentar buscar do índice
-      const resposta = await api.get('/api/biblioteca/listar');
-      if (resposta.data.success) {
-        setVideos(resposta.data.videos || []);
+      // Lista a partir dos resumos do índice, mais recentes primeiro
+      const resposta = await listarBiblioteca({ ordenar: 'ultima_atualizacao', ordem: 'desc' });
+      if (resposta.success) {
+        setVideos(resposta.videos || []);
       }
     } catch (err: any) {
       // Se a rota não existir, vamos mostrar uma mensagem
@@ -0,0 +1,60 @@
+import { api } from "./api";
+
+interface SegmentoTranscricao {
+  inicio: number;
+  fim: number;
+  texto: string;
+}
+
+interface FimTranscricao {
+  success: boolean;
+  video_id: string;
+  total_segmentos: number;
+  cache: boolean;
+}
+
+interface CallbacksTranscricao {
+  aoSegmento: (segmento: SegmentoTranscricao) => void;
+  aoFinalizar?: (resumo: FimTranscricao) => void;
+  aoErro?: (mensagem: string) => void;
+}
+
+/**
+ * Abre um stream SSE da transcrição e repassa cada segmento assim que é produzido.
+ * Retorna uma função para encerrar a conexão.
+ */
+const acompanharTranscricao = (
+  videoId: string,
+  callbacks: CallbacksTranscricao,
+  retomar: boolean = true
+): (() => void) => {
+  const url = `${api.defaults.baseURL}/api/transcricao/stream/${videoId}?retomar=${retomar ? 1 : 0}`;
+  const fonte = new EventSource(url);
+
+  fonte.addEventListener('segmento', (evento) => {
+    callbacks.aoSegmento(JSON.parse((evento as MessageEvent).data));
+  });
+
+  fonte.addEventListener('fim', (evento) => {
+    callbacks.aoFinalizar?.(JSON.parse((evento as MessageEvent).data));
+    fonte.close();
+  });
+
+  fonte.addEventListener('erro', (evento) => {
+    const dados = JSON.parse((evento as MessageEvent).data);
+    callbacks.aoErro?.(dados.error || 'Erro ao transcrever áudio');
+    fonte.close();
+  });
+
+  fonte.onerror = () => {
+    if (fonte.readyState === EventSource.CLOSED) return;
+    console.error('Falha no stream da transcrição');
+    callbacks.aoErro?.('Conexão com o servidor perdida durante a transcrição');
+    fonte.close();
+  };
+
+  return () => fonte.close();
+};
+
+export default acompanharTranscricao;
+export type { SegmentoTranscricao, FimTranscricao };
@@ -5,6 +5,8 @@ interface AnalisarVideoParams {
   url?: string;
   transcricao_texto?: string;
   reprocessar?: boolean;
+  cache_llm?: boolean;
+  prefiltro?: boolean;
 }
 
 interface SugestaoShort {
@@ -15,13 +17,34 @@ interface SugestaoShort {
   descricao: string;
   potencial_viral: string;
   hook: string;
+  confianca_alinhamento?: number;
+  pontuacao?: number;
+  ocorrencias?: number;
   tags: string[];
 }
 
+interface PlanoBlocos {
+  modelo: string;
+  provedor: string;
+  contexto_tokens: number;
+  orcamento_tokens: number;
+  total_blocos: number;
+  tokens_por_bloco: number[];
+  tokens_total: number;
+  ocupacao_media: number;
+  prefiltro: {
+    janelas: number;
+    janelas_mantidas: number;
+    tokens_total: number;
+    tokens_mantidos: number;
+  } | null;
+}
+
 interface RespostaAnalise {
   success: boolean;
   sugestoes?: SugestaoShort[];
   video_id?: string;
+  plano_blocos?: PlanoBlocos;
   cache?: boolean;
   error?: string;
 }
@@ -38,5 +61,5 @@ const analisarVideo = async (params: AnalisarVideoParams): Promise<RespostaAnali
 };
 
 export default analisarVideo;
-export type { SugestaoShort };
+export type { SugestaoShort, PlanoBlocos };
 
@@ -1,6 +1,8 @@
 /* eslint-disable @typescript-eslint/no-explicit-any */
 import { api } from "./api";
 
+type PerfilRender = 'preview' | 'final' | 'arquivo';
+
 interface BaixarShortParams {
   video_id?: string;
   url?: string;
@@ -8,6 +10,8 @@ interface BaixarShortParams {
   fim_segundos: number;
   titulo?: string;
   indice_sugestao?: number;
+  perfil?: PerfilRender;
+  legendas?: boolean;
 }
 
 interface RespostaBaixarShort {
@@ -15,6 +19,9 @@ interface RespostaBaixarShort {
   caminho_arquivo?: string;
   video_id?: string;
   cache?: boolean;
+  perfil?: PerfilRender;
+  copia?: boolean;
+  inicio_real?: number;
   error?: string;
 }
 
@@ -29,4 +36,5 @@ const baixarShort = async (params: BaixarShortParams): Promise<RespostaBaixarSho
 };
 
 export default baixarShort;
+export type { PerfilRender };
 
@@ -0,0 +1,39 @@
+/* eslint-disable @typescript-eslint/no-explicit-any */
+import { api } from "./api";
+import type { PerfilRender } from "./baixar-short";
+
+interface BaixarShortsLoteParams {
+  video_id?: string;
+  url?: string;
+  indices?: number[];
+  perfil?: PerfilRender;
+}
+
+interface ShortRenderizado {
+  indice_sugestao: number;
+  caminho_arquivo: string;
+  inicio_segundos: number;
+  fim_segundos: number;
+}
+
+interface RespostaBaixarShortsLote {
+  success: boolean;
+  video_id?: string;
+  shorts?: ShortRenderizado[];
+  total?: number;
+  perfil?: PerfilRender;
+  error?: string;
+}
+
+const baixarShortsLote = async (params: BaixarShortsLoteParams): Promise<RespostaBaixarShortsLote> => {
+  try {
+    const { data } = await api.post<RespostaBaixarShortsLote>('/api/shorts/baixar-lote', params);
+    return data;
+  } catch (erro: any) {
+    console.error('Falha ao renderizar shorts em lote:', erro);
+    throw new Error(erro.response?.data?.error || 'Erro ao renderizar shorts');
+  }
+};
+
+export default baixarShortsLote;
+export type { ShortRenderizado };
@@ -0,0 +1,27 @@
+import { api } from "./api";
+import type { Job } from "./obter-job";
+
+interface CriarJobParams {
+  url?: string;
+  video_id?: string;
+  reprocessar?: boolean;
+  gerar_shorts?: boolean;
+}
+
+type RespostaCriarJob = Partial<Job> & {
+  success: boolean;
+  error?: string;
+};
+
+const criarJob = async (params: CriarJobParams): Promise<RespostaCriarJob> => {
+  try {
+    const { data } = await api.post<RespostaCriarJob>('/api/jobs', params);
+    return data;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  } catch (erro: any) {
+    console.error('Falha ao criar job:', erro);
+    throw new Error(erro.response?.data?.error || 'Erro ao iniciar processamento');
+  }
+};
+
+export default criarJob;
@@ -0,0 +1,51 @@
+import { api } from "./api";
+import type { EstadoProcessamento } from "./obter-estado";
+
+interface ResumoVideo {
+  video_id: string;
+  url: string;
+  titulo: string;
+  thumbnail: string;
+  duracao_segundos?: number | null;
+  ultima_atualizacao: string;
+  estado: EstadoProcessamento;
+  contagens: {
+    segmentos: number;
+    sugestoes: number;
+    shorts: number;
+  };
+}
+
+interface ListarBibliotecaParams {
+  pagina?: number;
+  por_pagina?: number;
+  ordenar?: 'ultima_atualizacao' | 'titulo' | 'duracao' | 'sugestoes' | 'shorts';
+  ordem?: 'asc' | 'desc';
+  busca?: string;
+  concluida?: keyof EstadoProcessamento;
+  pendente?: keyof EstadoProcessamento;
+}
+
+interface RespostaBiblioteca {
+  success: boolean;
+  videos?: ResumoVideo[];
+  total?: number;
+  pagina?: number;
+  por_pagina?: number | null;
+  paginas?: number;
+  error?: string;
+}
+
+const listarBiblioteca = async (params: ListarBibliotecaParams = {}): Promise<RespostaBiblioteca> => {
+  try {
+    const { data } = await api.get<RespostaBiblioteca>('/api/biblioteca/listar', { params });
+    return data;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  } catch (erro: any) {
+    console.error('Falha ao listar biblioteca:', erro);
+    throw new Error(erro.response?.data?.error || 'Erro ao carregar biblioteca');
+  }
+};
+
+export default listarBiblioteca;
+export type { ResumoVideo, ListarBibliotecaParams };
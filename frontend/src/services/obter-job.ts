@@ -0,0 +1,44 @@
+import { api } from "./api";
+
+interface EtapaJob {
+  estado: 'na_fila' | 'executando' | 'concluido' | 'erro' | 'ignorado';
+  inicio: string | null;
+  fim: string | null;
+  erro: string | null;
+  progresso: number;
+  mensagem?: string;
+}
+
+interface Job {
+  job_id: string;
+  estado: 'na_fila' | 'executando' | 'concluido' | 'erro';
+  etapa_atual: string | null;
+  progresso: number;
+  erro: string | null;
+  video_id?: string;
+  url?: string;
+  etapas: Record<string, EtapaJob>;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  resultado: Record<string, any>;
+  criado_em: string;
+  atualizado_em: string;
+}
+
+type RespostaJob = Partial<Job> & {
+  success: boolean;
+  error?: string;
+};
+
+const obterJob = async (jobId: string): Promise<RespostaJob> => {
+  try {
+    const { data } = await api.get<RespostaJob>(`/api/jobs/${jobId}`);
+    return data;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  } catch (erro: any) {
+    console.error('Falha ao obter job:', erro);
+    throw new Error(erro.response?.data?.error || 'Erro ao obter progresso do processamento');
+  }
+};
+
+export default obterJob;
+export type { Job, EtapaJob };